@@ -1,48 +1,259 @@
-from flask import Flask, render_template_string, request, redirect, url_for, session, flash, get_flashed_messages
-from functools import wraps
+from flask import Flask, Response, abort, current_app, jsonify, render_template, send_file, stream_template, stream_with_context, request, redirect, url_for, session, flash
+from itertools import islice
+from markupsafe import Markup
+from werkzeug.local import LocalProxy
+import hashlib
+import io
+import json
 import os
+import sys
+import tempfile
+import threading
 
-# --- Configuration & Initialization ---
-app = Flask(__name__)
-# 1. Mandatory for using sessions (login/logout). Replace the default key in a real deployment.
-app.secret_key = os.environ.get('SECRET_KEY', 'my_highly_secure_cutm_key_12345') 
-
-# Temporary storage (Data will reset when the server restarts)
-students = []
-
-# --- Custom Decorator for Faculty Login Requirement ---
-def login_required(f):
-    """Decorator to restrict access to faculty (logged-in users)."""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        # Check if the 'logged_in' session flag is True
-        if session.get("logged_in") != True:
-            # Using simple HTML redirect with message since we are relying on render_template_string
-            return redirect(url_for("faculty_login"))
-        return f(*args, **kwargs)
-    return decorated_function
-
-# --- Helper Function ---
-def calculate_grade(percentage):
-    """Grade calculation based on the custom CUTM scale."""
-    if percentage >= 90:
-        return "O"
-    elif percentage >= 85:
-        return "E"
-    elif percentage >= 80:
-        return "A"
-    elif percentage >= 75:
-        return "B"
-    elif percentage >= 65:
-        return "C"
-    elif percentage >= 50:
-        return "D"
+# Make the project packages (models/, database/, utils/ ...) importable when run as app/app.py
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from config.config import (RESULTS_PAGE_SIZE, RESULTS_MAX_PAGE_SIZE, RESULTS_CACHE_SIZE, STORAGE_BACKEND,
+                           PUBLIC_CACHE_SIZE, PUBLIC_MAX_AGE, JOB_WORKERS, JOB_FILES_DIR,
+                           JOB_FILE_MAX_AGE, METRICS_ENABLED, IMPORT_BATCH_SIZE)
+from controllers.analytics import HISTOGRAM_BINS, PASS_MARK, cohort_analytics
+from controllers.calculate_result import score_student, score_students
+from controllers.import_results import import_results
+from controllers.grading import list_assignments, list_schemes, parse_bands, regrade_cohort, save_scheme
+from controllers.jobs import JobRunner, cancel_job, fail_interrupted_jobs, get_job, prune_job_files, recent_jobs
+from controllers.summary import rebuild_summaries
+from database.database import close_db
+from models.search import SEARCH_FACETS
+from models.student_store import open_store
+from utils.auth import login_required
+from utils.cache import CacheEntry, ResponseCache
+from utils.grading import GRADE_SCALE, FAIL_GRADE, GradingScheme
+from utils.pagination import page_args
+from utils.validation import validate_student
+
+# --- Per-App State ---
+# Each app built by create_app() keeps its store, caches and job runner in
+# app.extensions; the views below reach them through these proxies.
+# Student records. The default SQLite backend is shared by every worker process and
+# survives restarts; STORAGE_BACKEND=memory keeps the old single-process in-memory store
+# (journaled to disk when MEMORY_JOURNAL_DIR is set, see models/durable_store.py).
+students = LocalProxy(lambda: current_app.extensions["student_store"])
+# Rendered /results pages, per-student rows and the home page. Entries are tagged
+# with the rolls they show ("results" for every listing page) so writes drop only
+# what they affect.
+page_cache = LocalProxy(lambda: current_app.extensions["page_caches"][0])
+# Read replica for the public lookup: one entry per roll (including unknown rolls),
+# kept apart so a results-day spike cannot evict the faculty pages
+public_cache = LocalProxy(lambda: current_app.extensions["page_caches"][1])
+# Imports, recomputation and file exports run here instead of on the request thread
+jobs = LocalProxy(lambda: current_app.extensions["jobs"])
+
+# Views are collected here and added to each app by create_app()
+_routes = []
+
+def route(rule, **options):
+    """Like app.route, for an app that does not exist yet."""
+    def decorator(f):
+        _routes.append((rule, f, options))
+        return f
+    return decorator
+
+# --- Application Factory ---
+def create_app(backend=STORAGE_BACKEND):
+    """Build the portal app.
+
+    The SQLite database is not touched here: the schema is migrated on first
+    use and the one-off startup work runs before the first request (or in
+    prewarm()). The journaled memory store (MEMORY_JOURNAL_DIR) is the
+    exception: it loads its snapshot and replays its journal when opened,
+    so that gunicorn --preload shares the records with every worker.
+    Blueprints are imported only when an app is built.
+    """
+    # Pages live in templates/ so Jinja compiles each one once per process and caches it
+    app = Flask(__name__, template_folder=os.path.join(BASE_DIR, "templates"), static_folder=os.path.join(BASE_DIR, "static"))
+    # 1. Mandatory for using sessions (login/logout). Replace the default key in a real deployment.
+    app.secret_key = os.environ.get('SECRET_KEY', 'my_highly_secure_cutm_key_12345')
+
+    # Shared with the JSON API blueprint
+    app.extensions["student_store"] = open_store(backend)
+    app.extensions["page_caches"] = (ResponseCache(RESULTS_CACHE_SIZE, name="pages"),
+                                     ResponseCache(PUBLIC_CACHE_SIZE, name="public"))
+    app.extensions["jobs"] = JobRunner(JOB_WORKERS)
+
+    for rule, view, options in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+    from controllers.api import api_bp
+    from controllers.add_subject import subject_bp
+    app.register_blueprint(api_bp)
+    app.register_blueprint(subject_bp)
+    if METRICS_ENABLED:
+        from controllers.metrics import metrics_bp
+        app.register_blueprint(metrics_bp)
+
+    started = threading.Lock()
+
+    @app.before_request
+    def start_once():
+        if not app.extensions.get("started"):
+            with started:
+                if not app.extensions.get("started"):
+                    startup()
+                    app.extensions["started"] = True
+
+    return app
+
+def startup():
+    """One-off housekeeping for a new server: job file folder, jobs left by a crashed process."""
+    os.makedirs(JOB_FILES_DIR, exist_ok=True)
+    fail_interrupted_jobs()
+    prune_job_files(JOB_FILES_DIR, JOB_FILE_MAX_AGE)
+
+def prewarm(app):
+    """Do the slow first-use work now, e.g. in the gunicorn master before it forks (--preload).
+
+    Migrates the database and compiles every template, so forked workers
+    start with them in memory and share it copy-on-write. This process's
+    database connection is closed afterwards; connections must never cross
+    a fork (each worker opens its own on first use).
+    """
+    with app.app_context():
+        startup()
+        app.extensions["started"] = True
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+        list_schemes()
+        # Optional openpyxl/reportlab imports are slow; pay for them once here
+        import controllers.export_results
+    close_db()
+
+def submit_job(kind, fn, *args):
+    """Queue fn(context, *args) on this app's job runner, running inside the app context."""
+    app = current_app._get_current_object()
+
+    def run(context, *args):
+        with app.app_context():
+            return fn(context, *args)
+    return jobs.submit(kind, run, *args)
+
+def invalidate_cached(*tags):
+    page_cache.invalidate(*tags)
+    public_cache.invalidate(*tags)
+
+def clear_cached():
+    page_cache.clear()
+    public_cache.clear()
+
+# --- Response Caching Helpers ---
+def conditional_response(entry, render, etag=None, public=False):
+    """Serve a cached page with ETag/Last-Modified, answering 304 when the client copy is current.
+
+    Pending flash messages are per-session, so pages showing them are never
+    answered with 304 or marked cacheable. Public pages don't look at the
+    session at all and may be cached by browsers and proxies for a short time.
+    """
+    etag = etag or entry.etag
+    cacheable = public or not session.get("_flashes")
+
+    def set_headers(response):
+        response.set_etag(etag)
+        response.last_modified = entry.last_modified
+        if public:
+            response.cache_control.public = True
+            response.cache_control.max_age = PUBLIC_MAX_AGE
+        else:
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+
+    if cacheable:
+        probe = Response()
+        set_headers(probe)
+        probe.make_conditional(request)
+        if probe.status_code == 304:
+            return probe
+    response = current_app.make_response(render())
+    if cacheable:
+        set_headers(response)
+    return response
+
+def student_form_data(form, num_subjects, roll=None):
+    """Collect a student record from the add/edit forms (fields subject_i, marks_i, total_i)."""
+    data = {field: form.get(field) for field in ("name", "roll", "branch", "section", "year")}
+    if roll is not None:
+        data["roll"] = roll
+    data["subjects"] = [{"name": form.get(f"subject_{i}"), "obtained": form.get(f"marks_{i}"),
+                         "total": form.get(f"total_{i}")} for i in range(1, num_subjects + 1)]
+    return data
+
+def student_row(student, version):
+    """Rendered table cells for one student, cached until that roll changes or `version` moves."""
+    return page_cache.get_or_render(("row", student["roll"]),
+                                    lambda: render_template("_result_row.html", s=student),
+                                    version, tags=(student["roll"],)).value
+
+# --- Background Jobs ---
+# Job functions take the JobContext first (progress / cancellation) and return a JSON-able result
+
+# Rejected rows kept in an import job's result for display
+JOB_MAX_ERRORS = 200
+
+def import_job(context, path, fmt):
+    """Import an uploaded mark sheet, reporting progress by how far into the file we are."""
+    size = os.path.getsize(path) or 1
+    try:
+        with io.TextIOWrapper(open(path, "rb"), encoding="utf-8", newline="") as f:
+            report = import_results(f, fmt, store=students, on_batch=lambda report: context.progress(
+                f.buffer.tell() / size, f"{report['imported']} results imported"))
+    finally:
+        os.remove(path)
+        # Imported marks can touch any student
+        clear_cached()
+    return {"imported": report["imported"], "rejected": len(report["errors"]),
+            "errors": report["errors"][:JOB_MAX_ERRORS]}
+
+def recompute_job(context):
+    """Recompute every student's percentage and grade."""
+    if students.shared_version() is not None:
+        count = rebuild_summaries()
     else:
-        return "F"
+        # In-memory store: re-score the records from their marks, one upsert_many (and, when
+        # journaled, one fsync) per import-sized chunk
+        total = len(students) or 1
+        count = 0
+        records = students.iter_students()
+        while chunk := list(islice(records, IMPORT_BATCH_SIZE)):
+            students.upsert_many(score_students(student.to_dict() for student in chunk))
+            count += len(chunk)
+            context.progress(count / total, f"{count} students recomputed")
+    # Re-apply assigned grading schemes (curves are re-fitted), most specific last
+    for a in sorted(list_assignments(), key=lambda a: (a["branch"] != "", a["year"] != "")):
+        regrade_cohort(students, a["scheme"], a["branch"] or None, a["year"] or None)
+    clear_cached()
+    return {"recomputed": count}
+
+def regrade_job(context, name, branch, year):
+    count = regrade_cohort(students, name, branch, year)
+    clear_cached()
+    return {"regraded": count, "scheme": name}
+
+def export_job(context, fmt, cohort, name):
+    """Write an XLSX mark sheet or report-card zip into JOB_FILES_DIR for download."""
+    from controllers.export_results import EXPORTERS, export_to_tempfile
+    total = students.count(**cohort) or 1
+    path = export_to_tempfile(students.iter_students(**cohort), fmt, directory=JOB_FILES_DIR,
+                              progress=lambda done: context.progress(done / total, f"{done} students exported"))
+    return {"path": path, "filename": name + EXPORTERS[fmt][1]}
+
+def grade_order():
+    """Every grade any scheme can give, best first (the default scale's order first)."""
+    order = [grade for _, grade in GRADE_SCALE] + [FAIL_GRADE]
+    for scheme in list_schemes():
+        order += [grade for _, grade in scheme.bands + [(None, scheme.fail_grade)] if grade not in order]
+    return order
 
 # --- Authentication Routes ---
 
-@app.route("/login", methods=["GET", "POST"])
+@route("/login", methods=["GET", "POST"])
 def faculty_login():
     """Faculty Login Page. Checks for @cutm.ac.in domain."""
     if request.method == "POST":
@@ -59,47 +270,10 @@ def faculty_login():
             flash("Invalid credentials or email domain. Access is restricted to @cutm.ac.in faculty emails only.", "danger")
             return redirect(url_for("faculty_login")) # Redirect back to show error
 
-    # Template for Login Page (GET request)
-    
-    # Correctly retrieve flash messages for display in the template string
-    flashed_messages = get_flashed_messages(with_categories=True)
-    flash_html = ""
-    for category, message in flashed_messages:
-        # Define basic styles for success and danger alerts
-        style = 'background: #d4edda; color: #155724;' if category == 'success' else 'background: #f8d7da; color: #721c24;'
-        flash_html += f'<div style="{style} padding: 10px; border-radius: 5px; margin-bottom: 15px; text-align: center;">{message}</div>'
-        
-    return render_template_string(f"""
-    <html>
-    <head>
-        <title>Faculty Login | CUTM</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; background:#003366; text-align:center; padding:80px; }}
-            .form-box {{ background:white; padding:40px; border-radius:10px; box-shadow:0 8px 20px rgba(0,0,0,0.3); display:inline-block; text-align:left; max-width: 400px; width: 90%;}}
-            h2 {{ color:#003366; text-align:center; margin-bottom: 20px; }}
-            input[type=email], input[type=password] {{ width:95%; padding:12px; border-radius:5px; border:1px solid #ccc; margin-top:5px; margin-bottom: 15px; }}
-            button {{ background:#ffcc00; color:black; padding:12px 20px; border:none; border-radius:5px; cursor:pointer; margin-top:15px; width:100%; font-weight: bold; }}
-            button:hover {{ background:#ffaa00; }}
-        </style>
-    </head>
-    <body>
-        <div class="form-box">
-            <h2>CUTM Faculty Portal Login 🔑</h2>
-            {flash_html}
-            <form method="POST">
-                <label for="email">Faculty Email (must be @cutm.ac.in):</label>
-                <input type="email" id="email" name="email" placeholder="e.g. shubham@cutm.ac.in" required>
-                <label for="password">Password (Any value for demo):</label>
-                <input type="password" id="password" name="password" required>
-                <button type="submit">Secure Login</button>
-            </form>
-            <p style="text-align:center; margin-top:20px;"><a style="color: #003366;" href="/home">Back to Home</a></p>
-        </div>
-    </body>
-    </html>
-    """)
-
-@app.route("/logout")
+    # Login Page (GET request); flash messages are rendered by the template
+    return render_template("login.html")
+
+@route("/logout")
 def faculty_logout():
     """Logout endpoint."""
     session.pop("logged_in", None)
@@ -110,71 +284,66 @@ def faculty_logout():
 # --- Application Routes ---
 
 # Landing Page - UPDATED: Now redirects immediately to the Home Dashboard (/home)
-@app.route("/")
+@route("/")
 def start():
     """Application starting page with CUTM branding. Now redirects to Home for casual access."""
     # Bypassing the intermediate 'Enter Portal' screen as requested.
     return redirect(url_for("home"))
 
 # Homepage
-@app.route("/home")
+@route("/home")
 def home():
     """Main dashboard for the portal."""
-    # Determine navigation links based on login status
-    login_status_html = ""
-    if session.get("logged_in"):
-        login_status_html = f"""
-            <span style="color: #ffcc00; font-weight: normal; font-size: 14px;">(Logged in as: {session.get('faculty_email')})</span>
-            <a href="/logout">Logout</a>
-        """
-    else:
-        login_status_html = '<a href="/login">Faculty Login</a>'
-
-    return render_template_string(f"""
-    <html>
-    <head>
-        <title>Student Results of CUTM</title>
-        <style>
-            body {{ font-family: 'Inter', sans-serif; margin: 0; background: #f4f7f8; }}
-            header {{ background: #003366; color: white; padding: 20px; text-align: center; }}
-            header img.logo {{ width: 60px; vertical-align: middle; margin-right: 15px; border-radius: 50%; }}
-            header h1 {{ display: inline-block; vertical-align: middle; margin: 0; font-size: 28px; }}
-            nav {{ margin-top: 10px; }}
-            nav a {{ color: white; text-decoration: none; margin: 0 15px; font-weight: bold; padding: 5px 10px; border-radius: 5px; transition: background 0.3s; }}
-            nav a:hover {{ background: #0055a5; }}
-            main {{ padding: 60px 20px; text-align: center; }}
-            footer {{ background: #003366; color: white; padding: 15px; text-align: center; position: fixed; width: 100%; bottom: 0; font-size: 12px; }}
-            a.button {{ background: #ffcc00; color: black; padding: 12px 25px; border-radius: 5px; text-decoration: none; margin: 15px 10px; display: inline-block; font-weight: bold; transition: transform 0.2s; box-shadow: 0 4px #e6b800; }}
-            a.button:hover {{ transform: translateY(-2px); box-shadow: 0 6px #e6b800; }}
-            .faculty-status {{ display: block; margin-top: 15px; font-size: 16px; font-weight: bold; color: #ffcc00; }}
-        </style>
-    </head>
-    <body>
-        <header>
-            <img class="logo" src="https://upload.wikimedia.org/wikipedia/en/6/62/Centurion_University_of_Technology_and_Management_Logo.svg" alt="CUTM Logo">
-            <h1>Student Results Management</h1>
-            <nav>
-                <a href="/home">Home</a> <!-- Updated link to point to the main dashboard -->
-                <a href="/add">Add Student</a>
-                <a href="/results">View Results</a>
-                {login_status_html}
-            </nav>
-        </header>
-        <main>
-            <h2>Centurion University of Technology And Management (CUTM)</h2>
-            <p>Use the links above to securely manage and view student academic performance data.</p>
-            <a class="button" href="/add">➕ Add Student Results</a>
-            <a class="button" href="/results">📋 View Published Results</a>
-        </main>
-        <footer>
-            &copy; 2025-26 CUTM University Project | Directorate of Evaluation
-        </footer>
-    </body>
-    </html>
-    """)
+    # Navigation links depend on login status
+    faculty_email = session.get("faculty_email") if session.get("logged_in") else None
+    entry = page_cache.get_or_render(("home", faculty_email),
+                                     lambda: render_template("home.html", faculty_email=faculty_email),
+                                     tags=("home",))
+    return conditional_response(entry, lambda: entry.value)
+
+# Public result lookup - no login, no session
+def public_result(roll):
+    """Cached JSON for one roll's published result, or None if the roll is unknown.
+
+    Misses are not cached, so mistyped or made-up rolls cannot push real
+    results out of the public cache.
+    """
+    version = students.shared_version()
+    entry = public_cache.get(("public", roll), version)
+    if entry is None:
+        student = students.get(roll)
+        if student is None:
+            return None
+        data = student.to_dict()
+        entry = public_cache.set(("public", roll), json.dumps(
+            {field: data[field] for field in
+             ("roll", "name", "branch", "section", "year", "subjects", "percentage", "grade")}), version, tags=(roll,))
+    return entry
+
+@route("/result", defaults={"roll": None})
+@route("/result/<roll>")
+def lookup_result(roll):
+    """Students look up their own marks by roll number (?roll=... from the form)."""
+    roll = roll or (request.args.get("roll") or "").strip() or None
+    if roll is None:
+        return render_template("public_result.html", roll=None, student=None)
+    entry = public_result(roll)
+    if entry is None:
+        return render_template("public_result.html", roll=roll, student=None), 404
+    student = json.loads(entry.value)
+    return conditional_response(entry, lambda: render_template("public_result.html", roll=roll, student=student),
+                                etag=entry.etag + "-html", public=True)
+
+@route("/api/result/<roll>")
+def lookup_result_json(roll):
+    """JSON version of the public lookup."""
+    entry = public_result(roll)
+    if entry is None:
+        return jsonify(error=f"No result published for roll {roll}"), 404
+    return conditional_response(entry, lambda: Response(entry.value, mimetype="application/json"), public=True)
 
 # Add student - first step: enter number of subjects
-@app.route("/add", methods=["GET", "POST"])
+@route("/add", methods=["GET", "POST"])
 @login_required # ONLY FACULTY CAN ACCESS
 def add_student():
     """Route to determine number of subjects and then get student/marks data."""
@@ -187,156 +356,41 @@ def add_student():
             return "<h3>Please enter a valid positive integer for number of subjects.</h3>"
         
         # Second step: Form to enter details and subject marks
-        # The core HTML is kept close to the original for format consistency
-        return render_template_string(f"""
-        <html>
-        <head>
-            <title>Add Student - Enter Subjects</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; background:#f4f7f8; text-align:center; padding:40px; }}
-                .form-box {{ background:white; padding:30px; border-radius:10px; box-shadow:0 4px 12px rgba(0,0,0,0.1); display:inline-block; text-align:left; }}
-                h2 {{ color:#003366; text-align:center; }}
-                label {{ font-weight:bold; display:block; margin-top:10px; }}
-                input {{ width:95%; padding:8px; margin-top:5px; border:1px solid #ccc; border-radius:5px; }}
-                button {{ background:#003366; color:white; padding:10px 20px; border:none; border-radius:5px; cursor:pointer; margin-top:15px; }}
-                button:hover {{ background:#0055a5; }}
-                a.back {{ display:inline-block; margin-top:10px; text-decoration:none; color:#003366; }}
-                a.back:hover {{ text-decoration:underline; }}
-                table {{ width:100%; border-collapse: collapse; margin-top:15px; }}
-                th, td {{ border:1px solid #ddd; padding:8px; text-align:center; }}
-                th {{ background:#003366; color:white; }}
-            </style>
-        </head>
-        <body>
-            <div class="form-box">
-                <h2>Enter Student Details & Subjects</h2>
-                <form method="POST" action="/submit_student">
-                    <label>Name:</label>
-                    <input type="text" name="name" required>
-                    <label>Roll Number:</label>
-                    <input type="text" name="roll" required>
-                    <label>Branch:</label>
-                    <input type="text" name="branch" required>
-                    <label>Section:</label>
-                    <input type="text" name="section" required>
-                    <label>Year:</label>
-                    <input type="text" name="year" required>
-                    <input type="hidden" name="num_subjects" value="{num_subjects}">
-                    <table>
-                        <tr>
-                            <th>Sr. No.</th>
-                            <th>Subject Name</th>
-                            <th>Marks Obtained</th>
-                            <th>Total Marks</th>
-                        </tr>
-                        {''.join([f"""
-                        <tr>
-                            <td>{i+1}</td>
-                            <td><input type="text" name="subject_{i+1}" required></td>
-                            <td><input type="number" name="marks_{i+1}" required></td>
-                            <td><input type="number" name="total_{i+1}" required></td>
-                        </tr>""" for i in range(num_subjects)])}
-                    </table>
-                    <button type="submit">Add Student</button>
-                </form>
-                <a class="back" href='/home'>⬅ Back Home</a>
-            </div>
-        </body>
-        </html>
-        """)
+        return render_template("add_student.html", num_subjects=num_subjects)
 
     # First step: user enters number of subjects manually
-    return render_template_string("""
-    <html>
-    <head>
-        <title>Add Student - Number of Subjects</title>
-        <style>
-            body { font-family: Arial, sans-serif; background:#f4f7f8; text-align:center; padding:40px; }
-            .form-box { background:white; padding:30px; border-radius:10px; box-shadow:0 4px 12px rgba(0,0,0,0.1); display:inline-block; text-align:left; }
-            h2 { color:#003366; text-align:center; }
-            input { width:100%; padding:8px; border-radius:5px; border:1px solid #ccc; margin-top:5px; }
-            button { background:#003366; color:white; padding:10px 20px; border:none; border-radius:5px; cursor:pointer; margin-top:15px; }
-            button:hover { background:#0055a5; }
-            a.back { display:inline-block; margin-top:10px; text-decoration:none; color:#003366; }
-            a.back:hover { text-decoration:underline; }
-        </style>
-    </head>
-    <body>
-        <div class="form-box">
-            <h2>Enter Number of Subjects</h2>
-            <form method="POST">
-                <input type="number" name="num_subjects" placeholder="Enter number of subjects" required min="1">
-                <button type="submit">Next</button>
-            </form>
-            <a class="back" href='/home'>⬅ Back Home</a>
-        </div>
-    </body>
-    </html>
-    """)
+    return render_template("add_student.html", num_subjects=None)
 
 # Submit student data
-@app.route("/submit_student", methods=["POST"])
+@route("/submit_student", methods=["POST"])
 @login_required # ONLY FACULTY CAN ACCESS
 def submit_student():
     """Handles the submission and calculation of marks."""
-    student = {
-        "name": request.form["name"],
-        "roll": request.form["roll"],
-        "branch": request.form["branch"],
-        "section": request.form["section"],
-        "year": request.form["year"],
-        "subjects": []
-    }
-    num_subjects = int(request.form["num_subjects"])
-    total_obtained = 0
-    total_marks = 0
-    
-    # Process subject marks
     try:
-        for i in range(1, num_subjects+1):
-            # Input validation and type casting
-            obtained = int(request.form[f"marks_{i}"])
-            total = int(request.form[f"total_{i}"])
-            
-            if obtained < 0 or total <= 0 or obtained > total:
-                 # In a professional app, you'd send an error page
-                 flash("Input Error: Marks must be positive and obtained marks must not exceed total marks.", "danger")
-                 return redirect(url_for("add_student"))
-
-            student["subjects"].append({
-                "name": request.form[f"subject_{i}"],
-                "obtained": obtained,
-                "total": total
-            })
-            total_obtained += obtained
-            total_marks += total
-    except ValueError:
-        flash("Input Error: Please ensure all marks are valid numbers.", "danger")
+        # Input validation and type casting, shared with the JSON API
+        data = student_form_data(request.form, int(request.form["num_subjects"]))
+        student = score_student(validate_student(data))
+    except ValueError as e:
+        flash(f"Input Error: {e}", "danger")
         return redirect(url_for("add_student"))
 
-
-    # Calculate percentage and grade
-    student["percentage"] = round((total_obtained / total_marks) * 100, 2) if total_marks else 0
-    student["grade"] = calculate_grade(student["percentage"])
-
     # Update or Add student record
-    for idx, s in enumerate(students):
-        if s["roll"] == student["roll"]:
-            students[idx] = student
-            flash(f"Results for Roll No. {student['roll']} updated successfully.", "success")
-            break
-    else:
-        students.append(student)
+    if students.upsert(student):
+        # A new roll shifts every listing page
+        invalidate_cached("results")
         flash(f"New student {student['name']} added successfully.", "success")
+    else:
+        invalidate_cached(student["roll"])
+        flash(f"Results for Roll No. {student['roll']} updated successfully.", "success")
         
     return redirect(url_for("view_results"))
 
 # Edit student
-@app.route("/edit/<roll>", methods=["GET", "POST"])
+@route("/edit/<roll>", methods=["GET", "POST"])
 @login_required # ONLY FACULTY CAN ACCESS
 def edit_student(roll):
     """Route to edit an existing student's details and marks."""
-    student = next((s for s in students if s["roll"] == roll), None)
+    student = students.get(roll)
     if not student:
         flash(f"Student with Roll No. {roll} not found.", "danger")
         return redirect(url_for("view_results"))
@@ -344,33 +398,15 @@ def edit_student(roll):
     if request.method == "POST":
         # Handle form submission for editing
         try:
-            student["name"] = request.form["name"]
-            student["branch"] = request.form["branch"]
-            student["section"] = request.form["section"]
-            student["year"] = request.form["year"]
-            num_subjects = len(student["subjects"]) 
-            total_obtained = 0
-            total_marks = 0
-            student["subjects"] = []
-            
-            for i in range(1, num_subjects+1):
-                obtained = int(request.form[f"marks_{i}"])
-                total = int(request.form[f"total_{i}"])
-                
-                if obtained < 0 or total <= 0 or obtained > total:
-                     flash("Input Error: Marks must be positive and obtained marks must not exceed total marks.", "danger")
-                     return redirect(url_for("edit_student", roll=roll))
-
-                student["subjects"].append({
-                    "name": request.form[f"subject_{i}"],
-                    "obtained": obtained,
-                    "total": total
-                })
-                total_obtained += obtained
-                total_marks += total
-
-            student["percentage"] = round((total_obtained / total_marks) * 100, 2) if total_marks else 0
-            student["grade"] = calculate_grade(student["percentage"])
+            data = student_form_data(request.form, len(student["subjects"]), roll=roll)
+            updated = score_student(validate_student(data))
+        except ValueError as e:
+            flash(f"Input Error: {e}", "danger")
+            return redirect(url_for("edit_student", roll=roll))
+
+        try:
+            students.upsert(updated)
+            invalidate_cached(roll)
             flash(f"Results for Roll No. {roll} updated successfully.", "success")
         except Exception as e:
             flash(f"Error updating data: {e}", "danger")
@@ -378,125 +414,241 @@ def edit_student(roll):
         return redirect(url_for("view_results"))
 
     # GET request: Display edit form
-    subject_inputs = "".join([f"""
-        <tr>
-            <td>{i+1}</td>
-            <td><input type="text" name="subject_{i+1}" value="{sub['name']}" required></td>
-            <td><input type="number" name="marks_{i+1}" value="{sub['obtained']}" required></td>
-            <td><input type="number" name="total_{i+1}" value="{sub['total']}" required></td>
-        </tr>""" for i, sub in enumerate(student["subjects"])])
-
-    return render_template_string(f"""
-    <html>
-    <head>
-        <title>Edit Student</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; background:#f4f7f8; text-align:center; padding:40px; }}
-            .form-box {{ background:white; padding:30px; border-radius:10px; box-shadow:0 4px 12px rgba(0,0,0,0.1); display:inline-block; text-align:left; }}
-            table {{ width:100%; border-collapse: collapse; margin-top:15px; }}
-            th, td {{ border:1px solid #ddd; padding:8px; text-align:center; }}
-            th {{ background:#003366; color:white; }}
-            button {{ background:#003366; color:white; padding:10px 20px; border:none; border-radius:5px; cursor:pointer; margin-top:15px; }}
-            button:hover {{ background:#0055a5; }}
-            a.back {{ display:inline-block; margin-top:10px; text-decoration:none; color:#003366; }}
-            a.back:hover {{ text-decoration:underline; }}
-            input[type="text"], input[type="number"] {{ width: 80%; padding: 5px; border-radius: 3px; border: 1px solid #ccc; }}
-        </style>
-    </head>
-    <body>
-        <div class="form-box">
-            <h2>📝 Edit Student / Marks for Roll: {student['roll']}</h2>
-            <form method="POST">
-                <label>Name:</label><input type="text" name="name" value="{student['name']}" required><br>
-                <label>Branch:</label><input type="text" name="branch" value="{student['branch']}" required><br>
-                <label>Section:</label><input type="text" name="section" value="{student['section']}" required><br>
-                <label>Year:</label><input type="text" name="year" value="{student['year']}" required><br>
-                <input type="hidden" name="num_subjects" value="{len(student['subjects'])}">
-                <table>
-                    <tr><th>Sr. No.</th><th>Subject Name</th><th>Marks Obtained</th><th>Total Marks</th></tr>
-                    {subject_inputs}
-                </table>
-                <button type="submit">Update Student</button>
-            </form>
-            <a class="back" href='/results'>⬅ Back to Results</a>
-        </div>
-    </body>
-    </html>
-    """)
+    return render_template("edit_student.html", student=student)
 
 # Emergency restart
-@app.route("/restart", methods=["POST"])
+@route("/restart", methods=["POST"])
 @login_required # ONLY FACULTY CAN ACCESS
 def restart():
     """Clears all student data - requires faculty login."""
     students.clear()
+    clear_cached()
     flash("⚠ WARNING: All student records have been cleared via Emergency Restart.", "danger")
     return redirect(url_for("view_results"))
 
+# Bulk result import (CSV / JSON mark sheets)
+@route("/import", methods=["GET", "POST"])
+@login_required # ONLY FACULTY CAN ACCESS
+def import_marks():
+    """Upload a whole mark sheet; it is imported by a background job."""
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            flash("Please choose a CSV or JSON file to import.", "danger")
+            return redirect(url_for("import_marks"))
+        fmt = "json" if upload.filename.lower().endswith((".json", ".jsonl")) else "csv"
+        # The request's upload disappears with the request, so the job gets its own copy
+        fd, path = tempfile.mkstemp(suffix="." + fmt, dir=JOB_FILES_DIR)
+        with os.fdopen(fd, "wb") as f:
+            upload.save(f)
+        job_id = submit_job("import", import_job, path, fmt)
+        flash(f"Import of {upload.filename} started.", "info")
+        return redirect(url_for("job_status", job_id=job_id))
+    return render_template("import_results.html")
+
+# Recompute percentages and grades for everyone
+@route("/recompute", methods=["POST"])
+@login_required # ONLY FACULTY CAN ACCESS
+def recompute():
+    job_id = submit_job("recompute", recompute_job)
+    flash("Recomputing every student's percentage and grade.", "info")
+    return redirect(url_for("job_status", job_id=job_id))
+
+# Grading schemes
+@route("/grading", methods=["GET", "POST"])
+@login_required # ONLY FACULTY CAN ACCESS
+def grading():
+    """List grading schemes and which program/year uses each; POST saves a scheme."""
+    if request.method == "POST":
+        form = request.form
+        try:
+            name = (form.get("name") or "").strip()
+            if not name:
+                raise ValueError("Please give the grading scheme a name")
+            pass_mark = float(form["pass_mark"]) if form.get("pass_mark") else None
+            save_scheme(GradingScheme(name, parse_bands(form.get("bands") or ""), form.get("fail_grade") or FAIL_GRADE,
+                                      form.get("kind", "absolute"), pass_mark))
+            flash(f"Grading scheme {name} saved.", "success")
+        except ValueError as e:
+            flash(f"Input Error: {e}", "danger")
+        return redirect(url_for("grading"))
+    return render_template("grading.html", schemes=list_schemes(), assignments=list_assignments(),
+                           values={field: students.values_of(field) for field in ("branch", "year")})
+
+@route("/grading/regrade", methods=["POST"])
+@login_required # ONLY FACULTY CAN ACCESS
+def regrade():
+    """Grade a program/year (blank = all) under a scheme, as a background job."""
+    name = request.form.get("scheme")
+    branch, year = request.form.get("branch") or None, request.form.get("year") or None
+    job_id = submit_job("regrade", regrade_job, name, branch, year)
+    flash(f"Regrading {branch or 'all branches'}, year {year or 'all'} under {name}.", "info")
+    return redirect(url_for("job_status", job_id=job_id))
+
+# Background job progress
+@route("/jobs")
+@login_required # ONLY FACULTY CAN ACCESS
+def job_list():
+    return render_template("jobs.html", jobs=recent_jobs(), job=None)
+
+@route("/jobs/<int:job_id>")
+@login_required # ONLY FACULTY CAN ACCESS
+def job_status(job_id):
+    """Progress of one job; ?format=json for polling from scripts."""
+    job = get_job(job_id)
+    if job is None:
+        abort(404)
+    if request.args.get("format") == "json":
+        return jsonify(job)
+    return render_template("jobs.html", jobs=None, job=job)
+
+@route("/jobs/<int:job_id>/cancel", methods=["POST"])
+@login_required # ONLY FACULTY CAN ACCESS
+def job_cancel(job_id):
+    job = cancel_job(job_id)
+    if job is None:
+        abort(404)
+    if not job["finished"]:
+        flash(f"Cancelling job #{job_id}...", "info")
+    return redirect(url_for("job_status", job_id=job_id))
+
+@route("/jobs/<int:job_id>/download")
+@login_required # ONLY FACULTY CAN ACCESS
+def job_download(job_id):
+    """The file produced by a finished export job."""
+    job = get_job(job_id)
+    if job is None or job["kind"] != "export" or job["status"] != "done" or not os.path.exists(job["result"]["path"]):
+        abort(404)
+    return send_file(job["result"]["path"], as_attachment=True, download_name=job["result"]["filename"])
+
+# Class rankings / leaderboard
+@route("/rankings")
+@login_required # ONLY FACULTY CAN ACCESS
+def rankings():
+    """Top-N leaderboard and grade distribution for a branch/section/year, plus rank lookup by roll."""
+    cohort = {field: request.args.get(field) or None for field in ("branch", "section", "year")}
+    try:
+        n = min(max(int(request.args.get("n", 10)), 1), RESULTS_MAX_PAGE_SIZE)
+    except ValueError:
+        n = 10
+    roll = request.args.get("roll") or None
+    return render_template(
+        "rankings.html",
+        cohort=cohort,
+        n=n,
+        leaders=students.top(n, **cohort),
+        grades=students.grade_distribution(**cohort),
+        roll=roll,
+        rank=students.rank(roll, **cohort) if roll else None,
+        values={field: students.values_of(field) for field in cohort},
+        grade_order=grade_order(),
+    )
+
+# Exam cell analytics: per-subject statistics and grade distributions
+@route("/analytics")
+@login_required # ONLY FACULTY CAN ACCESS
+def analytics():
+    """Dashboard for a branch/section/year (blank = everyone); ?format=json for the raw numbers."""
+    cohort = {field: request.args.get(field) or None for field in ("branch", "section", "year")}
+    stats = cohort_analytics(students, **cohort)
+    if request.args.get("format") == "json":
+        return jsonify(stats)
+    grades_shown = [grade for grade in grade_order() if any(grade in row["grades"] for row in stats["grades"])]
+    return render_template("analytics.html", cohort=cohort, stats=stats, pass_mark=PASS_MARK,
+                           bins=HISTOGRAM_BINS, grades_shown=grades_shown,
+                           values={field: students.values_of(field) for field in cohort})
+
+# Search by name/roll with branch/section/year/grade facets
+@route("/search")
+@login_required # ONLY FACULTY CAN ACCESS
+def search_students():
+    """?q= partial name or roll words, narrowed by ?branch=&section=&year=&grade=, paged like /results."""
+    query = request.args.get("q", "").strip()
+    facets = {field: request.args.get(field) or None for field in SEARCH_FACETS}
+    try:
+        page, limit = page_args(request.args)
+    except ValueError:
+        page, limit = 1, RESULTS_PAGE_SIZE
+    offset = (page - 1) * limit
+    version = students.data_version()
+    found, total, counts = students.search(query, offset, limit, **facets)
+    return render_template("search.html", query=query, facets=facets, counts=counts, total=total,
+                           rows=[Markup(student_row(s, version)) for s in found], offset=offset,
+                           page=page, pages=max((total + limit - 1) // limit, 1), limit=limit)
+
+# Mark sheet / report card export
+@route("/export/<fmt>")
+@login_required # ONLY FACULTY CAN ACCESS
+def export_results(fmt):
+    """Class mark sheet as CSV/XLSX, or a zip of PDF report cards, for ?branch=&section=&year=."""
+    from controllers.export_results import EXPORTERS, stream_csv
+    cohort = {field: request.args.get(field) or None for field in ("branch", "section", "year")}
+    name = "_".join(["results"] + [value for value in cohort.values() if value])
+    if fmt == "csv":
+        # Rows go from the store straight into the response as they are read
+        return Response(stream_with_context(stream_csv(students.iter_students(**cohort))), mimetype="text/csv",
+                        headers={"Content-Disposition": f'attachment; filename="{name}.csv"'})
+    if fmt not in EXPORTERS:
+        flash(f"Unknown export format '{fmt}'.", "danger")
+        return redirect(url_for("view_results"))
+    # Spreadsheets and report cards take a while for big classes: build them in the background
+    prune_job_files(JOB_FILES_DIR, JOB_FILE_MAX_AGE)
+    job_id = submit_job("export", export_job, fmt, cohort, name)
+    flash(f"Preparing {name}{EXPORTERS[fmt][1]}; it can be downloaded here when ready.", "info")
+    return redirect(url_for("job_status", job_id=job_id))
+
 # View results - PROTECTED
-@app.route("/results")
+@route("/results")
 @login_required # ONLY FACULTY CAN ACCESS
 def view_results():
-    """Displays the main results table. Requires faculty login."""
-    table_rows = []
-    
-    # Process flash messages to display professional alerts
-    flash_html = ""
-    for category, message in session.pop('_flashes', []):
-        if category == 'danger':
-             flash_html += f"<div style='background:#f8d7da; color:#721c24; border:1px solid #f5c6cb; padding:10px; margin-bottom:10px; border-radius:5px; text-align:center;'>{message}</div>"
-        else: # success/info
-             flash_html += f"<div style='background:#d4edda; color:#155724; border:1px solid #c3e6cb; padding:10px; margin-bottom:10px; border-radius:5px; text-align:center;'>{message}</div>"
-        
-    for idx, s in enumerate(students, 1):
-        subject_details = "<ul style='margin:0;padding-left:16px; font-size: 0.9em;'>"
-        for sub in s["subjects"]:
-            subject_details += f"<li>{sub['name']}: {sub['obtained']}/{sub['total']}</li>"
-        subject_details += "</ul>" if s["subjects"] else "None"
-        
-        # Determine professional color for grade display
-        grade_color = "red" if s['grade'] == 'F' else "#008000" if s['grade'] in ['O', 'E'] else "#ffaa00"
-
-        table_rows.append(
-            f"<tr><td>{idx}</td><td>{s['roll']}</td><td>{s['name']}</td><td>{subject_details}</td>"
-            f"<td>{s['percentage']}% <span style='font-weight:bold; color:{grade_color};'>({s['grade']})</span><br>"
-            f"<a href='/edit/{s['roll']}' style='color:#003366; font-weight:bold;'>Edit Records</a></td></tr>"
-        )
-
-    return render_template_string(f"""
-<html>
-<head>
-    <title>Student Results - Faculty Control</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; background: #f4f7f8; text-align: center; padding: 20px; }}
-        table {{ border-collapse: collapse; width: 95%; margin: 20px auto; background: white; box-shadow: 0 0 20px rgba(0,0,0,0.05); }}
-        th, td {{ border: 1px solid #ddd; padding: 12px; text-align: left; vertical-align: top; }}
-        th {{ background: #003366; color: white; }}
-        tr:nth-child(even) {{ background: #f9f9f9; }}
-        ul {{ margin: 0; padding-left: 20px; list-style-type: disc; }}
-        a.button, input[type=submit] {{ background: #003366; color: white; padding: 10px 18px; border-radius: 5px; border: none; margin: 5px; text-decoration: none; cursor: pointer; display: inline-block; font-weight: bold; }}
-        a.button:hover, input[type=submit]:hover {{ background: #0055a5; }}
-        .emergency-btn {{ background: #cc0000 !important; }}
-        .emergency-btn:hover {{ background: #990000 !important; }}
-    </style>
-</head>
-<body>
-    <h2>🔐 Faculty Control Panel: Student Results</h2>
-    {flash_html}
-    <form method="POST" action="/restart" onsubmit="return confirm('ARE YOU SURE? Emergency Restart will permanently delete ALL current student data.')">
-        <input type="submit" value="⚠ EMERGENCY RESTART" class="emergency-btn">
-    </form>
-    <table>
-        <tr><th>Sr. No.</th><th>Roll</th><th>Name</th><th>Subjects (Obtained/Total)</th><th>Percentage & Grade / Action</th></tr>
-        {''.join(table_rows)}
-    </table>
-    <a class="button" href='/home'>⬅ Back Home</a>
-</body>
-</html>
-""")
+    """Displays the main results table. Requires faculty login.
+
+    Supports ?page=N&limit=M pagination; ?stream=1 streams every row as it
+    renders instead of building the whole page in memory.
+    """
+    total = len(students)
+    if request.args.get("stream") == "1":
+        # Rows are rendered lazily by the template generator, so the page is never held in
+        # memory; they come from a snapshot, so writes while it streams cannot break the loop
+        return stream_template("view_result.html", students=students.iter_students(), offset=0,
+                               page=1, pages=1, limit=total, total=total)
+
+    try:
+        page, limit = page_args(request.args)
+    except ValueError:
+        page, limit = 1, RESULTS_PAGE_SIZE
+    pages = max((total + limit - 1) // limit, 1)
+    page = min(page, pages)
+    offset = (page - 1) * limit
+
+    # Read once, before rendering: rows read from a store that has moved on since
+    # are cached under this older version, which no later request will ask for
+    version = students.data_version()
+
+    def render_rows():
+        page_students = list(students.page(offset, limit))
+        rows = "".join(f"<tr><td>{idx}</td>{student_row(s, version)}</tr>"
+                       for idx, s in enumerate(page_students, offset + 1))
+        tags = {"results"} | {s["roll"] for s in page_students}
+        return rows, tags
+
+    entry = page_cache.get(("results", page, limit), version)
+    if entry is None:
+        rows, tags = render_rows()
+        if students.data_version() == version:
+            entry = page_cache.set(("results", page, limit), rows, version, tags)
+        else:
+            entry = CacheEntry(rows, version, frozenset(tags))  # a write landed mid-render: serve, don't keep
+
+    # The pager is part of the page too, so it goes into the ETag
+    etag = hashlib.md5(f"{entry.etag}:{page}:{pages}:{total}".encode()).hexdigest()
+    # Flash messages are rendered around the cached rows on every request
+    return conditional_response(entry, lambda: render_template(
+        "view_result.html", table_body=Markup(entry.value), offset=offset,
+        page=page, pages=pages, limit=limit, total=total), etag)
 
 # --- Application Runner ---
 if __name__ == "__main__":
     # 3. Ensures the server only runs once, preventing the "opens twice" issue.
     # We keep debug=True for convenience during development.
-    app.run(debug=True, use_reloader=False)
\ No newline at end of file
+    create_app().run(debug=True, use_reloader=False)
\ No newline at end of file
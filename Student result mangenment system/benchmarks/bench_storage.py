@@ -0,0 +1,141 @@
+"""Micro-benchmarks for the student stores, aggregation and validation.
+
+Runs against a scratch database, never the real one:
+
+    python -m benchmarks.bench_storage --sizes 1000,10000,100000 --json bench.json
+    python -m benchmarks.bench_storage --baseline bench.json   # exit 1 on a >25% p50 slowdown
+
+Sizes up to 1000000 work but the SQLite load alone then takes minutes.
+"""
+import argparse
+import atexit
+import os
+import random
+import shutil
+import sys
+import tempfile
+from itertools import islice
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+_scratch = tempfile.mkdtemp(prefix="student-bench-")
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+os.environ["STUDENT_DB_PATH"] = os.path.join(_scratch, "bench.db")
+# Never journal synthetic students into a real durable memory store
+os.environ.pop("MEMORY_JOURNAL_DIR", None)
+
+from benchmarks.data import BRANCHES, make_mark_sheet_rows, make_students, roll_for
+from benchmarks.harness import add_output_arguments, finish, measure
+from controllers.analytics import cohort_analytics, grade_distribution, overall_statistics, subject_statistics
+from controllers.calculate_result import calculate_student_result, compute_results, summarize_marks
+from controllers.import_results import validate_chunk
+from controllers.summary import rebuild_summaries
+from database.database import connect_db
+from models.student_store import open_store
+from utils.grading import DEFAULT_SCHEME
+
+# Students written per upsert_many call while loading
+LOAD_BATCH = 1000
+
+
+def load(store, n, subjects):
+    """Fill the store with n scored students; returns the load benchmark."""
+    students = make_students(n, subjects)
+    batches = iter(lambda: list(islice(students, LOAD_BATCH)), [])
+
+    def write_batch():
+        batch = next(batches)
+        for student in batch:
+            summary = summarize_marks(student["subjects"])
+            student.update(percentage=summary["percentage"], grade=summary["grade"])
+        store.upsert_many(batch)
+
+    return measure(write_batch, (n + LOAD_BATCH - 1) // LOAD_BATCH, ops_per_call=LOAD_BATCH)
+
+
+def store_benchmarks(store, n, rng):
+    rolls = [roll_for(rng.randrange(n)) for _ in range(1000)]
+    pick = iter(rolls * 1000).__next__
+    pages = max(n // 50, 1)
+    return {
+        "get": measure(lambda: store.get(pick()), 1000),
+        "get_many(500)": measure(lambda: store.get_many(rolls[:500]), 20, ops_per_call=500),
+        "page(50)": measure(lambda: list(store.page(rng.randrange(pages) * 50, 50)), 200),
+        "find(branch)": measure(lambda: store.find(branch=rng.choice(BRANCHES)), 10),
+        "count()": measure(store.count, 100),
+        "top(10, branch)": measure(lambda: store.top(10, branch=rng.choice(BRANCHES)), 200),
+        "rank(roll)": measure(lambda: store.rank(pick()), 500),
+        "grade_distribution()": measure(store.grade_distribution, 100),
+        "regrade(all)": measure(lambda: store.regrade(DEFAULT_SCHEME), 3, ops_per_call=n),
+        **analytics_benchmarks(store, rng),
+    }
+
+
+def analytics_benchmarks(store, rng):
+    """Building the columnar snapshot once, then statistics over it."""
+    results = {"columns() snapshot": measure(store.columns, 1)}
+    columns = store.columns()
+
+    def everything(mask=None):
+        overall_statistics(columns, mask)
+        subject_statistics(columns, mask)
+        grade_distribution(columns, mask)
+    results["analytics(all)"] = measure(everything, 20)
+    results["analytics(branch)"] = measure(lambda: everything(columns.cohort_mask(branch=rng.choice(BRANCHES))), 20)
+    results["cohort_analytics(cached)"] = measure(lambda: cohort_analytics(store), 1000)
+    return results
+
+
+def aggregation_benchmarks(n, rng):
+    """The SQL aggregation path (results / student_summary tables)."""
+    ids = [sid for (sid,) in connect_db().execute("SELECT id FROM students")]
+    sample = rng.sample(ids, min(500, len(ids)))
+    pick = iter(sample * 1000).__next__
+    return {
+        "calculate_student_result": measure(lambda: calculate_student_result(pick()), 500),
+        "compute_results(500 ids)": measure(lambda: compute_results(sample), 20, ops_per_call=len(sample)),
+        "compute_results(all)": measure(compute_results, 3, ops_per_call=n),
+        "rebuild_summaries": measure(rebuild_summaries, 1, ops_per_call=n),
+    }
+
+
+def validation_benchmarks(rng):
+    rows = list(enumerate(make_mark_sheet_rows(10000, [roll_for(i) for i in range(1000)]), 2))
+    chunks = [rows[i:i + 1000] for i in range(0, len(rows), 1000)]
+    pick = iter(chunks * 100).__next__
+    students = list(make_students(1000, seed=1))
+    return {
+        "validate_chunk(1000 rows)": measure(lambda: validate_chunk(pick()), 20, ops_per_call=1000),
+        "summarize_marks": measure(lambda: summarize_marks(rng.choice(students)["subjects"]), 5000),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the storage and aggregation layer.")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma separated student counts (default 1000,10000,100000)")
+    parser.add_argument("--backends", default="memory,sqlite")
+    parser.add_argument("--subjects", default="3,8", help="min,max subjects per student (default 3,8)")
+    add_output_arguments(parser)
+    args = parser.parse_args(argv)
+    subjects = tuple(int(x) for x in args.subjects.split(","))
+
+    rng = random.Random(42)
+    results = validation_benchmarks(rng)
+    for n in (int(size) for size in args.sizes.split(",")):
+        for backend in args.backends.split(","):
+            store = open_store(backend)
+            store.clear()
+            print(f"Loading {n} students into the {backend} store...", file=sys.stderr)
+            results[f"{backend} n={n} upsert_many"] = load(store, n, subjects)
+            for name, result in store_benchmarks(store, n, rng).items():
+                results[f"{backend} n={n} {name}"] = result
+            if backend == "sqlite":
+                for name, result in aggregation_benchmarks(n, rng).items():
+                    results[f"sqlite n={n} {name}"] = result
+            store.clear()
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""Synthetic students and mark sheets for benchmarks and load tests."""
+import random
+
+BRANCHES = ("CSE", "ECE", "EEE", "MECH", "CIVIL", "AGRI")
+SECTIONS = ("A", "B", "C", "D")
+YEARS = ("1", "2", "3", "4")
+SUBJECTS = ("Mathematics", "Physics", "Chemistry", "English", "Programming", "Data Structures",
+            "Electronics", "Mechanics", "Thermodynamics", "Biology", "Economics", "Statistics")
+
+
+def roll_for(i):
+    return f"R{i:07d}"
+
+
+def make_student(i, rng, subjects=(3, 8)):
+    """One validated-shape student record (percentage/grade not yet scored)."""
+    names = rng.sample(SUBJECTS, rng.randint(*subjects))
+    marks = []
+    for name in names:
+        total = rng.choice((50, 100, 100, 100))
+        # Roughly bell-shaped marks, so every grade band gets students
+        obtained = min(max(round(rng.gauss(0.68, 0.16) * total), 0), total)
+        marks.append({"name": name, "obtained": obtained, "total": total})
+    return {
+        "name": f"Student {i}",
+        "roll": roll_for(i),
+        "branch": rng.choice(BRANCHES),
+        "section": rng.choice(SECTIONS),
+        "year": rng.choice(YEARS),
+        "subjects": marks,
+    }
+
+
+def make_students(n, subjects=(3, 8), seed=0):
+    """Yield n synthetic students (rolls R0000000, R0000001, ...); same seed, same data."""
+    rng = random.Random(seed)
+    for i in range(n):
+        yield make_student(i, rng, subjects)
+
+
+def make_mark_sheet_rows(n, rolls, seed=0):
+    """Yield n raw import rows {"roll", "subject", "mark", "total"} as strings, ~1% invalid."""
+    rng = random.Random(seed)
+    for _ in range(n):
+        mark = str(rng.randint(0, 100)) if rng.random() > 0.01 else "absent"
+        yield {"roll": rng.choice(rolls), "subject": rng.choice(SUBJECTS),
+               "mark": mark, "total": "100"}
@@ -0,0 +1,81 @@
+"""Timing, percentile reporting and baseline comparison shared by the benchmarks."""
+import json
+import math
+import time
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+def summarize(samples, elapsed=None, ops_per_sample=1):
+    """Latency percentiles (ms) and throughput (ops/s) for a list of per-call durations in seconds."""
+    samples = sorted(samples)
+    elapsed = elapsed if elapsed is not None else sum(samples)
+    return {
+        "count": len(samples) * ops_per_sample,
+        "mean_ms": 1000 * sum(samples) / len(samples) / ops_per_sample if samples else 0.0,
+        "p50_ms": 1000 * percentile(samples, 50) / ops_per_sample,
+        "p90_ms": 1000 * percentile(samples, 90) / ops_per_sample,
+        "p99_ms": 1000 * percentile(samples, 99) / ops_per_sample,
+        "max_ms": 1000 * (samples[-1] if samples else 0.0) / ops_per_sample,
+        "ops_per_s": len(samples) * ops_per_sample / elapsed if elapsed else 0.0,
+    }
+
+
+def measure(fn, repeat, ops_per_call=1):
+    """Call fn() `repeat` times and summarize; ops_per_call scales batch calls to per-item figures."""
+    samples = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, time.perf_counter() - start, ops_per_call)
+
+
+def print_table(results):
+    print(f"{'benchmark':<44}{'count':>9}{'mean ms':>11}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+          f"{'max ms':>10}{'ops/s':>12}")
+    for name, r in results.items():
+        print(f"{name:<44}{r['count']:>9}{r['mean_ms']:>11.4f}{r['p50_ms']:>10.4f}{r['p90_ms']:>10.4f}"
+              f"{r['p99_ms']:>10.4f}{r['max_ms']:>10.4f}{r['ops_per_s']:>12.1f}")
+
+
+def save_results(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(results, path, tolerance):
+    """Names of benchmarks whose p50 got more than `tolerance` (0.25 = 25%) slower than the baseline file."""
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, r in results.items():
+        before = baseline.get(name)
+        if before and before["p50_ms"] > 0 and r["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(name)
+            print(f"REGRESSION {name}: p50 {before['p50_ms']:.4f} ms -> {r['p50_ms']:.4f} ms")
+    return regressions
+
+
+def add_output_arguments(parser):
+    parser.add_argument("--json", metavar="PATH", help="also write the results to a JSON file")
+    parser.add_argument("--baseline", metavar="PATH", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed p50 slowdown against the baseline before failing (default 0.25)")
+
+
+def finish(results, args):
+    """Print, save and compare results; returns the process exit code (1 on regressions)."""
+    print_table(results)
+    if args.json:
+        save_results(results, args.json)
+    if args.baseline and compare_to_baseline(results, args.baseline, args.tolerance):
+        return 1
+    return 0
@@ -0,0 +1,201 @@
+"""Local load test of the web portal: latency percentiles and throughput per route.
+
+By default the app runs in-process behind Flask's test client on a scratch
+database seeded with synthetic students. With --url it drives an already
+running server instead (gunicorn, waitress, app.run ...), which measures the
+real WSGI stack but uses whatever data that server has:
+
+    python -m benchmarks.loadtest --students 10000 --threads 8 --requests 4000
+    STORAGE_BACKEND=memory python -m benchmarks.loadtest --json load.json
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 --rolls R0000000,R0000001
+"""
+import argparse
+import atexit
+import http.cookiejar
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from itertools import islice
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from benchmarks.data import make_students, roll_for
+from benchmarks.harness import add_output_arguments, finish, summarize
+
+# Share of requests per scenario (faculty pages, public lookups, edits)
+SCENARIOS = (
+    ("GET /results", 25),
+    ("GET /result/<roll>", 35),
+    ("GET /api/result/<roll>", 20),
+    ("GET /rankings", 10),
+    ("POST /submit_student", 10),
+)
+FACULTY_EMAIL = "loadtest@cutm.ac.in"
+
+
+class TestClientSession:
+    """One simulated user on the in-process app."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.client.post("/login", data={"email": FACULTY_EMAIL})
+
+    def get(self, path):
+        return self.client.get(path).status_code
+
+    def post(self, path, data):
+        return self.client.post(path, data=data).status_code
+
+
+class HttpSession:
+    """One simulated user against a running server, with its own cookie jar."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+                                                  _NoRedirect())
+        self.post("/login", {"email": FACULTY_EMAIL})
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, data):
+        return self._open(urllib.request.Request(self.base_url + path,
+                                                 data=urllib.parse.urlencode(data).encode()))
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Time each request on its own; a redirect is a successful answer here
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def edit_form(student, rng):
+    form = {field: student[field] for field in ("name", "roll", "branch", "section", "year")}
+    form["num_subjects"] = len(student["subjects"])
+    for i, sub in enumerate(student["subjects"], 1):
+        form.update({f"subject_{i}": sub["name"], f"marks_{i}": rng.randint(0, sub["total"]),
+                     f"total_{i}": sub["total"]})
+    return form
+
+
+def run_user(session, rolls, sample_students, count, seed, timings, errors, lock):
+    rng = random.Random(seed)
+    names = [name for name, _ in SCENARIOS]
+    weights = [weight for _, weight in SCENARIOS]
+    pages = max(len(rolls) // 50, 1)
+    local = defaultdict(list)
+    failed = defaultdict(int)
+    for scenario in rng.choices(names, weights, k=count):
+        roll = rng.choice(rolls)
+        t0 = time.perf_counter()
+        if scenario == "GET /results":
+            status = session.get(f"/results?page={rng.randint(1, pages)}")
+        elif scenario == "GET /result/<roll>":
+            status = session.get(f"/result/{roll}")
+        elif scenario == "GET /api/result/<roll>":
+            status = session.get(f"/api/result/{roll}")
+        elif scenario == "GET /rankings":
+            status = session.get(f"/rankings?roll={roll}")
+        else:
+            status = session.post("/submit_student", edit_form(rng.choice(sample_students), rng))
+        local[scenario].append(time.perf_counter() - t0)
+        if status >= 400 and not (status == 404 and "<roll>" in scenario):
+            failed[scenario] += 1
+    with lock:
+        for scenario, samples in local.items():
+            timings[scenario].extend(samples)
+        for scenario, n in failed.items():
+            errors[scenario] += n
+
+
+def seed_app(n, subjects):
+    """Import the app against a scratch database and fill its store; returns (app, sample students)."""
+    scratch = tempfile.mkdtemp(prefix="student-load-")
+    atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+    os.environ["STUDENT_DB_PATH"] = os.path.join(scratch, "load.db")
+    # The store is cleared and refilled below: never do that to a real durable memory store
+    os.environ.pop("MEMORY_JOURNAL_DIR", None)
+    sys.path.insert(0, os.path.join(BASE_DIR, "app"))
+    from app import create_app, prewarm
+    from controllers.calculate_result import summarize_marks
+
+    app = create_app()
+    prewarm(app)
+    store = app.extensions["student_store"]
+    store.clear()
+    students = make_students(n, subjects)
+    sample = []
+    while True:
+        batch = list(islice(students, 1000))
+        if not batch:
+            break
+        for student in batch:
+            summary = summarize_marks(student["subjects"])
+            student.update(percentage=summary["percentage"], grade=summary["grade"])
+        store.upsert_many(batch)
+        sample.extend(batch[:20])
+    for cache in app.extensions["page_caches"]:
+        cache.clear()
+    return app, sample[:1000]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the web portal and report latency percentiles.")
+    parser.add_argument("--students", type=int, default=10000, help="synthetic students to seed (default 10000)")
+    parser.add_argument("--subjects", default="3,8", help="min,max subjects per student (default 3,8)")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent simulated users (default 4)")
+    parser.add_argument("--requests", type=int, default=2000, help="total requests (default 2000)")
+    parser.add_argument("--url", help="load test a running server instead of the in-process test client")
+    parser.add_argument("--rolls", help="--url mode: comma separated rolls that exist on that server")
+    add_output_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        rolls = args.rolls.split(",") if args.rolls else [roll_for(i) for i in range(args.students)]
+        sample = list(islice(make_students(args.students, tuple(int(x) for x in args.subjects.split(","))), 1000))
+        sessions = [HttpSession(args.url) for _ in range(args.threads)]
+    else:
+        print(f"Seeding {args.students} students...", file=sys.stderr)
+        app, sample = seed_app(args.students, tuple(int(x) for x in args.subjects.split(",")))
+        rolls = [roll_for(i) for i in range(args.students)]
+        sessions = [TestClientSession(app) for _ in range(args.threads)]
+
+    timings, errors, lock = defaultdict(list), defaultdict(int), threading.Lock()
+    per_thread = args.requests // args.threads
+    threads = [threading.Thread(target=run_user, args=(session, rolls, sample, per_thread, i, timings, errors, lock))
+               for i, session in enumerate(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    results = {scenario: summarize(samples, elapsed) for scenario, samples in sorted(timings.items())}
+    results["all requests"] = summarize([t for samples in timings.values() for t in samples], elapsed)
+    for scenario, n in sorted(errors.items()):
+        print(f"{scenario}: {n} failed requests", file=sys.stderr)
+    code = finish(results, args)
+    return code or (1 if errors else 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,61 @@
-DB_PATH = "database/students.db"
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# STUDENT_DB_PATH points the app at another database file (e.g. a scratch one for benchmarks)
+DB_PATH = os.environ.get("STUDENT_DB_PATH") or os.path.join(BASE_DIR, "database", "students.db")
+
+# Where the web portal keeps student records: "sqlite" (shared by every worker
+# process, survives restarts) or "memory" (single process, lost on restart
+# unless MEMORY_JOURNAL_DIR is set)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "sqlite")
+
+# Durable memory store: with MEMORY_JOURNAL_DIR set, every write to the memory
+# backend is appended to a journal there and fsynced before the request returns;
+# writes arriving within JOURNAL_COMMIT_DELAY_MS of each other share one fsync.
+# After SNAPSHOT_JOURNAL_BYTES of journal the records are written to a binary
+# snapshot and the journal is started afresh. Startup loads the snapshot and
+# replays the journal after it. One worker process only.
+MEMORY_JOURNAL_DIR = os.environ.get("MEMORY_JOURNAL_DIR")
+JOURNAL_COMMIT_DELAY_MS = 0
+SNAPSHOT_JOURNAL_BYTES = 16 * 1024 * 1024
+
+# /results pagination
+RESULTS_PAGE_SIZE = 50
+RESULTS_MAX_PAGE_SIZE = 500
+
+# Rendered results pages and per-student rows kept per worker (LRU entries)
+RESULTS_CACHE_SIZE = 2048
+
+# Public roll-number lookup: rolls kept in each worker's read cache, and how long
+# browsers/proxies may reuse a response without asking again (seconds)
+PUBLIC_CACHE_SIZE = 100000
+PUBLIC_MAX_AGE = 60
+
+# Bulk result import
+IMPORT_BATCH_SIZE = 1000
+
+# JSON API (/api/...): callers either log in as faculty or send
+# "Authorization: Bearer <API_TOKEN>". Unset means session login only.
+API_TOKEN = os.environ.get("API_TOKEN")
+API_MAX_BATCH = 5000
+
+# Exports: worker processes for PDF report cards (None = one per CPU core)
+# and how many students each worker renders per task
+EXPORT_WORKERS = None
+EXPORT_PDF_CHUNK = 50
+
+# Background jobs: concurrent jobs per worker process, where uploads waiting
+# to be imported and finished exports are kept, and for how long (seconds)
+JOB_WORKERS = 2
+JOB_FILES_DIR = os.path.join(BASE_DIR, "database", "job_files")
+JOB_FILE_MAX_AGE = 24 * 60 * 60
+
+# Opt-in instrumentation (METRICS_ENABLED=1): per-route latency, SQL and template
+# timings and cache hit rates on /metrics (Prometheus format; set METRICS_TOKEN to
+# require "Authorization: Bearer <token>"). A PROFILE_SAMPLE_RATE share of requests
+# is run under cProfile and dumped to PROFILE_DIR when slower than PROFILE_SLOW_MS.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED") == "1"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = 500
+PROFILE_DIR = os.path.join(BASE_DIR, "database", "profiles")
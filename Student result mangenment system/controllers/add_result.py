@@ -1,17 +1,16 @@
-from database.database import connect_db
+from controllers.grading import grade_summaries
+from controllers.import_results import UPSERT_RESULT_SQL
+from database.database import subject_id, transaction
 from utils.validation import validate_mark
 
-def add_result(student_id, subject, mark):
+def add_result(student_id, subject, mark, total=100):
     try:
-        validate_mark(mark)
+        validate_mark(mark, total)
     except ValueError as e:
         print(e)
         return
     
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO results (student_id, subject, mark) VALUES (?, ?, ?)",
-                   (student_id, subject, mark))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute(UPSERT_RESULT_SQL, (student_id, subject_id(conn, subject), mark, total))
+        grade_summaries(conn, [student_id])
     print(f"Result for student ID {student_id} added successfully!")
@@ -1,5 +1,4 @@
-import sqlite3
-from database.database import connect_db
+from database.database import transaction
 from utils.validation import validate_name
 
 def add_student(name):
@@ -9,9 +8,6 @@ def add_student(name):
         print(e)
         return
     
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO students (name) VALUES (?)", (name,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("INSERT INTO students (name) VALUES (?)", (name,))
     print(f"Student {name} added successfully!")
@@ -1,15 +1,49 @@
-# controllers/subject_controller.py
-from flask import Blueprint, render_template, request, redirect, url_for
-from util.validation import valide_subject
+# controllers/add_subject.py
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+from utils.auth import login_required
 
+# The subject catalog: list/add subjects, and the autocomplete behind the marks forms
 subject_bp = Blueprint('subject', __name__)
 
-@subject_bp.route("/add_subject", methods=["GET", "POST"])
+# Most suggestions the autocomplete endpoint returns
+COMPLETE_MAX_LIMIT = 50
+
+
+def _catalog():
+    # The active store's catalog: the subjects table for SQLite, its own for the memory store
+    return current_app.extensions["student_store"].subjects
+
+
+@subject_bp.route("/subjects", methods=["GET", "POST"])
+@login_required
 def add_subject_route():
+    catalog = _catalog()
     if request.method == "POST":
-        name = request.form["subject_name"]
-        add_subject(name)
+        name = request.form.get("subject_name") or ""
+        try:
+            known = catalog.id_of(name)
+            sid = catalog.add(name)
+        except ValueError as e:
+            flash(f"Input Error: {e}", "danger")
+        else:
+            if known is None:
+                flash(f"Subject {catalog.name_of(sid)} added.", "success")
+            else:
+                flash(f"{catalog.name_of(sid)} is already in the catalog.", "info")
         return redirect(url_for('subject.add_subject_route'))
-    
-    all_subjects = get_all_subjects()
-    return render_template("add_subject.html", subjects=all_subjects)
+    return render_template("add_subject.html", subjects=catalog.all())
+
+
+@subject_bp.route("/subjects/complete")
+@login_required
+def complete_subject():
+    """Autocomplete: [{"id", "name"}] of subjects with a word starting with ?q=."""
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), COMPLETE_MAX_LIMIT)
+    except ValueError:
+        limit = 10
+    matches = _catalog().complete(request.args.get("q", ""), limit)
+    response = jsonify([{"id": sid, "name": name} for sid, name in matches])
+    response.cache_control.private = True
+    response.cache_control.max_age = 30
+    return response
@@ -0,0 +1,169 @@
+"""Per-subject statistics and grade distributions over every result.
+
+Works on the store's ColumnarResults snapshot, which the store rebuilds
+only after a write. With numpy every figure comes from whole-column
+operations: bincount gives per-subject counts, sums and sums of squares
+(mean, std dev, pass rate) and the histograms, one lexsort gives the
+medians, and one bincount over combined codes cross-tabulates grades by
+branch and section. Results are cached per snapshot, so a repeat view
+costs one dict lookup. Without numpy the same numbers come from plain
+loops.
+"""
+import math
+import weakref
+from statistics import median
+from models.columnar import np
+from utils.grading import GRADE_SCALE
+
+# A paper is passed at the lowest passing band of the default scale (50%)
+PASS_MARK = min(minimum for minimum, _ in GRADE_SCALE)
+# Histogram of marks in 10% steps: 0-10, 10-20, ..., 90-100
+HISTOGRAM_BINS = 10
+
+# ColumnarResults snapshot -> {cohort: analytics}; entries go with their snapshot
+_cache = weakref.WeakKeyDictionary()
+
+
+def cohort_analytics(store, branch=None, section=None, year=None):
+    """Statistics for a cohort (every student by default), cached until the store changes.
+
+    Returns {"students", "mean", "median", "pass_rate", "subjects", "grades"}:
+    see subject_statistics() and grade_distribution() for the last two.
+    """
+    columns = store.columns()
+    results = _cache.setdefault(columns, {})
+    key = (branch, section, year)
+    if key not in results:
+        mask = columns.cohort_mask(branch=branch, section=section, year=year)
+        results[key] = {
+            **overall_statistics(columns, mask),
+            "subjects": subject_statistics(columns, mask),
+            "grades": grade_distribution(columns, mask),
+        }
+    return results[key]
+
+
+def _result_mask(columns, mask):
+    # Per-student mask -> per-result mask
+    if mask is None:
+        return None
+    if np is not None:
+        return mask[columns.column("student")]
+    return [mask[s] for s in columns.student]
+
+
+def overall_statistics(columns, mask=None):
+    """Students, mean/median percentage and share of students with a passing percentage."""
+    if np is not None:
+        percentage = columns.column("percentage")
+        if mask is not None:
+            percentage = percentage[mask]
+        if not len(percentage):
+            return {"students": 0, "mean": 0.0, "median": 0.0, "pass_rate": 0.0}
+        return {"students": int(len(percentage)), "mean": round(float(percentage.mean()), 2),
+                "median": round(float(np.median(percentage)), 2),
+                "pass_rate": round(100 * float((percentage >= PASS_MARK).mean()), 2)}
+    percentage = [p for i, p in enumerate(columns.percentage) if mask is None or mask[i]]
+    if not percentage:
+        return {"students": 0, "mean": 0.0, "median": 0.0, "pass_rate": 0.0}
+    return {"students": len(percentage), "mean": round(sum(percentage) / len(percentage), 2),
+            "median": round(median(percentage), 2),
+            "pass_rate": round(100 * sum(p >= PASS_MARK for p in percentage) / len(percentage), 2)}
+
+
+def subject_statistics(columns, mask=None, pass_mark=PASS_MARK, bins=HISTOGRAM_BINS):
+    """Per subject, on each paper's percentage: results, mean, median, std dev, min, max,
+    pass rate (% of results at or above pass_mark) and a histogram of `bins` counts.
+
+    Returns a list of dicts sorted by subject name; subjects without results are left out.
+    """
+    names = columns.subject_names
+    if np is None:
+        return _subject_statistics_loop(columns, mask, pass_mark, bins)
+    keep = _result_mask(columns, mask)
+    subject = columns.column("subject")
+    percentage = 100 * columns.column("obtained") / columns.column("total")
+    if keep is not None:
+        subject, percentage = subject[keep], percentage[keep]
+    n = len(names)
+    counts = np.bincount(subject, minlength=n)
+    sums = np.bincount(subject, weights=percentage, minlength=n)
+    squares = np.bincount(subject, weights=percentage * percentage, minlength=n)
+    passed = np.bincount(subject, weights=percentage >= pass_mark, minlength=n)
+    bucket = np.clip((percentage * bins / 100).astype(np.int64), 0, bins - 1)
+    histograms = np.bincount(subject.astype(np.int64) * bins + bucket, minlength=n * bins).reshape(n, bins)
+
+    # Sorted by (subject, percentage): each subject is one run, its median the middle of the run.
+    # Percentages are at most 100, so one float sort of subject * 128 + percentage does it
+    # (far quicker than lexsort) and subtracting the offsets again gives the percentages.
+    keys = np.sort(subject * 128.0 + percentage)
+    ordered = keys - np.repeat(np.arange(n) * 128.0, counts)
+    starts = np.cumsum(counts) - counts
+    present = np.flatnonzero(counts)
+    c, start = counts[present], starts[present]
+    medians = (ordered[start + (c - 1) // 2] + ordered[start + c // 2]) / 2
+    means = sums[present] / c
+    stds = np.sqrt(np.maximum(squares[present] / c - means * means, 0))
+
+    stats = [_subject_row(names[i], int(c[k]), float(means[k]), float(medians[k]), float(stds[k]),
+                          float(ordered[start[k]]), float(ordered[start[k] + c[k] - 1]), int(passed[i]),
+                          histograms[i].tolist())
+             for k, i in enumerate(present)]
+    return sorted(stats, key=lambda row: row["subject"].casefold())
+
+
+def _subject_statistics_loop(columns, mask, pass_mark, bins):
+    keep = _result_mask(columns, mask)
+    marks = {}
+    for j, (s, obtained, total) in enumerate(zip(columns.subject, columns.obtained, columns.total)):
+        if keep is None or keep[j]:
+            marks.setdefault(s, []).append(100 * obtained / total)
+    stats = []
+    for s, values in marks.items():
+        values.sort()
+        mean = sum(values) / len(values)
+        std = math.sqrt(max(sum(v * v for v in values) / len(values) - mean * mean, 0))
+        histogram = [0] * bins
+        for v in values:
+            histogram[min(max(int(v * bins / 100), 0), bins - 1)] += 1
+        stats.append(_subject_row(columns.subject_names[s], len(values), mean, median(values), std, values[0],
+                                  values[-1], sum(v >= pass_mark for v in values), histogram))
+    return sorted(stats, key=lambda row: row["subject"].casefold())
+
+
+def _subject_row(name, count, mean, median_, std, lowest, highest, passed, histogram):
+    return {"subject": name, "results": count, "mean": round(mean, 2), "median": round(median_, 2),
+            "std": round(std, 2), "min": round(lowest, 2), "max": round(highest, 2),
+            "pass_rate": round(100 * passed / count, 2), "histogram": histogram}
+
+
+def grade_distribution(columns, mask=None):
+    """Students per grade for each (branch, section): [{"branch", "section", "total", "grades": {grade: n}}]."""
+    branches, sections = columns.categories["branch"], columns.categories["section"]
+    grade_names = sorted(set(columns.grades), key=str)
+    if np is None:
+        table = {}
+        for i, grade in enumerate(columns.grades):
+            if mask is None or mask[i]:
+                key = (columns.cohort["branch"][i], columns.cohort["section"][i])
+                cell = table.setdefault(key, {})
+                cell[grade] = cell.get(grade, 0) + 1
+        cells = sorted(table.items(), key=lambda item: (branches[item[0][0]], sections[item[0][1]]))
+        return [{"branch": branches[b], "section": sections[s], "total": sum(grades.values()), "grades": grades}
+                for (b, s), grades in cells]
+
+    if not columns.grades:
+        return []
+    grade_codes = np.searchsorted(np.array(grade_names, dtype=object), np.array(columns.grades, dtype=object))
+    branch, section = columns.column("branch").astype(np.int64), columns.column("section").astype(np.int64)
+    if mask is not None:
+        grade_codes, branch, section = grade_codes[mask], branch[mask], section[mask]
+    shape = (len(branches), len(sections), len(grade_names))
+    table = np.bincount((branch * shape[1] + section) * shape[2] + grade_codes,
+                        minlength=shape[0] * shape[1] * shape[2]).reshape(shape)
+    rows = []
+    for b, s in zip(*np.nonzero(table.sum(axis=2))):
+        counts = table[b, s]
+        rows.append({"branch": branches[b], "section": sections[s], "total": int(counts.sum()),
+                     "grades": {grade_names[g]: int(counts[g]) for g in np.flatnonzero(counts)}})
+    return sorted(rows, key=lambda row: (row["branch"], row["section"]))
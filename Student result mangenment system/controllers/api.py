@@ -0,0 +1,121 @@
+# controllers/api.py
+import hmac
+from functools import wraps
+from flask import Blueprint, current_app, jsonify, request, session
+from config.config import API_MAX_BATCH, API_TOKEN
+from controllers.calculate_result import score_students
+from models.search import SEARCH_FACETS
+from utils.pagination import page_args
+from utils.validation import validate_students
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+
+def _store():
+    return current_app.extensions["student_store"]
+
+
+def _invalidate(*tags):
+    for cache in current_app.extensions["page_caches"]:
+        cache.invalidate(*tags)
+
+
+def api_auth_required(f):
+    """Allow logged-in faculty, or integrations presenting the configured API token."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        auth = request.headers.get("Authorization", "")
+        token_ok = API_TOKEN and auth.startswith("Bearer ") and hmac.compare_digest(auth[7:], API_TOKEN)
+        if not token_ok and session.get("logged_in") != True:
+            return jsonify(error="Authentication required"), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _json_list(key):
+    """The list under `key` in the request body (or the body itself if it is a list)."""
+    body = request.get_json(silent=True)
+    items = body.get(key) if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        return None, (jsonify(error=f"Expected a JSON list or {{\"{key}\": [...]}}"), 400)
+    if len(items) > API_MAX_BATCH:
+        return None, (jsonify(error=f"At most {API_MAX_BATCH} {key} per request"), 413)
+    return items, None
+
+
+@api_bp.route("/students", methods=["POST"])
+@api_auth_required
+def upsert_students():
+    """Bulk upsert: {"students": [{name, roll, branch, section, year, subjects: [...]}, ...]}.
+
+    Records are validated like the add/edit forms. Valid ones are written in
+    one batch; invalid ones are reported by index and do not stop the rest.
+    """
+    items, error = _json_list("students")
+    if error:
+        return error
+
+    valid, problems = validate_students(items)
+    errors = [{"index": index, "roll": items[index].get("roll") if isinstance(items[index], dict) else None,
+               "error": message} for index, message in problems]
+
+    created = updated = 0
+    if valid:
+        # One grading scheme lookup per program/year in the batch, not per student
+        flags = _store().upsert_many(score_students(valid))
+        created = sum(flags)
+        updated = len(flags) - created
+        if created:
+            _invalidate("results")
+        _invalidate(*(s["roll"] for s, is_new in zip(valid, flags) if not is_new))
+    return jsonify(created=created, updated=updated, errors=errors), 400 if errors and not valid else 200
+
+
+@api_bp.route("/students/fetch", methods=["POST"])
+@api_auth_required
+def fetch_students():
+    """Bulk fetch: {"rolls": [...]} -> {"students": [...], "missing": [...]}."""
+    rolls, error = _json_list("rolls")
+    if error:
+        return error
+    rolls = [str(roll) for roll in rolls]
+    found = _store().get_many(rolls)
+    return jsonify(students=[found[roll] for roll in rolls if roll in found],
+                   missing=[roll for roll in rolls if roll not in found])
+
+
+@api_bp.route("/students", methods=["GET"])
+@api_auth_required
+def list_students():
+    """Filtered listing: ?branch=&section=&year=&page=&limit=."""
+    filters = {field: request.args.get(field) or None for field in ("branch", "section", "year")}
+    try:
+        page, limit = page_args(request.args)
+    except ValueError:
+        return jsonify(error="page and limit must be whole numbers"), 400
+    store = _store()
+    return jsonify(students=list(store.page((page - 1) * limit, limit, **filters)), page=page, limit=limit,
+                   total=store.count(**filters))
+
+
+@api_bp.route("/search", methods=["GET"])
+@api_auth_required
+def search_students():
+    """Search: ?q=&branch=&section=&year=&grade=&page=&limit= -> matches plus facet counts."""
+    query = request.args.get("q", "")
+    facets = {field: request.args.get(field) or None for field in SEARCH_FACETS}
+    try:
+        page, limit = page_args(request.args)
+    except ValueError:
+        return jsonify(error="page and limit must be whole numbers"), 400
+    found, total, counts = _store().search(query, (page - 1) * limit, limit, **facets)
+    return jsonify(students=found, page=page, limit=limit, total=total, facets=counts)
+
+
+@api_bp.route("/students/<roll>", methods=["GET"])
+@api_auth_required
+def get_student(roll):
+    student = _store().get(roll)
+    if student is None:
+        return jsonify(error=f"Student with Roll No. {roll} not found"), 404
+    return jsonify(student)
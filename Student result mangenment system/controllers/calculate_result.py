@@ -1,22 +1,100 @@
+import json
 from database.database import connect_db
+from controllers.grading import scheme_for
+from utils.grading import DEFAULT_SCHEME, grade_sql
+
+# Totals, percentage and grade for every student in one grouped pass over
+# results. Used to rebuild and verify the student_summary table.
+AGGREGATE_SQL = f"""
+    SELECT student_id,
+           SUM(mark) AS obtained,
+           SUM(total) AS possible,
+           COUNT(*) AS subjects,
+           ROUND(100.0 * SUM(mark) / SUM(total), 2) AS percentage,
+           {grade_sql("ROUND(100.0 * SUM(mark) / SUM(total), 2)")} AS grade
+    FROM results
+    {{where}}
+    GROUP BY student_id
+    ORDER BY student_id
+"""
+
+
+def summarize_marks(subjects, scheme=DEFAULT_SCHEME):
+    """Totals, percentage and grade for one student's [{"obtained", "total"}, ...] marks."""
+    obtained = sum(sub["obtained"] for sub in subjects)
+    possible = sum(sub["total"] for sub in subjects)
+    percentage = round((obtained / possible) * 100, 2) if possible else 0
+    return {
+        "obtained": obtained,
+        "possible": possible,
+        "subjects": len(subjects),
+        "percentage": percentage,
+        "grade": scheme.lookup(percentage),
+    }
+
+
+SUMMARY_COLUMNS = ("student_id", "obtained", "possible", "subjects", "percentage", "grade")
+
+_SUMMARY_SQL = f"""
+    SELECT {", ".join(SUMMARY_COLUMNS)}
+    FROM student_summary
+    {{where}}
+    ORDER BY student_id
+"""
+
+
+def score_student(student, scheme=None):
+    """Set a student record's percentage and grade from its subject marks.
+
+    The grade follows the grading scheme assigned to the student's program/year
+    (pass `scheme` when the caller has already looked it up).
+    """
+    if scheme is None:
+        scheme = scheme_for(student.get("branch"), student.get("year"))
+    summary = summarize_marks(student["subjects"], scheme)
+    student["percentage"] = summary["percentage"]
+    student["grade"] = summary["grade"]
+    return student
+
+
+def score_students(students):
+    """score_student for a batch, looking up each program/year's scheme once. Returns the list."""
+    students = list(students)
+    schemes = {}
+    for student in students:
+        cohort = (student.get("branch"), student.get("year"))
+        if cohort not in schemes:
+            schemes[cohort] = scheme_for(*cohort)
+        score_student(student, schemes[cohort])
+    return students
+
+
+def compute_results(student_ids=None):
+    """Totals, percentages and grades for many students.
+
+    Read straight from the student_summary table, which triggers on results
+    keep current. `student_ids` limits the report to a class (any iterable
+    of ids); None means every student with results. Returns a list of dicts
+    ordered by id.
+    """
+    conn = connect_db()
+    if student_ids is None:
+        rows = conn.execute(_SUMMARY_SQL.format(where=""))
+    else:
+        # Pass the id list as one JSON parameter instead of one placeholder per id
+        rows = conn.execute(_SUMMARY_SQL.format(where="WHERE student_id IN (SELECT value FROM json_each(?))"),
+                            (json.dumps(list(student_ids)),))
+    return [dict(zip(SUMMARY_COLUMNS, row)) for row in rows]
+
 
 def calculate_student_result(student_id):
+    """One student's marks per subject plus totals, or None if they have no results."""
     conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT subject, mark FROM results WHERE student_id = ?", (student_id,))
-    results = cursor.fetchall()
-    conn.close()
-    
+    results = conn.execute("""SELECT s.name, r.mark, r.total FROM results r JOIN subjects s ON s.id = r.subject_id
+                              WHERE r.student_id = ?""", (student_id,)).fetchall()
     if not results:
-        print("No results found for this student.")
-        return
-    
-    total = sum(mark for subject, mark in results)
-    percentage = total / len(results)
-    
-    print(f"Student ID: {student_id}")
-    print("Results:")
-    for subject, mark in results:
-        print(f"{subject}: {mark}")
-    print(f"Total Marks: {total}")
-    print(f"Percentage: {percentage:.2f}%")
+        return None
+
+    summary = compute_results([student_id])[0]
+    summary["marks"] = [{"subject": name, "mark": mark, "total": total} for name, mark, total in results]
+    return summary
@@ -0,0 +1,189 @@
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from config.config import EXPORT_PDF_CHUNK, EXPORT_WORKERS
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX export is optional
+    Workbook = None
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+except ImportError:  # PDF report cards are optional
+    canvas = None
+
+HEADER = ["Roll", "Name", "Branch", "Section", "Year", "Subject", "Obtained", "Total", "Percentage", "Grade"]
+
+# Rows are buffered this many at a time before a CSV chunk is sent
+CSV_FLUSH_ROWS = 500
+
+
+def mark_sheet_rows(students):
+    """One row per student and subject (students without marks get one row)."""
+    for s in students:
+        base = [s["roll"], s["name"], s["branch"], s["section"], s["year"]]
+        tail = [s["percentage"], s["grade"]]
+        if not s["subjects"]:
+            yield base + ["", "", ""] + tail
+        for sub in s["subjects"]:
+            yield base + [sub["name"], sub["obtained"], sub["total"]] + tail
+
+
+def stream_csv(students):
+    """Yield the mark sheet as CSV text chunks; memory use does not grow with the class size."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for count, row in enumerate(mark_sheet_rows(students), 1):
+        writer.writerow(row)
+        if count % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_xlsx(students, path, progress=None):
+    """Write the mark sheet to an .xlsx file using openpyxl's streaming (write-only) mode.
+
+    `progress(done)` is called every CSV_FLUSH_ROWS students.
+    """
+    if Workbook is None:
+        raise RuntimeError("XLSX export needs the openpyxl package (pip install openpyxl).")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Mark Sheet")
+    sheet.append(HEADER)
+    for done, student in enumerate(students, 1):
+        for row in mark_sheet_rows([student]):
+            sheet.append(row)
+        if progress is not None and done % CSV_FLUSH_ROWS == 0:
+            progress(done)
+    workbook.save(path)
+
+
+def render_report_card(student):
+    """PDF bytes of one student's report card."""
+    out = io.BytesIO()
+    pdf = canvas.Canvas(out, pagesize=A4)
+    width, height = A4
+    y = height - 60
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.drawCentredString(width / 2, y, "Centurion University of Technology And Management")
+    y -= 24
+    pdf.setFont("Helvetica", 12)
+    pdf.drawCentredString(width / 2, y, "Student Report Card")
+    y -= 40
+    for label, value in (("Name", student["name"]), ("Roll No.", student["roll"]), ("Branch", student["branch"]),
+                         ("Section", student["section"]), ("Year", student["year"])):
+        pdf.drawString(60, y, f"{label}: {value}")
+        y -= 18
+    y -= 12
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.drawString(60, y, "Subject")
+    pdf.drawString(320, y, "Obtained")
+    pdf.drawString(420, y, "Total")
+    pdf.setFont("Helvetica", 12)
+    for sub in student["subjects"]:
+        y -= 18
+        if y < 80:
+            pdf.showPage()
+            pdf.setFont("Helvetica", 12)
+            y = height - 60
+        pdf.drawString(60, y, str(sub["name"]))
+        pdf.drawString(320, y, str(sub["obtained"]))
+        pdf.drawString(420, y, str(sub["total"]))
+    y -= 36
+    pdf.setFont("Helvetica-Bold", 13)
+    pdf.drawString(60, y, f"Percentage: {student['percentage']}%    Grade: {student['grade']}")
+    pdf.save()
+    return out.getvalue()
+
+
+def _render_chunk(students):
+    # Runs in a worker process
+    return [(s["roll"], render_report_card(s)) for s in students]
+
+
+def write_report_cards(students, path, progress=None, workers=EXPORT_WORKERS, chunk_size=EXPORT_PDF_CHUNK):
+    """Render one PDF per student into a zip file, spread across worker processes.
+
+    Students are handed out in chunks and only a couple of chunks per worker
+    are in flight at once, so memory stays bounded for any class size.
+    `progress(done)` is called after each chunk is written. Workers are
+    spawned fresh rather than forked, so they don't inherit the job thread's
+    locks or the pooled database connections.
+    """
+    if canvas is None:
+        raise RuntimeError("PDF export needs the reportlab package (pip install reportlab).")
+    workers = workers or os.cpu_count() or 1
+    students = iter(students)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        done = 0
+        while True:
+            while len(pending) < workers * 2:
+                chunk = list(islice(students, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_render_chunk, chunk))
+            if not pending:
+                break
+            for roll, pdf in pending.popleft().result():
+                archive.writestr(f"report_card_{roll}.pdf", pdf)
+                done += 1
+            if progress is not None:
+                progress(done)
+
+
+EXPORTERS = {
+    "xlsx": (write_xlsx, ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "pdf": (write_report_cards, ".zip", "application/zip"),
+}
+
+
+def export_to_tempfile(students, fmt, directory=None, progress=None):
+    """Run a file-based exporter into a temporary file and return its path (caller removes it)."""
+    writer, suffix, _ = EXPORTERS[fmt]
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    os.close(fd)
+    try:
+        writer(students, path, progress=progress)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def main(argv=None):
+    from config.config import STORAGE_BACKEND
+    from models.student_store import open_store
+
+    parser = argparse.ArgumentParser(description="Export class mark sheets or report cards.")
+    parser.add_argument("format", choices=("csv", "xlsx", "pdf"))
+    parser.add_argument("output", help="output file (pdf writes a zip of report cards)")
+    for field in ("branch", "section", "year"):
+        parser.add_argument(f"--{field}")
+    args = parser.parse_args(argv)
+
+    students = open_store(STORAGE_BACKEND).iter_students(branch=args.branch, section=args.section, year=args.year)
+    if args.format == "csv":
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            for chunk in stream_csv(students):
+                f.write(chunk)
+    else:
+        EXPORTERS[args.format][0](students, args.output)
+    print(f"Exported {args.format} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
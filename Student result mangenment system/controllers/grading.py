@@ -0,0 +1,177 @@
+import argparse
+import json
+from functools import lru_cache
+from itertools import groupby
+from database.database import connect_db, transaction
+from utils.grading import DEFAULT_SCHEME, GradingScheme
+
+_SCHEME_COLUMNS = "s.name, s.kind, s.bands, s.fail_grade, s.pass_mark"
+
+
+@lru_cache(maxsize=256)
+def _compile(name, kind, bands, fail_grade, pass_mark):
+    # Rows are plain strings/numbers, so each distinct scheme is compiled once per process
+    return GradingScheme(name, json.loads(bands), fail_grade, kind, pass_mark)
+
+
+def save_scheme(scheme):
+    """Create or replace a grading scheme by name."""
+    with transaction() as conn:
+        conn.execute("""INSERT INTO grading_schemes (name, kind, bands, fail_grade, pass_mark) VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(name) DO UPDATE SET kind = excluded.kind, bands = excluded.bands,
+                                                        fail_grade = excluded.fail_grade,
+                                                        pass_mark = excluded.pass_mark""",
+                     (scheme.name, scheme.kind, json.dumps(scheme.bands), scheme.fail_grade, scheme.pass_mark))
+    return scheme
+
+
+def load_scheme(name):
+    row = connect_db().execute(f"SELECT {_SCHEME_COLUMNS} FROM grading_schemes s WHERE s.name = ?",
+                               (name,)).fetchone()
+    return _compile(*row) if row else None
+
+
+def list_schemes():
+    rows = connect_db().execute(f"SELECT {_SCHEME_COLUMNS} FROM grading_schemes s ORDER BY s.name")
+    return [_compile(*row) for row in rows]
+
+
+def list_assignments():
+    """[{"branch", "year", "scheme"}, ...]; an empty branch/year applies to every branch/year."""
+    rows = connect_db().execute("""SELECT a.branch, a.year, s.name FROM grading_assignments a
+                                   JOIN grading_schemes s ON s.id = a.scheme_id ORDER BY a.branch, a.year""")
+    return [{"branch": branch, "year": year, "scheme": name} for branch, year, name in rows]
+
+
+def scheme_for(branch=None, year=None):
+    """The absolute scheme new marks in a program/year are graded on.
+
+    The most specific assignment wins (branch and year, then branch, then
+    year, then the catch-all); with none, the default CUTM scale. Curved
+    cohorts are graded on the cutoffs their last regrade produced.
+    """
+    row = connect_db().execute(
+        f"""SELECT {_SCHEME_COLUMNS}, a.curve FROM grading_assignments a
+            JOIN grading_schemes s ON s.id = a.scheme_id
+            WHERE a.branch IN (?, '') AND a.year IN (?, '')
+            ORDER BY a.branch = '', a.year = '' LIMIT 1""", (branch or "", year or "")).fetchone()
+    if row is None:
+        return DEFAULT_SCHEME
+    name, kind, bands, fail_grade, pass_mark, curve = row
+    if kind == "relative":
+        if not curve or curve == "[]":
+            return DEFAULT_SCHEME
+        return _compile(name, "absolute", curve, fail_grade, None)
+    return _compile(name, kind, bands, fail_grade, pass_mark)
+
+
+def grade_summaries(conn, student_ids=None):
+    """Re-grade student_summary rows under each student's assigned scheme. Returns rows changed.
+
+    The results triggers grade on the default scale, so call this in the
+    same transaction after writing results. `student_ids` limits it to the
+    students written (None: everyone); each program/year's scheme is looked
+    up once.
+    """
+    where, params = "", ()
+    if student_ids is not None:
+        where, params = "WHERE sm.student_id IN (SELECT value FROM json_each(?))", (json.dumps(list(student_ids)),)
+    rows = conn.execute(f"""SELECT st.branch, st.year, sm.student_id, sm.percentage, sm.grade
+                             FROM student_summary sm JOIN students st ON st.id = sm.student_id
+                             {where} ORDER BY st.branch, st.year""", params)
+    changed = []
+    for (branch, year), group in groupby(rows, key=lambda row: row[:2]):
+        scheme = scheme_for(branch, year)
+        if scheme is DEFAULT_SCHEME:
+            continue  # already what the triggers wrote
+        group = list(group)
+        grades = scheme.grade_all([percentage for *_, percentage, _ in group])
+        changed += [(grade, sid) for grade, (_, _, sid, _, old) in zip(grades, group) if grade != old]
+    conn.executemany("UPDATE student_summary SET grade = ? WHERE student_id = ?", changed)
+    return len(changed)
+
+
+def _rank(branch, year):
+    # scheme_for's precedence: lower sorts first and wins
+    return (branch == "", year == "")
+
+
+def regrade_cohort(store, name, branch=None, year=None):
+    """Assign scheme `name` to a program/year and regrade the stored results it governs.
+
+    Students covered by a more specific assignment (say CSE year 2 inside
+    all of CSE) keep their own scheme and are left out. The grades are
+    computed in one pass and written back in one batch by the store, in the
+    same transaction as the assignment. Returns the number of students regraded.
+    """
+    scheme = load_scheme(name)
+    if scheme is None:
+        raise ValueError(f"No grading scheme named '{name}'")
+    target = _rank(branch or "", year or "")
+    narrower = [(a["branch"], a["year"]) for a in list_assignments() if _rank(a["branch"], a["year"]) < target]
+    with transaction() as conn:
+        percentages, grades = store.regrade(scheme, branch=branch, year=year, exclude=narrower)
+        curve = scheme.curve(percentages, grades) if scheme.kind == "relative" else None
+        conn.execute("""INSERT INTO grading_assignments (branch, year, scheme_id, curve)
+                        SELECT ?, ?, id, ? FROM grading_schemes WHERE name = ?
+                        ON CONFLICT(branch, year) DO UPDATE SET scheme_id = excluded.scheme_id,
+                                                                curve = excluded.curve""",
+                     (branch or "", year or "", json.dumps(curve.bands) if curve else None, name))
+    return len(grades)
+
+
+def parse_bands(text):
+    """Parse "90:O, 85:E, 80:A" into [(90.0, "O"), (85.0, "E"), (80.0, "A")]."""
+    bands = []
+    for part in text.replace("\n", ",").split(","):
+        if not part.strip():
+            continue
+        minimum, sep, grade = part.partition(":")
+        try:
+            bands.append((float(minimum), grade.strip()))
+        except ValueError:
+            raise ValueError(f"Grade band '{part.strip()}' should look like 90:O") from None
+        if not sep:
+            raise ValueError(f"Grade band '{part.strip()}' should look like 90:O")
+    if not bands:
+        raise ValueError("A grading scheme needs at least one grade band")
+    return bands
+
+
+def main(argv=None):
+    from config.config import STORAGE_BACKEND
+    from models.student_store import open_store
+
+    parser = argparse.ArgumentParser(description="Manage grading schemes and regrade cohorts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show schemes and which cohorts use them")
+    add = commands.add_parser("add", help="create or replace a scheme")
+    add.add_argument("name")
+    add.add_argument("bands", help='e.g. "90:O, 80:A, 60:B, 40:C"')
+    add.add_argument("--relative", action="store_true", help="bands are cohort percentiles (curve grading)")
+    add.add_argument("--fail-grade", default="F")
+    add.add_argument("--pass-mark", type=float, help="relative schemes: fail anyone below this percentage")
+    regrade = commands.add_parser("regrade", help="grade a program/year under a scheme")
+    regrade.add_argument("name")
+    regrade.add_argument("--branch")
+    regrade.add_argument("--year")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for scheme in list_schemes():
+            bands = ", ".join(f"{minimum:g}:{grade}" for minimum, grade in scheme.bands)
+            print(f"{scheme.name} ({scheme.kind}): {bands}, else {scheme.fail_grade}")
+        for assignment in list_assignments():
+            print(f"  {assignment['branch'] or 'all branches'} / year {assignment['year'] or 'any'}"
+                  f" -> {assignment['scheme']}")
+    elif args.command == "add":
+        save_scheme(GradingScheme(args.name, parse_bands(args.bands), args.fail_grade,
+                                  "relative" if args.relative else "absolute", args.pass_mark))
+        print(f"Saved grading scheme {args.name}.")
+    else:
+        count = regrade_cohort(open_store(STORAGE_BACKEND), args.name, args.branch, args.year)
+        print(f"Regraded {count} students under {args.name}.")
+
+
+if __name__ == "__main__":
+    main()
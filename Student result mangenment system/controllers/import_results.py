@@ -0,0 +1,232 @@
+import argparse
+import csv
+import json
+from itertools import chain, islice
+from config.config import IMPORT_BATCH_SIZE
+from controllers.calculate_result import score_students
+from controllers.grading import grade_summaries
+from database.database import subject_id, transaction
+from models.subject import subject_key
+from utils.validation import (MAX_MARK, flagged_rows, mark_errors, parse_int_column, validate_mark,
+                              whole_number)
+
+FIELDS = ("roll", "subject", "mark")
+
+# Sets one student's mark in one subject: a subject they already have is updated, not added twice
+UPSERT_RESULT_SQL = """INSERT INTO results (student_id, subject_id, mark, total) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(student_id, subject_id) DO UPDATE SET mark = excluded.mark, total = excluded.total"""
+
+
+def iter_rows(file, fmt):
+    """Yield (line_no, row_dict) from a CSV or JSON mark sheet without loading it whole.
+
+    CSV needs a header with roll, subject, mark. JSON is read as JSON
+    Lines (one object per line); a top-level JSON array is also accepted but
+    has to be parsed in one go.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(file)
+        # Line 1 is the header
+        for line_no, row in enumerate(reader, 2):
+            yield line_no, row
+    elif fmt == "json":
+        # Peek at the first non-blank character to tell an array from JSON Lines
+        skipped = 0
+        first = file.read(1)
+        while first.isspace():
+            skipped += first == "\n"
+            first = file.read(1)
+        if first == "[":
+            for line_no, row in enumerate(json.loads(first + file.read()), 1):
+                yield line_no, row
+            return
+        for line_no, line in enumerate(chain([first + file.readline()], file), skipped + 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+    else:
+        raise ValueError(f"Unsupported import format '{fmt}' (use csv or json)")
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def _total(row):
+    # Only a missing or blank total means 100; an explicit 0 is an error
+    total = row.get("total")
+    return 100 if total is None or _text(total) == "" else total
+
+
+def validate_row(row):
+    """Return a (roll, subject, mark, total) tuple or raise ValueError.
+
+    `total` (maximum marks) is optional and defaults to 100.
+    """
+    if isinstance(row, Exception):
+        raise ValueError(f"Invalid JSON: {row}")
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object with roll, subject and mark")
+    missing = [f for f in FIELDS if not _text(row.get(f))]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    try:
+        mark = whole_number(row["mark"])
+        total = whole_number(_total(row))
+    except ValueError:
+        raise ValueError("mark and total must be whole numbers") from None
+    if total <= 0:
+        raise ValueError("Total marks must be positive")
+    if total > MAX_MARK:
+        raise ValueError("Total marks are too large")
+    validate_mark(mark, total)
+    return _text(row["roll"]), _text(row["subject"]), mark, total
+
+
+def validate_chunk(chunk):
+    """Validate a chunk of (line_no, row) pairs column by column.
+
+    Numbers are parsed and range-checked for the whole chunk in one pass
+    (utils.validation.parse_int_column, mark_errors), so good rows never
+    raise. Only rows the masks flag go through validate_row, to get their
+    error message. Returns (valid, errors): (line_no, roll, subject, mark,
+    total) tuples and (line_no, message) pairs.
+    """
+    valid, errors, rows = [], [], []
+    for line_no, row in chunk:
+        if isinstance(row, dict):
+            rows.append((line_no, row))
+        else:
+            errors.append((line_no, _row_error(row)))
+
+    rolls = [_text(row.get("roll")) for _, row in rows]
+    subjects = [_text(row.get("subject")) for _, row in rows]
+    marks, bad_marks = parse_int_column([row.get("mark") for _, row in rows])
+    totals, bad_totals = parse_int_column([_total(row) for _, row in rows])
+    flagged = set(flagged_rows(bad_marks, bad_totals, mark_errors(marks, totals),
+                               [not roll for roll in rolls], [not subject for subject in subjects]))
+    # NumPy columns hold int64 scalars, which sqlite3 will not bind
+    marks, totals = list(map(int, marks)), list(map(int, totals))
+
+    for i, (line_no, row) in enumerate(rows):
+        if i in flagged:
+            errors.append((line_no, _row_error(row)))
+        else:
+            valid.append((line_no, rolls[i], subjects[i], marks[i], totals[i]))
+    errors.sort()
+    return valid, errors
+
+
+def _row_error(row):
+    try:
+        validate_row(row)
+    except ValueError as e:
+        return str(e)
+    return "Invalid row"
+
+
+def _unknown_roll(line_no, roll):
+    return line_no, f"No student with roll {roll}"
+
+
+def _write_to_database(valid):
+    """Upsert a chunk of valid rows into the results table. Returns (rows written, errors)."""
+    errors = []
+    with transaction() as conn:
+        rolls = json.dumps(sorted({roll for _, roll, *_ in valid}))
+        ids = dict(conn.execute("SELECT roll, id FROM students WHERE roll IN (SELECT value FROM json_each(?))",
+                                (rolls,)))
+        rows = []
+        for line_no, roll, subject, mark, total in valid:
+            if roll in ids:
+                rows.append((ids[roll], subject_id(conn, subject), mark, total))
+            else:
+                errors.append(_unknown_roll(line_no, roll))
+        conn.executemany(UPSERT_RESULT_SQL, rows)
+        grade_summaries(conn, {sid for sid, *_ in rows})
+    return len(rows), errors
+
+
+def _write_to_store(store, valid):
+    """Apply a chunk of valid rows to the students of an in-process store. Returns (rows written, errors)."""
+    errors, changed = [], {}
+    found = store.get_many({roll for _, roll, *_ in valid})
+    written = 0
+    for line_no, roll, subject, mark, total in valid:
+        student = changed.get(roll)
+        if student is None:
+            if roll not in found:
+                errors.append(_unknown_roll(line_no, roll))
+                continue
+            # A copy: stored records must not change behind the store's indexes
+            student = changed[roll] = found[roll].to_dict()
+        key = subject_key(subject)
+        for sub in student["subjects"]:
+            if subject_key(sub["name"]) == key:
+                sub.update(obtained=mark, total=total)
+                break
+        else:
+            student["subjects"].append({"name": subject, "obtained": mark, "total": total})
+        written += 1
+    if changed:
+        store.upsert_many(score_students(changed.values()))
+    return written, errors
+
+
+def import_results(file, fmt="csv", batch_size=IMPORT_BATCH_SIZE, on_batch=None, store=None):
+    """Stream a mark sheet into the students' results.
+
+    Each row sets one student's (by roll) mark in one subject: a subject they
+    already have is updated, a new one is added. Rows are validated a chunk
+    at a time (see validate_chunk); bad rows and unknown rolls are reported,
+    not fatal. For the SQLite database (store None or SqliteStudentStore)
+    each chunk is one executemany in one transaction; an in-process store
+    (the memory backend) gets one upsert_many per chunk instead, with the
+    students re-scored. `on_batch(report)` is called after every chunk
+    (background jobs use it for progress; raising from it stops the import).
+    Returns {"imported": count, "errors": [(line_no, message), ...]}.
+    """
+    in_database = store is None or store.shared_version() is not None
+    report = {"imported": 0, "errors": []}
+    rows = iter_rows(file, fmt)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+        valid, errors = validate_chunk(chunk)
+        if valid:
+            written, unknown = _write_to_database(valid) if in_database else _write_to_store(store, valid)
+            report["imported"] += written
+            errors = sorted(errors + unknown)
+        report["errors"].extend(errors)
+        if on_batch is not None:
+            on_batch(report)
+    return report
+
+
+def main(argv=None):
+    from config.config import MEMORY_JOURNAL_DIR, STORAGE_BACKEND
+    from models.student_store import open_store
+
+    parser = argparse.ArgumentParser(description="Bulk import results from a CSV or JSON mark sheet.")
+    parser.add_argument("path", help="CSV (roll,subject,mark[,total]) or JSON Lines file")
+    parser.add_argument("--format", choices=("csv", "json"), help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    if STORAGE_BACKEND == "memory" and not MEMORY_JOURNAL_DIR:
+        parser.error("the memory backend keeps students inside the web server; use its Import page")
+
+    fmt = args.format or ("json" if args.path.endswith((".json", ".jsonl")) else "csv")
+    with open(args.path, newline="", encoding="utf-8") as f:
+        report = import_results(f, fmt, args.batch_size, store=open_store(STORAGE_BACKEND))
+
+    for line_no, message in report["errors"]:
+        print(f"Line {line_no}: {message}")
+    print(f"Imported {report['imported']} results, {len(report['errors'])} rows rejected.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from database.database import connect_db, transaction
+
+logger = logging.getLogger(__name__)
+
+JOB_COLUMNS = ("id", "kind", "status", "progress", "message", "result", "pid", "created_at", "updated_at")
+FINISHED = ("done", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when a cancel was requested."""
+
+
+class JobContext:
+    """Handed to every job function: report progress and check for cancellation."""
+
+    # Progress is written to the jobs table at most this often (seconds)
+    PROGRESS_INTERVAL = 0.5
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last_write = 0
+
+    def progress(self, fraction, message=None):
+        """Record progress (0..1). Raises JobCancelled if the job was cancelled meanwhile."""
+        now = time.monotonic()
+        if now - self._last_write >= self.PROGRESS_INTERVAL or fraction >= 1:
+            self._last_write = now
+            with transaction() as conn:
+                conn.execute("UPDATE jobs SET progress = ?, message = COALESCE(?, message), updated_at = ? "
+                             "WHERE id = ?", (min(max(fraction, 0), 1), message, time.time(), self.job_id))
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        row = connect_db().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.job_id,)).fetchone()
+        if row and row[0]:
+            raise JobCancelled()
+
+
+class JobRunner:
+    """Runs heavy work (imports, recomputation, exports) off the request thread.
+
+    Jobs run on a bounded thread pool; their state lives in the jobs table so
+    any worker process can poll progress or cancel them. Job functions take
+    a JobContext first and return a JSON-serialisable result.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._pool = None
+        self._pid = None
+
+    def _executor(self):
+        # Started on first use, and again in a forked child: threads do not survive a fork
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            self._pid = os.getpid()
+        return self._pool
+
+    def submit(self, kind, fn, *args, **kwargs):
+        now = time.time()
+        with transaction() as conn:
+            job_id = conn.execute("INSERT INTO jobs (kind, status, progress, pid, created_at, updated_at) "
+                                  "VALUES (?, 'queued', 0, ?, ?, ?)", (kind, os.getpid(), now, now)).lastrowid
+        self._executor().submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        context = JobContext(job_id)
+        try:
+            context.check_cancelled()
+            self._set(job_id, status="running")
+            result = fn(context, *args, **kwargs)
+            self._set(job_id, status="done", progress=1, result=json.dumps(result))
+        except JobCancelled:
+            self._set(job_id, status="cancelled", message="Cancelled")
+        except Exception as e:
+            logger.exception("job %s failed", job_id)
+            self._set(job_id, status="failed", message=f"{type(e).__name__}: {e}")
+
+    @staticmethod
+    def _set(job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with transaction() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+
+    def shutdown(self, wait=True):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=wait)
+
+
+def get_job(job_id):
+    row = connect_db().execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _job_dict(row) if row else None
+
+
+def recent_jobs(limit=20):
+    rows = connect_db().execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+    return [_job_dict(row) for row in rows]
+
+
+def cancel_job(job_id):
+    """Ask a job to stop. Queued jobs stop before starting; running ones at their next progress call."""
+    with transaction() as conn:
+        conn.execute("UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status NOT IN "
+                     "('done', 'failed', 'cancelled')", (time.time(), job_id))
+    return get_job(job_id)
+
+
+def fail_interrupted_jobs():
+    """Mark queued/running jobs whose process no longer exists as failed (e.g. after a crash)."""
+    rows = connect_db().execute("SELECT id, pid FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+    dead = [job_id for job_id, pid in rows if pid != os.getpid() and not _process_alive(pid)]
+    if dead:
+        with transaction() as conn:
+            conn.executemany("UPDATE jobs SET status = 'failed', message = 'Interrupted (server restarted)' "
+                             "WHERE id = ?", [(job_id,) for job_id in dead])
+    return dead
+
+
+def prune_job_files(directory, max_age):
+    """Delete job uploads/exports older than max_age seconds. Returns how many were removed."""
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def _process_alive(pid):
+    if os.name == "nt":
+        return True  # os.kill would terminate the process on Windows; assume it is alive
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _job_dict(row):
+    job = dict(zip(JOB_COLUMNS, row))
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["finished"] = job["status"] in FINISHED
+    return job
@@ -0,0 +1,94 @@
+# controllers/metrics.py
+import hmac
+import time
+from flask import Blueprint, Response, current_app, g, jsonify, request
+from flask.signals import before_render_template, template_rendered
+from config.config import METRICS_TOKEN, PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS
+from utils import metrics
+
+# Registered only when METRICS_ENABLED is set: times every request, its SQL and
+# its templates, and serves the numbers on /metrics
+metrics_bp = Blueprint('metrics', __name__)
+
+_profiler = metrics.SlowRequestProfiler(PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS / 1000)
+
+
+def _route():
+    # The URL rule, not the path, so /result/<roll> is one series rather than one per roll
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+@metrics_bp.before_app_request
+def _start_request():
+    metrics.reset_query_count()
+    g.metrics_profiler = _profiler.start()
+    g.metrics_start = time.perf_counter()
+
+
+@metrics_bp.after_app_request
+def _finish_request(response):
+    start = g.pop("metrics_start", None)
+    if start is not None:
+        seconds = time.perf_counter() - start
+        route = _route()
+        metrics.REQUEST_LATENCY.observe(seconds, request.method, route, str(response.status_code))
+        metrics.REQUEST_QUERIES.observe(metrics.query_count(), request.method, route)
+        _stop_profiler(seconds, f"{request.method} {route}")
+    return response
+
+
+@metrics_bp.teardown_app_request
+def _teardown_request(exc):
+    # A request that failed before after_request still releases the profiler
+    _stop_profiler(0, "")
+
+
+def _stop_profiler(seconds, name):
+    profiler = g.pop("metrics_profiler", None)
+    if profiler is not None:
+        path = _profiler.stop(profiler, seconds, name)
+        if path:
+            current_app.logger.warning("Slow request %s took %.0f ms; profile saved to %s", name, seconds * 1000, path)
+
+
+def _template_started(sender, template, context, **extra):
+    g.setdefault("metrics_templates", []).append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    starts = g.get("metrics_templates")
+    if starts:
+        metrics.TEMPLATE_RENDER.observe(time.perf_counter() - starts.pop(), template.name or "<string>")
+
+
+@metrics_bp.record_once
+def _connect_template_signals(state):
+    before_render_template.connect(_template_started, state.app)
+    template_rendered.connect(_template_finished, state.app)
+
+
+def _cache_metrics():
+    caches = current_app.extensions.get("page_caches", ())
+    return [
+        ("response_cache_hits_total", "counter", "Response cache lookups served from the cache.",
+         [({"cache": cache.name}, cache.hits) for cache in caches]),
+        ("response_cache_misses_total", "counter", "Response cache lookups that had to render.",
+         [({"cache": cache.name}, cache.misses) for cache in caches]),
+        ("response_cache_hit_ratio", "gauge", "Share of response cache lookups that were hits.",
+         [({"cache": cache.name}, round(cache.hits / max(cache.hits + cache.misses, 1), 4)) for cache in caches]),
+        ("response_cache_entries", "gauge", "Entries currently held by each response cache.",
+         [({"cache": cache.name}, len(cache)) for cache in caches]),
+    ]
+
+
+metrics.REGISTRY.register_collector(_cache_metrics)
+
+
+@metrics_bp.route("/metrics")
+def prometheus_metrics():
+    """This worker's metrics in the Prometheus text exposition format."""
+    auth = request.headers.get("Authorization", "")
+    if METRICS_TOKEN and not (auth.startswith("Bearer ") and hmac.compare_digest(auth[7:], METRICS_TOKEN)):
+        return jsonify(error="Authentication required"), 401
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,48 @@
+import argparse
+from controllers.calculate_result import AGGREGATE_SQL, SUMMARY_COLUMNS
+from controllers.grading import grade_summaries
+from database.database import connect_db, transaction
+
+
+def verify_summaries():
+    """Compare student_summary with a full recomputation from results.
+
+    Returns the ids of students whose stored summary is missing, stale or
+    should not exist. Grades are left out: a cohort may be graded on its
+    own scheme rather than the default scale.
+    """
+    conn = connect_db()
+    expected = {row[0]: row[:-1] for row in conn.execute(AGGREGATE_SQL.format(where=""))}
+    stored = {row[0]: row[:-1] for row in conn.execute(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM student_summary")}
+    return sorted(sid for sid in expected.keys() | stored.keys() if expected.get(sid) != stored.get(sid))
+
+
+def rebuild_summaries():
+    """Recompute every student_summary row from scratch. Returns the row count.
+
+    Grades follow each cohort's assigned scheme; curved cohorts keep the
+    cutoffs of their last regrade (regrade them to re-fit the curve).
+    """
+    with transaction() as conn:
+        conn.execute("DELETE FROM student_summary")
+        conn.execute(f"INSERT INTO student_summary ({', '.join(SUMMARY_COLUMNS)}) {AGGREGATE_SQL.format(where='')}")
+        grade_summaries(conn)
+        return conn.execute("SELECT COUNT(*) FROM student_summary").fetchone()[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or rebuild the per-student summary table.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every summary row from results")
+    args = parser.parse_args(argv)
+
+    mismatched = verify_summaries()
+    if mismatched:
+        print(f"{len(mismatched)} student summaries out of date: {', '.join(map(str, mismatched[:20]))}")
+    else:
+        print("All student summaries match the results table.")
+    if args.rebuild:
+        print(f"Rebuilt {rebuild_summaries()} student summaries.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,138 @@
-import connect_db
-from config.config import DB_PATH
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from config.config import DB_PATH, METRICS_ENABLED
+from database.migrations import migrate
+from models.subject import catalog, subject_key, subject_label
+from utils.metrics import observe_query
+
+# One connection per thread (and per process, so forked workers never share a handle).
+# Opening a connection and running the pragmas below costs far more than the
+# queries themselves, so each thread keeps its connection for its whole life.
+_local = threading.local()
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",     # readers don't block the writer and vice versa
+    "PRAGMA synchronous = NORMAL",   # with WAL, fsync at checkpoints instead of every commit
+    "PRAGMA cache_size = -16000",    # ~16 MB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",    # wait for a concurrent writer instead of failing
+)
+
+# Size of sqlite3's per-connection prepared statement cache
+STATEMENT_CACHE_SIZE = 256
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection that reports every statement's duration to utils.metrics."""
+
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            observe_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            observe_query(sql, time.perf_counter() - start)
+
+
+# The schema is brought up to date by the first connection each process opens,
+# not at import time, so importing this module stays free of DDL
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def _open_connection():
+    global _schema_ready
+    conn = sqlite3.connect(DB_PATH, cached_statements=STATEMENT_CACHE_SIZE,
+                           factory=TimedConnection if METRICS_ENABLED else sqlite3.Connection)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                migrate(conn)
+                _schema_ready = True
+    return conn
+
 
 def connect_db():
-    return sqlite3.connect(DB_PATH)
+    """Return this thread's pooled connection. Callers must not close it."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid():
+        conn = _open_connection()
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
 
-def create_tables():
+
+def close_db():
+    """Close this thread's connection (e.g. when a worker thread exits)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = None
+    _local.new_subjects = None
+
+
+@contextmanager
+def transaction():
+    """Run a block of statements as one transaction on the pooled connection.
+
+    Commits on success and rolls back on error, so a batch of inserts costs a
+    single commit instead of one per row. A transaction() opened inside
+    another joins it: the outermost block commits or rolls back the lot.
+    """
     conn = connect_db()
-    cursor = conn.cursor()
-    
-    # Students table
-    cursor.execute('''CREATE TABLE IF NOT EXISTS students (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL
-                      )''')
-    
-    # Results table
-    cursor.execute('''CREATE TABLE IF NOT EXISTS results (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        student_id INTEGER,
-                        subject TEXT,
-                        mark INTEGER,
-                        FOREIGN KEY(student_id) REFERENCES students(id)
-                      )''')
-    
-    conn.commit()
-    conn.close()
-
-# Initialize DB tables
-create_tables()
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    committed = False
+    try:
+        yield conn
+        if not depth:
+            conn.commit()
+            committed = True
+    except BaseException:
+        if not depth:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth = depth
+        if not depth:
+            new_subjects, _local.new_subjects = getattr(_local, "new_subjects", None), None
+            if new_subjects and committed:
+                catalog.sync(conn)
+
+
+def subject_id(conn, name):
+    """Return the id for a subject name, adding it to the subjects table if new.
+
+    Names that differ only in case or spacing are one subject; the first
+    spelling stored is the one shown. Known subjects come from the shared
+    SubjectCatalog. New ones are remembered only until the transaction
+    ends: the catalog picks them up once they are committed, and a rollback
+    leaves nothing behind.
+    """
+    sid = catalog.id_of(name)
+    if sid is None:
+        key = subject_key(name)
+        new = getattr(_local, "new_subjects", None)
+        if new is None:
+            new = _local.new_subjects = {}
+        sid = new.get(key)
+        if sid is None:
+            conn.execute("INSERT OR IGNORE INTO subjects (name, key) VALUES (?, ?)", (subject_label(name), key))
+            sid = new[key] = conn.execute("SELECT id FROM subjects WHERE key = ?", (key,)).fetchone()[0]
+    return sid
+
+
+def create_tables():
+    """Create the schema, or upgrade an existing database in place."""
+    migrate(connect_db())
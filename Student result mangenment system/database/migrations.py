@@ -0,0 +1,275 @@
+"""Versioned schema migrations.
+
+The schema version is kept in SQLite's PRAGMA user_version. Each migration
+runs in its own transaction together with the version bump, so an existing
+database is upgraded in place and a failed step leaves it at the previous
+version. Add new steps to the end of MIGRATIONS; never edit a shipped one.
+"""
+import json
+import sqlite3
+from models.subject import subject_key
+from utils.grading import FAIL_GRADE, GRADE_SCALE, grade_sql
+
+
+def _initial_schema(conn):
+    # Students table
+    conn.execute('''CREATE TABLE IF NOT EXISTS students (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL
+                      )''')
+
+    # Results table
+    conn.execute('''CREATE TABLE IF NOT EXISTS results (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        student_id INTEGER,
+                        subject TEXT,
+                        mark INTEGER,
+                        FOREIGN KEY(student_id) REFERENCES students(id)
+                      )''')
+
+
+def _normalize_subjects(conn):
+    # Subject names are stored once and referenced by id
+    conn.execute('''CREATE TABLE subjects (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL UNIQUE
+                      )''')
+    conn.execute('''INSERT OR IGNORE INTO subjects (name)
+                    SELECT DISTINCT subject FROM results WHERE subject IS NOT NULL''')
+
+    conn.execute('''CREATE TABLE results_new (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        student_id INTEGER NOT NULL,
+                        subject_id INTEGER NOT NULL,
+                        mark INTEGER NOT NULL,
+                        FOREIGN KEY(student_id) REFERENCES students(id),
+                        FOREIGN KEY(subject_id) REFERENCES subjects(id)
+                      )''')
+    conn.execute('''INSERT INTO results_new (id, student_id, subject_id, mark)
+                    SELECT r.id, r.student_id, s.id, r.mark
+                    FROM results r JOIN subjects s ON s.name = r.subject
+                    WHERE r.student_id IS NOT NULL AND r.mark IS NOT NULL''')
+    conn.execute("DROP TABLE results")
+    conn.execute("ALTER TABLE results_new RENAME TO results")
+
+    # Per-student lookups, and per-subject mark ranges / statistics
+    conn.execute("CREATE INDEX idx_results_student_subject ON results (student_id, subject_id)")
+    conn.execute("CREATE INDEX idx_results_subject_mark ON results (subject_id, mark)")
+
+
+def _result_totals(conn):
+    # Maximum marks per result, so percentages no longer assume every paper is out of 100
+    conn.execute("ALTER TABLE results ADD COLUMN total INTEGER NOT NULL DEFAULT 100")
+
+
+_PERCENTAGE = "ROUND(100.0 * obtained / possible, 2)"
+
+
+def _refresh_summary(student):
+    # Recompute percentage/grade for one summary row after its sums changed
+    return (f"UPDATE student_summary SET percentage = {_PERCENTAGE}, grade = {grade_sql(_PERCENTAGE)} "
+            f"WHERE student_id = {student};")
+
+
+def _add_to_summary(row):
+    return f"""INSERT INTO student_summary (student_id, obtained, possible, subjects)
+               VALUES ({row}.student_id, {row}.mark, {row}.total, 1)
+               ON CONFLICT(student_id) DO UPDATE SET obtained = obtained + excluded.obtained,
+                                                     possible = possible + excluded.possible,
+                                                     subjects = subjects + 1;
+               {_refresh_summary(row + ".student_id")}"""
+
+
+def _remove_from_summary(row):
+    return f"""UPDATE student_summary SET obtained = obtained - {row}.mark,
+                                          possible = possible - {row}.total,
+                                          subjects = subjects - 1
+               WHERE student_id = {row}.student_id;
+               DELETE FROM student_summary WHERE student_id = {row}.student_id AND subjects <= 0;
+               {_refresh_summary(row + ".student_id")}"""
+
+
+def _student_summary(conn):
+    # Per-student totals kept up to date by triggers on results, so every
+    # insert/update/delete adjusts one summary row in the same transaction
+    conn.execute('''CREATE TABLE student_summary (
+                        student_id INTEGER PRIMARY KEY,
+                        obtained INTEGER NOT NULL,
+                        possible INTEGER NOT NULL,
+                        subjects INTEGER NOT NULL,
+                        percentage REAL,
+                        grade TEXT
+                      )''')
+    conn.execute("""INSERT INTO student_summary (student_id, obtained, possible, subjects)
+                     SELECT student_id, SUM(mark), SUM(total), COUNT(*) FROM results GROUP BY student_id""")
+    conn.execute(f"UPDATE student_summary SET percentage = {_PERCENTAGE}, grade = {grade_sql(_PERCENTAGE)}")
+
+    conn.execute(f"CREATE TRIGGER results_summary_insert AFTER INSERT ON results BEGIN {_add_to_summary('NEW')} END")
+    conn.execute(f"CREATE TRIGGER results_summary_delete AFTER DELETE ON results BEGIN {_remove_from_summary('OLD')} END")
+    conn.execute(f"""CREATE TRIGGER results_summary_update AFTER UPDATE OF student_id, mark, total ON results BEGIN
+                         {_remove_from_summary('OLD')}
+                         {_add_to_summary('NEW')}
+                     END""")
+
+
+def _summary_ranking_index(conn):
+    # Leaderboards read the top of this index; ranks count the entries above a percentage
+    conn.execute("CREATE INDEX idx_summary_percentage ON student_summary (percentage DESC, student_id)")
+
+
+def _student_details(conn):
+    # Roll number and cohort for the web portal's student records
+    conn.execute("ALTER TABLE students ADD COLUMN roll TEXT")
+    conn.execute("ALTER TABLE students ADD COLUMN branch TEXT")
+    conn.execute("ALTER TABLE students ADD COLUMN section TEXT")
+    conn.execute("ALTER TABLE students ADD COLUMN year TEXT")
+    conn.execute("CREATE UNIQUE INDEX idx_students_roll ON students (roll)")
+    conn.execute("CREATE INDEX idx_students_cohort ON students (branch, section, year)")
+    conn.execute("CREATE INDEX idx_students_year ON students (year)")
+
+
+def _data_version(conn):
+    # Bumped by every change to students or results, so per-process caches in
+    # other workers can tell their copies are stale with one primary-key read
+    conn.execute("CREATE TABLE data_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+    conn.execute("INSERT INTO data_version (id, version) VALUES (1, 0)")
+    for table in ("students", "results"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""CREATE TRIGGER {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                                 UPDATE data_version SET version = version + 1 WHERE id = 1;
+                             END""")
+
+
+def _jobs(conn):
+    # Background jobs (imports, recomputation, exports) and their progress
+    conn.execute('''CREATE TABLE jobs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        kind TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        progress REAL NOT NULL DEFAULT 0,
+                        message TEXT,
+                        result TEXT,
+                        cancel_requested INTEGER NOT NULL DEFAULT 0,
+                        pid INTEGER,
+                        created_at REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                      )''')
+    conn.execute("CREATE INDEX idx_jobs_status ON jobs (status)")
+
+
+def _grading_schemes(conn):
+    # Grading scales as data, and which program/year uses which ('' = any).
+    # curve holds the cutoffs a relative scheme produced at its last regrade.
+    conn.execute('''CREATE TABLE grading_schemes (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL UNIQUE,
+                        kind TEXT NOT NULL CHECK (kind IN ('absolute', 'relative')),
+                        bands TEXT NOT NULL,
+                        fail_grade TEXT NOT NULL,
+                        pass_mark REAL
+                      )''')
+    conn.execute('''CREATE TABLE grading_assignments (
+                        branch TEXT NOT NULL DEFAULT '',
+                        year TEXT NOT NULL DEFAULT '',
+                        scheme_id INTEGER NOT NULL REFERENCES grading_schemes(id),
+                        curve TEXT,
+                        PRIMARY KEY (branch, year)
+                      )''')
+    conn.execute("INSERT INTO grading_schemes (name, kind, bands, fail_grade) VALUES ('CUTM', 'absolute', ?, ?)",
+                 (json.dumps(GRADE_SCALE), FAIL_GRADE))
+
+
+def _subject_keys(conn):
+    # Case/space-insensitive subject names: "maths" and "Maths " become one
+    # subject (the oldest spelling wins) and results are moved onto its id
+    conn.execute("ALTER TABLE subjects ADD COLUMN key TEXT")
+    kept = {}
+    for sid, name in conn.execute("SELECT id, name FROM subjects ORDER BY id").fetchall():
+        key = subject_key(name)
+        if key in kept:
+            conn.execute("UPDATE results SET subject_id = ? WHERE subject_id = ?", (kept[key], sid))
+            conn.execute("DELETE FROM subjects WHERE id = ?", (sid,))
+        else:
+            kept[key] = sid
+            conn.execute("UPDATE subjects SET key = ? WHERE id = ?", (key, sid))
+    conn.execute("CREATE UNIQUE INDEX idx_subjects_key ON subjects (key)")
+
+
+def _student_search(conn):
+    # Full-text index over names and rolls for /search, kept in step with
+    # students by triggers. Prefix indexes make short "word*" queries cheap.
+    # Skipped if this SQLite lacks FTS5; search then falls back to LIKE.
+    conn.execute("CREATE INDEX idx_summary_grade ON student_summary (grade)")
+    try:
+        conn.execute("""CREATE VIRTUAL TABLE student_search USING fts5(
+                            name, roll, content='students', content_rowid='id', prefix='1 2 3'
+                        )""")
+    except sqlite3.OperationalError:
+        return
+    conn.execute("""CREATE TRIGGER students_search_insert AFTER INSERT ON students BEGIN
+                        INSERT INTO student_search (rowid, name, roll) VALUES (NEW.id, NEW.name, NEW.roll);
+                    END""")
+    conn.execute("""CREATE TRIGGER students_search_delete AFTER DELETE ON students BEGIN
+                        INSERT INTO student_search (student_search, rowid, name, roll)
+                        VALUES ('delete', OLD.id, OLD.name, OLD.roll);
+                    END""")
+    conn.execute("""CREATE TRIGGER students_search_update AFTER UPDATE OF name, roll ON students BEGIN
+                        INSERT INTO student_search (student_search, rowid, name, roll)
+                        VALUES ('delete', OLD.id, OLD.name, OLD.roll);
+                        INSERT INTO student_search (rowid, name, roll) VALUES (NEW.id, NEW.name, NEW.roll);
+                    END""")
+    conn.execute("INSERT INTO student_search (student_search) VALUES ('rebuild')")
+
+
+def _unique_results(conn):
+    # One mark per student and subject, so imports can upsert on the pair.
+    # Where a subject was entered twice the newest mark is kept.
+    conn.execute("""DELETE FROM results WHERE id NOT IN (SELECT MAX(id) FROM results
+                                                         GROUP BY student_id, subject_id)""")
+    conn.execute("DROP INDEX idx_results_student_subject")
+    conn.execute("CREATE UNIQUE INDEX idx_results_student_subject ON results (student_id, subject_id)")
+
+
+MIGRATIONS = [
+    (1, _initial_schema),
+    (2, _normalize_subjects),
+    (3, _result_totals),
+    (4, _student_summary),
+    (5, _summary_ranking_index),
+    (6, _student_details),
+    (7, _data_version),
+    (8, _jobs),
+    (9, _grading_schemes),
+    (10, _subject_keys),
+    (11, _student_search),
+    (12, _unique_results),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Bring the database up to LATEST_VERSION. Returns the list of versions applied."""
+    applied = []
+    current = schema_version(conn)
+    for version, step in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the write lock
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {version:d}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
@@ -0,0 +1,329 @@
+import json
+from itertools import groupby
+from database.database import connect_db, subject_id, transaction
+from models.columnar import ColumnarResults
+from models.result import Result
+from models.search import SEARCH_FACETS, facet_counts, search_terms
+from models.student import Student
+from models.subject import catalog
+from utils.grading import calculate_grade
+
+COHORT_FIELDS = ("branch", "section", "year")
+
+# One row per (student, subject); students without results get a single row of NULL marks.
+# {where} filters students, {limit} pages them (applied before the join).
+_STUDENT_ROWS_SQL = """
+    SELECT st.id, st.roll, st.name, st.branch, st.section, st.year,
+           COALESCE(sm.percentage, 0), sm.grade,
+           sub.name, r.mark, r.total
+    FROM (SELECT * FROM students WHERE roll IS NOT NULL {where} ORDER BY id {limit}) st
+    LEFT JOIN student_summary sm ON sm.student_id = st.id
+    LEFT JOIN results r ON r.student_id = st.id
+    LEFT JOIN subjects sub ON sub.id = r.subject_id
+    ORDER BY st.id, r.id
+"""
+
+
+# A student's grade inside a WHERE on students (those without marks have no summary row)
+_GRADE_SQL = "COALESCE((SELECT grade FROM student_summary WHERE student_id = students.id), ?)"
+
+
+def _cohort_filter(branch=None, section=None, year=None, alias=""):
+    values = {"branch": branch, "section": section, "year": year}
+    clauses = [f"{alias}{field} = ?" for field in COHORT_FIELDS if values[field] is not None]
+    params = [values[field] for field in COHORT_FIELDS if values[field] is not None]
+    return "".join(f" AND {c}" for c in clauses), params
+
+
+class SqliteStudentStore:
+    """Student records stored in SQLite, with the same interface as StudentStore.
+
+    Every worker process (and thread) talks to the same database file, so
+    several gunicorn workers see one consistent set of results and nothing
+    is lost on restart. Percentages and grades come from student_summary,
+    which the results triggers keep current.
+    """
+
+    def __init__(self):
+        self._fts = None
+        self._all_groups = None
+        self._columns = (None, None)
+        self.subjects = catalog
+
+    def __len__(self):
+        return connect_db().execute("SELECT COUNT(*) FROM students WHERE roll IS NOT NULL").fetchone()[0]
+
+    def __iter__(self):
+        return self._students()
+
+    def __contains__(self, roll):
+        return self._student_id(connect_db(), roll) is not None
+
+    def shared_version(self):
+        """Change counter for the whole store; differs as soon as any process writes."""
+        return connect_db().execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+
+    def data_version(self):
+        return self.shared_version()
+
+    def get(self, roll):
+        return next(self._students(" AND roll = ?", [roll]), None)
+
+    def upsert(self, student):
+        """Insert or replace a student and all their marks. Returns True if the roll was new."""
+        return self.upsert_many([student])[0]
+
+    def upsert_many(self, students):
+        """Upsert several students in one transaction; returns the list of is-new flags."""
+        with transaction() as conn:
+            return [self._upsert(conn, student) for student in students]
+
+    def get_many(self, rolls):
+        """Students for the given rolls, keyed by roll, fetched with one query."""
+        return {s["roll"]: s for s in self._students(" AND roll IN (SELECT value FROM json_each(?))",
+                                                      [json.dumps(list(rolls))])}
+
+    def update(self, roll, **fields):
+        student = self.get(roll)
+        if student is None:
+            raise KeyError(roll)
+        student.update(fields)
+        self.upsert(student)
+        return student
+
+    def delete(self, roll):
+        student = self.get(roll)
+        if student is not None:
+            with transaction() as conn:
+                sid = self._student_id(conn, roll)
+                conn.execute("DELETE FROM results WHERE student_id = ?", (sid,))
+                conn.execute("DELETE FROM students WHERE id = ?", (sid,))
+        return student
+
+    def clear(self):
+        with transaction() as conn:
+            conn.execute("DELETE FROM student_summary")
+            conn.execute("DELETE FROM results")
+            conn.execute("DELETE FROM students")
+
+    def page(self, offset, limit, **filters):
+        unknown = set(filters) - set(COHORT_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot filter students by '{unknown.pop()}'")
+        where, params = _cohort_filter(**filters)
+        return self._students(where, params, limit=(offset, limit))
+
+    def find(self, **filters):
+        return list(self.iter_students(**filters))
+
+    def count(self, **filters):
+        unknown = set(filters) - set(COHORT_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot filter students by '{unknown.pop()}'")
+        where, params = _cohort_filter(**filters)
+        return connect_db().execute(f"SELECT COUNT(*) FROM students WHERE roll IS NOT NULL {where}", params).fetchone()[0]
+
+    def iter_students(self, **filters):
+        """Stream (optionally filtered) students straight off the database cursor."""
+        unknown = set(filters) - set(COHORT_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot filter students by '{unknown.pop()}'")
+        where, params = _cohort_filter(**filters)
+        return self._students(where, params)
+
+    def search(self, query="", offset=0, limit=50, **facets):
+        """Students with name/roll words starting with each word of `query`, narrowed by facets.
+
+        The words are matched through the student_search FTS5 index. Facet
+        counts come from one GROUP BY over the text matches (kept between
+        calls without a query until the data changes). Returns (the page of
+        matches, number of matches, {facet: {value: count}}).
+        """
+        unknown = set(facets) - set(SEARCH_FACETS)
+        if unknown:
+            raise ValueError(f"Cannot filter students by '{unknown.pop()}'")
+        conn = connect_db()
+        where, params = self._text_filter(conn, query)
+        no_marks_grade = calculate_grade(0)
+        if where:
+            groups = self._facet_groups(conn, where, params, no_marks_grade)
+        else:
+            # Counting every student is the slow case; keep it until the data changes
+            version = self.shared_version()
+            if self._all_groups is None or self._all_groups[0] != version:
+                self._all_groups = (version, self._facet_groups(conn, "", [], no_marks_grade))
+            groups = self._all_groups[1]
+        matched, counts = facet_counts(groups, facets, weight=lambda group: group["n"])
+        for field in SEARCH_FACETS:
+            if facets.get(field):
+                where += f" AND {_GRADE_SQL} = ?" if field == "grade" else f" AND {field} = ?"
+                params += [no_marks_grade, facets[field]] if field == "grade" else [facets[field]]
+        total = sum(group["n"] for group in matched)
+        page = list(self._students(where, params, limit=(offset, limit))) if total else []
+        return page, total, counts
+
+    @staticmethod
+    def _facet_groups(conn, where, params, no_marks_grade):
+        """Students per (branch, section, year, grade) among those matching `where`."""
+        rows = conn.execute(f"""SELECT branch, section, year, {_GRADE_SQL}, COUNT(*) FROM students
+                                WHERE roll IS NOT NULL {where} GROUP BY 1, 2, 3, 4""", [no_marks_grade] + params)
+        return [dict(zip(SEARCH_FACETS + ("n",), row)) for row in rows]
+
+    def _text_filter(self, conn, query):
+        terms = search_terms(query)
+        if not terms:
+            return "", []
+        if self._has_fts(conn):
+            return (" AND id IN (SELECT rowid FROM student_search WHERE student_search MATCH ?)",
+                    [" ".join(f'"{term}"*' for term in terms)])
+        # No FTS5 in this SQLite: substring matches, one table scan
+        return ("".join(" AND (name LIKE ? OR roll LIKE ?)" for _ in terms),
+                [f"%{term}%" for term in terms for _ in range(2)])
+
+    def _has_fts(self, conn):
+        if self._fts is None:
+            self._fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'student_search'").fetchone() is not None
+        return self._fts
+
+    def columns(self):
+        """Every student's results as a ColumnarResults snapshot, rebuilt when data_version moves."""
+        version, columns = self._columns
+        current = self.shared_version()
+        if columns is None or version != current:
+            columns = self._build_columns(connect_db())
+            self._columns = (current, columns)
+        return columns
+
+    @staticmethod
+    def _build_columns(conn):
+        # Plain scans; ids are turned into snapshot positions with two dicts
+        students = conn.execute("""SELECT st.id, st.roll, st.branch, st.section, st.year, COALESCE(sm.percentage, 0),
+                                          sm.grade
+                                   FROM students st LEFT JOIN student_summary sm ON sm.student_id = st.id
+                                   WHERE st.roll IS NOT NULL ORDER BY st.id""").fetchall()
+        position = {row[0]: i for i, row in enumerate(students)}
+        subjects = conn.execute("SELECT id, name FROM subjects ORDER BY id").fetchall()
+        subject_position = {sid: i for i, (sid, _) in enumerate(subjects)}
+        results = [(position[sid], subject_position[sub], mark, total) for sid, sub, mark, total in
+                   conn.execute("SELECT student_id, subject_id, mark, total FROM results") if sid in position]
+        return ColumnarResults.from_rows([row[1:6] + (row[6] or calculate_grade(row[5]),) for row in students],
+                                         results, [name for _, name in subjects])
+
+    def values_of(self, field):
+        if field not in COHORT_FIELDS:
+            raise ValueError(f"Cannot filter students by '{field}'")
+        rows = connect_db().execute(f"SELECT DISTINCT {field} FROM students WHERE roll IS NOT NULL ORDER BY {field}")
+        return [value for (value,) in rows]
+
+    # Ranking treats students without marks (no summary row) as 0%, like StudentStore.
+    # Percentages above 0 are read through idx_summary_percentage.
+
+    def top(self, n, branch=None, section=None, year=None):
+        where, params = _cohort_filter(branch, section, year, alias="st.")
+        conn = connect_db()
+        rolls = [roll for (roll,) in conn.execute(
+            f"""SELECT st.roll FROM student_summary sm JOIN students st ON st.id = sm.student_id
+                WHERE sm.percentage > 0 AND st.roll IS NOT NULL {where}
+                ORDER BY sm.percentage DESC, st.roll LIMIT ?""", params + [n])]
+        if len(rolls) < n:
+            rolls += [roll for (roll,) in conn.execute(
+                f"""SELECT st.roll FROM students st LEFT JOIN student_summary sm ON sm.student_id = st.id
+                    WHERE COALESCE(sm.percentage, 0) <= 0 AND st.roll IS NOT NULL {where}
+                    ORDER BY st.roll LIMIT ?""", params + [n - len(rolls)])]
+        by_roll = self.get_many(rolls)
+        return [by_roll[roll] for roll in rolls if roll in by_roll]
+
+    def rank(self, roll, branch=None, section=None, year=None):
+        """(rank, cohort size, percentile), as StudentStore.rank, from two indexed counts."""
+        conn = connect_db()
+        row = conn.execute("""SELECT st.branch, st.section, st.year, COALESCE(sm.percentage, 0)
+                              FROM students st LEFT JOIN student_summary sm ON sm.student_id = st.id
+                              WHERE st.roll = ?""", (roll,)).fetchone()
+        if row is None or any(wanted is not None and wanted != value
+                              for wanted, value in zip((branch, section, year), row)):
+            return None  # no such student, or not part of this cohort
+        where, params = _cohort_filter(branch, section, year, alias="st.")
+        higher = conn.execute(f"""SELECT COUNT(*) FROM student_summary sm JOIN students st ON st.id = sm.student_id
+                                  WHERE sm.percentage > ? AND st.roll IS NOT NULL {where}""",
+                              [row[3]] + params).fetchone()[0]
+        size = self.count(branch=branch, section=section, year=year)
+        return higher + 1, size, round(100 * (size - higher) / size, 2)
+
+    def grade_distribution(self, branch=None, section=None, year=None):
+        where, params = _cohort_filter(branch, section, year, alias="st.")
+        rows = connect_db().execute(f"""SELECT sm.grade, COALESCE(sm.percentage, 0), COUNT(*)
+                                        FROM students st LEFT JOIN student_summary sm ON sm.student_id = st.id
+                                        WHERE st.roll IS NOT NULL {where}
+                                        GROUP BY sm.grade, CASE WHEN sm.grade IS NULL THEN COALESCE(sm.percentage, 0) END""",
+                                     params)
+        counts = {}
+        for grade, percentage, count in rows:
+            grade = grade or calculate_grade(percentage)
+            counts[grade] = counts.get(grade, 0) + count
+        return counts
+
+    def regrade(self, scheme, branch=None, year=None, exclude=()):
+        """Grade a program/year under `scheme`: one read, one batched write. Returns (percentages, grades).
+
+        `exclude` lists (branch, year) cohorts to leave alone, "" matching any.
+        """
+        where, params = _cohort_filter(branch=branch, year=year, alias="st.")
+        for other_branch, other_year in exclude:
+            where += " AND NOT ((? = '' OR st.branch = ?) AND (? = '' OR st.year = ?))"
+            params += [other_branch, other_branch, other_year, other_year]
+        with transaction() as conn:
+            rows = conn.execute(f"""SELECT sm.student_id, sm.percentage FROM student_summary sm
+                                    JOIN students st ON st.id = sm.student_id
+                                    WHERE st.roll IS NOT NULL {where}""", params).fetchall()
+            percentages = [percentage for _, percentage in rows]
+            grades = scheme.grade_all(percentages)
+            conn.executemany("UPDATE student_summary SET grade = ? WHERE student_id = ?",
+                             zip(grades, (sid for sid, _ in rows)))
+            # Summary rows are not covered by the data_version triggers
+            conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+        return percentages, grades
+
+    def _upsert(self, conn, student):
+        sid = self._student_id(conn, student["roll"])
+        is_new = sid is None
+        fields = (student["name"], student["branch"], student["section"], student["year"])
+        if is_new:
+            sid = conn.execute("INSERT INTO students (name, branch, section, year, roll) VALUES (?, ?, ?, ?, ?)",
+                               fields + (student["roll"],)).lastrowid
+        else:
+            conn.execute("UPDATE students SET name = ?, branch = ?, section = ?, year = ? WHERE id = ?",
+                         fields + (sid,))
+            conn.execute("DELETE FROM results WHERE student_id = ?", (sid,))
+        conn.executemany("INSERT INTO results (student_id, subject_id, mark, total) VALUES (?, ?, ?, ?)",
+                         [(sid, subject_id(conn, sub["name"]), sub["obtained"], sub["total"])
+                          for sub in student["subjects"]])
+        if student["subjects"] and student.get("grade"):
+            # The triggers grade on the default scale; keep the grade of the cohort's own scheme
+            conn.execute("UPDATE student_summary SET grade = ? WHERE student_id = ?", (student["grade"], sid))
+        return is_new
+
+    @staticmethod
+    def _student_id(conn, roll):
+        row = conn.execute("SELECT id FROM students WHERE roll = ?", (roll,)).fetchone()
+        return row[0] if row else None
+
+    def _students(self, where="", params=(), limit=None):
+        """Yield Student records straight off the cursor, one student at a time."""
+        limit_sql = ""
+        if limit is not None:
+            limit_sql = "LIMIT ? OFFSET ?"
+            params = list(params) + [limit[1], limit[0]]
+        rows = connect_db().execute(_STUDENT_ROWS_SQL.format(where=where, limit=limit_sql), params)
+        for _, group in groupby(rows, key=lambda row: row[0]):
+            group = list(group)
+            _, roll, name, branch, section, year, percentage, grade = group[0][:8]
+            yield Student(
+                name=name,
+                roll=roll,
+                branch=branch,
+                section=section,
+                year=year,
+                subjects=tuple(Result(sub, mark, total) for *_, sub, mark, total in group if sub is not None),
+                percentage=percentage,
+                grade=grade or calculate_grade(percentage),
+            )
@@ -0,0 +1,151 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; the arrays work without it
+    np = None
+
+COHORT_FIELDS = ("branch", "section", "year")
+
+
+class ColumnarResults:
+    """Read-only snapshot of many students' results as parallel typed arrays.
+
+    One row per (student, subject) result: `student` (index into `rolls`),
+    `subject` (index into `subject_names`), `obtained` and `total`. Per
+    student there is `percentage` and a code per cohort field (index into
+    `categories[field]`). About 28 bytes per result instead of a few hundred
+    for dicts, and with numpy installed every column can be viewed as an
+    ndarray without copying (see column()) for vectorised analytics.
+    """
+
+    def __init__(self):
+        self.rolls = []
+        self.grades = []
+        self.percentage = array("d")
+        self.categories = {field: [] for field in COHORT_FIELDS}
+        self.cohort = {field: array("I") for field in COHORT_FIELDS}
+        self.subject_names = []
+        self.student = array("I")
+        self.subject = array("I")
+        self.obtained = array("d")
+        self.total = array("d")
+        self._codes = {field: {} for field in COHORT_FIELDS}
+        self._subject_codes = {}
+
+    @classmethod
+    def from_students(cls, students):
+        columns = cls()
+        for student in students:
+            columns.append(student)
+        return columns
+
+    @classmethod
+    def from_rows(cls, students, results, subject_names):
+        """Build straight from query rows, without making Student objects.
+
+        `students` are (roll, branch, section, year, percentage, grade) rows;
+        `results` are (student index, subject index, obtained, total) rows,
+        indexes into `students` and `subject_names`.
+        """
+        columns = cls()
+        for roll, branch, section, year, percentage, grade in students:
+            columns.rolls.append(roll)
+            columns.grades.append(grade)
+            columns.percentage.append(percentage)
+            for field, value in zip(COHORT_FIELDS, (branch, section, year)):
+                columns.cohort[field].append(cls._code(columns._codes[field], columns.categories[field], value))
+        columns.subject_names = list(subject_names)
+        columns._subject_codes = {name: i for i, name in enumerate(columns.subject_names)}
+        columns.student = array("I", [row[0] for row in results])
+        columns.subject = array("I", [row[1] for row in results])
+        columns.obtained = array("d", [row[2] for row in results])
+        columns.total = array("d", [row[3] for row in results])
+        return columns
+
+    def __len__(self):
+        return len(self.rolls)
+
+    @property
+    def result_count(self):
+        return len(self.student)
+
+    def append(self, student):
+        index = len(self.rolls)
+        self.rolls.append(student["roll"])
+        self.grades.append(student["grade"])
+        self.percentage.append(student["percentage"])
+        for field in COHORT_FIELDS:
+            self.cohort[field].append(self._code(self._codes[field], self.categories[field], student[field]))
+        for sub in student["subjects"]:
+            self.student.append(index)
+            self.subject.append(self._subject_code(sub))
+            self.obtained.append(sub["obtained"])
+            self.total.append(sub["total"])
+
+    def _subject_code(self, sub):
+        # Results filed by a store carry their subject id; plain dicts go by name
+        key = getattr(sub, "subject_id", None)
+        if key is None:
+            key = sub["name"]
+        code = self._subject_codes.get(key)
+        if code is None:
+            code = self._subject_codes[key] = len(self.subject_names)
+            self.subject_names.append(sub["name"])
+        return code
+
+    @staticmethod
+    def _code(codes, values, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def column(self, name):
+        """A column as a zero-copy numpy array (or the raw array when numpy is missing).
+
+        Names: student, subject, obtained, total, percentage, or a cohort field.
+        """
+        values = self.cohort[name] if name in self.cohort else getattr(self, name)
+        if np is None:
+            return values
+        return np.frombuffer(values, dtype=np.float64 if values.typecode == "d" else np.uint32)
+
+    def cohort_mask(self, **filters):
+        """Per-student booleans for e.g. cohort_mask(branch="CSE", year="2"), or None without filters.
+
+        A numpy bool array (a list when numpy is missing), one entry per student.
+        """
+        filters = {field: value for field, value in filters.items() if value is not None}
+        if not filters:
+            return None
+        codes = {field: self._codes[field].get(value, -1) for field, value in filters.items()}
+        if np is not None:
+            mask = np.ones(len(self.rolls), dtype=bool)
+            for field, code in codes.items():
+                mask &= self.column(field) == code
+            return mask
+        return [all(self.cohort[field][i] == code for field, code in codes.items()) for i in range(len(self.rolls))]
+
+    def subject_totals(self):
+        """{subject: (results, obtained sum, total sum)} in one pass over the columns."""
+        n = len(self.subject_names)
+        if np is not None and self.result_count:
+            subject = self.column("subject")
+            counts = np.bincount(subject, minlength=n)
+            obtained = np.bincount(subject, weights=self.column("obtained"), minlength=n)
+            total = np.bincount(subject, weights=self.column("total"), minlength=n)
+            return {name: (int(counts[i]), float(obtained[i]), float(total[i]))
+                    for i, name in enumerate(self.subject_names)}
+        counts, obtained, total = [0] * n, [0.0] * n, [0.0] * n
+        for s, o, t in zip(self.subject, self.obtained, self.total):
+            counts[s] += 1
+            obtained[s] += o
+            total[s] += t
+        return {name: (counts[i], obtained[i], total[i]) for i, name in enumerate(self.subject_names)}
+
+    def nbytes(self):
+        """Bytes held by the array columns (not the roll/name lists)."""
+        arrays = [self.percentage, self.student, self.subject, self.obtained, self.total, *self.cohort.values()]
+        return sum(a.itemsize * len(a) for a in arrays)
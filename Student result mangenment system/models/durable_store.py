@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+import time
+from models.journal import Journal, read_snapshot, write_snapshot
+from models.student import Student
+from models.student_store import StudentStore
+
+logger = logging.getLogger(__name__)
+
+
+class DurableStudentStore(StudentStore):
+    """StudentStore whose writes survive restarts and crashes.
+
+    Reads are served from memory exactly as by StudentStore. Every write is
+    applied in memory and appended to a Journal under one lock (so the
+    journal has the same order), then waited on outside it until fsynced;
+    concurrent writers share fsyncs (group commit). Once the journal has
+    grown by `snapshot_bytes`, a background thread writes every record to a
+    binary snapshot and drops the journal segments it covers. Opening the
+    store loads the snapshot and replays the journal after it.
+
+    One process writes to a journal directory (it is locked on first
+    write), so run a single worker; with gunicorn --preload the records are
+    loaded once in the master and shared copy-on-write.
+    """
+
+    def __init__(self, directory, commit_delay=0.0, snapshot_bytes=16 * 1024 * 1024):
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshot_bytes = snapshot_bytes
+        self.journal = Journal(directory, commit_delay)
+        self._write_lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()
+        self._recover()
+
+    def _recover(self):
+        start = time.perf_counter()
+        next_segment, students = read_snapshot(self.directory)
+        StudentStore.load(self, students)
+        replayed = 0
+        for record in self.journal.replay(next_segment):
+            self._apply(record)
+            replayed += 1
+        # A long journal tail gets folded into a new snapshot after the next write
+        self.journal.bytes_since_snapshot = self.journal.size(next_segment)
+        if students or replayed:
+            logger.info("Loaded %d students from the snapshot and replayed %d journal records in %.2fs (%d students)",
+                        len(students), replayed, time.perf_counter() - start, len(self))
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "upsert":
+            for student in record["students"]:
+                StudentStore.upsert(self, student)
+        elif op == "delete":
+            StudentStore.delete(self, record["roll"])
+        elif op == "clear":
+            StudentStore.clear(self)
+        elif op == "grades":
+            for roll, grade in record["grades"].items():
+                StudentStore.update(self, roll, grade=grade)
+        else:
+            raise ValueError(f"Unknown journal record '{op}'")
+
+    def upsert(self, student):
+        return self.upsert_many([student])[0]
+
+    def upsert_many(self, students):
+        flags, written, ticket = [], [], None
+        try:
+            with self._write_lock:
+                try:
+                    for student in students:
+                        flags.append(StudentStore.upsert(self, student))
+                        written.append(student["roll"])
+                finally:
+                    # Whatever made it into memory goes into the journal, even if a later record failed
+                    ticket = self.journal.append({"op": "upsert", "students": [
+                        self._by_roll[roll].to_dict() for roll in written]}) if written else None
+        finally:
+            self._commit(ticket)
+        return flags
+
+    def update(self, roll, **fields):
+        with self._write_lock:
+            student = StudentStore.update(self, roll, **fields)
+            ticket = self.journal.append({"op": "upsert", "students": [student.to_dict()]})
+        self._commit(ticket)
+        return student
+
+    def delete(self, roll):
+        with self._write_lock:
+            student = StudentStore.delete(self, roll)
+            ticket = self.journal.append({"op": "delete", "roll": roll}) if student is not None else None
+        self._commit(ticket)
+        return student
+
+    def clear(self):
+        with self._write_lock:
+            StudentStore.clear(self)
+            ticket = self.journal.append({"op": "clear"})
+        self._commit(ticket)
+
+    def regrade(self, scheme, branch=None, year=None, exclude=()):
+        with self._write_lock:
+            before = {student["roll"]: student["grade"] for student in self._regrade_members(branch, year, exclude)}
+            percentages, grades = StudentStore.regrade(self, scheme, branch, year, exclude)
+            changed = {roll: grade for roll, grade in zip(before, grades) if before[roll] != grade}
+            ticket = self.journal.append({"op": "grades", "grades": changed}) if changed else None
+        self._commit(ticket)
+        return percentages, grades
+
+    def _commit(self, ticket):
+        if ticket is None:
+            return
+        self.journal.wait(ticket)
+        if self.journal.bytes_since_snapshot >= self.snapshot_bytes and not self._snapshot_lock.locked():
+            threading.Thread(target=self.snapshot, name="student-snapshot", daemon=True).start()
+
+    def snapshot(self):
+        """Write every record to the snapshot file and drop the journal it replaces. Returns the path."""
+        with self._snapshot_lock:
+            with self._write_lock:
+                next_segment = self.journal.rotate()
+                # update() and regrade() change records in place, so copy them (their results are shared)
+                records = [Student(s.name, s.roll, s.branch, s.section, s.year, s.subjects, s.percentage, s.grade)
+                           for s in self._by_roll.values()]
+                self.journal.bytes_since_snapshot = 0
+            path = write_snapshot(self.directory, next_segment, records)
+            self.journal.remove_before(next_segment)
+            return path
+
+    def close(self):
+        self.journal.close()
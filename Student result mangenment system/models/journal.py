@@ -0,0 +1,344 @@
+"""Append-only journal and binary snapshots behind the durable in-memory store.
+
+Journal segments (journal-<seq>.log) hold one frame per write:
+
+    <u32 payload length> <u32 crc32 of payload> <payload: compact JSON>
+
+A frame cut short or failing its checksum (a crash mid-write) ends its
+segment on replay. Each process that writes starts a new segment, so a
+torn tail is never appended to.
+
+A snapshot (snapshot.bin) lays every record out as fixed-width arrays
+after a header, each starting on an 8-byte boundary, so a reader maps the
+file and views the arrays in place instead of parsing it:
+
+    header    magic, format version, first journal segment not covered, counts
+    strings   u64 offsets plus one UTF-8 blob; every name, roll, cohort value,
+              grade and subject name is stored once and referred to by index
+    students  u32 name, roll, branch, section, year, grade (string indexes),
+              u32 first result, u32 result count, f64 percentage
+    results   u32 subject (string index), f64 obtained, f64 total
+"""
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from models.result import Result
+from models.student import Student
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory lock; run a single writer by hand
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "snapshot.bin"
+LOCK_FILE = "journal.lock"
+_SEGMENT = re.compile(r"journal-(\d+)\.log$")
+_FRAME = struct.Struct("<II")
+
+SNAPSHOT_MAGIC = b"SRSNAP\x00\x01"
+SNAPSHOT_VERSION = 1
+# magic, version, next journal segment, strings, blob bytes, students, results (64 bytes)
+_HEADER = struct.Struct("<8sI4xQQQQQ8x")
+_STUDENT_STRINGS = ("name", "roll", "branch", "section", "year", "grade")
+# String index standing for "no value" (a student without a grade)
+_NONE = 0xFFFFFFFF
+
+
+def _segment_path(directory, seq):
+    return os.path.join(directory, f"journal-{seq:08d}.log")
+
+
+def _sync_directory(directory):
+    # Make a file creation/rename durable (not possible, nor needed, on Windows)
+    if os.name != "nt":
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class Journal:
+    """Append-only log of store writes with group commit.
+
+    append() only queues a frame and returns a ticket; wait(ticket) makes it
+    durable. The first waiter leads a commit: it lets `commit_delay` pass,
+    then writes everything queued so far with one write and one fsync while
+    later waiters wait for it (and the next one leads the following commit),
+    so concurrent writers share fsyncs instead of paying one each. The file
+    is opened lazily by the process that first writes, under an exclusive
+    lock on the directory: only one process may write to a journal.
+
+    If a write or fsync fails, what reached the disk is unknown, so the
+    journal stops: that wait() and every later one raises RuntimeError.
+    Restarting recovers the last state known to be on disk.
+    """
+
+    def __init__(self, directory, commit_delay=0.0):
+        self.directory = directory
+        self.commit_delay = commit_delay
+        # Journal bytes written since the last snapshot (set by the store after replay)
+        self.bytes_since_snapshot = 0
+        self._lock = threading.Lock()
+        # Notified when a commit ends; _flushing is set while one is under way
+        self._committed = threading.Condition(self._lock)
+        self._flushing = False
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._appended = 0
+        self._durable = 0
+        # The error that stopped the journal, if a flush has failed
+        self._failure = None
+        self._file = None
+        self._lock_file = None
+        self._pid = None
+
+    def segments(self):
+        """Sequence numbers of the journal segments on disk, oldest first."""
+        names = os.listdir(self.directory) if os.path.isdir(self.directory) else []
+        return sorted(int(m.group(1)) for m in map(_SEGMENT.match, names) if m)
+
+    def replay(self, start=0):
+        """Yield the records of every segment numbered `start` or later, in order."""
+        for seq in self.segments():
+            if seq < start:
+                continue
+            with open(_segment_path(self.directory, seq), "rb") as f:
+                data = f.read()
+            offset = 0
+            while offset + _FRAME.size <= len(data):
+                length, crc = _FRAME.unpack_from(data, offset)
+                payload = data[offset + _FRAME.size:offset + _FRAME.size + length]
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    logger.warning("journal-%08d.log: torn or corrupt record at byte %d; ignoring the rest of "
+                                   "the segment", seq, offset)
+                    break
+                yield json.loads(payload)
+                offset += _FRAME.size + length
+
+    def size(self, start=0):
+        """Bytes of journal in segments numbered `start` or later."""
+        return sum(os.path.getsize(_segment_path(self.directory, seq)) for seq in self.segments() if seq >= start)
+
+    def append(self, record):
+        """Queue a record; returns the ticket to pass to wait()."""
+        payload = json.dumps(record, separators=(",", ":")).encode()
+        with self._lock:
+            self._pending.append(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._appended += 1
+            return self._appended
+
+    def wait(self, ticket):
+        """Block until the record with this ticket (and every earlier one) is on disk."""
+        with self._lock:
+            while self._durable < ticket and self._flushing:
+                self._committed.wait()
+            if self._durable >= ticket:
+                return
+            self._flushing = True
+        try:
+            if self.commit_delay:
+                # Let more writers queue up behind this fsync
+                time.sleep(self.commit_delay)
+            with self._flush_lock:
+                self._flush()
+        finally:
+            with self._lock:
+                self._flushing = False
+                self._committed.notify_all()
+
+    def rotate(self):
+        """Flush, then continue in a new segment; returns its number.
+
+        Every segment numbered below it is complete, so a snapshot of the
+        current state can replace them.
+        """
+        with self._flush_lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            return self._open_segment()
+
+    def remove_before(self, seq):
+        for old in self.segments():
+            if old < seq:
+                os.remove(_segment_path(self.directory, old))
+
+    def close(self):
+        """Flush, close the segment and give up the directory lock."""
+        with self._flush_lock:
+            if self._failure is None:
+                self._flush()
+            if self._pid == os.getpid():
+                if self._file is not None:
+                    self._file.close()
+                self._lock_file.close()
+            self._file = self._lock_file = self._pid = None
+
+    def _flush(self):
+        # Caller holds _flush_lock
+        if self._failure is not None:
+            raise RuntimeError(f"The journal in {self.directory} stopped after a failed write; "
+                               "restart to recover the records on disk") from self._failure
+        with self._lock:
+            frames, self._pending = self._pending, []
+            upto = self._appended
+        if frames:
+            data = b"".join(frames)
+            try:
+                f = self._writer()
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            except Exception as e:
+                # Part of the data may be on disk: never report any of it (or anything after it) durable
+                self._failure = e
+                raise RuntimeError(f"Could not write the journal in {self.directory}: {e}") from e
+            self.bytes_since_snapshot += len(data)
+        # Only now is everything up to `upto` on disk
+        with self._lock:
+            self._durable = upto
+
+    def _writer(self):
+        if self._file is None or self._pid != os.getpid():
+            self._open_segment()
+        return self._file
+
+    def _open_segment(self):
+        if self._pid != os.getpid():
+            # First write in this process: a forked worker must not reuse its parent's file or lock
+            self._file = None
+            self._acquire_lock()
+        seq = max(self.segments(), default=0) + 1
+        self._file = open(_segment_path(self.directory, seq), "ab")
+        _sync_directory(self.directory)
+        return seq
+
+    def _acquire_lock(self):
+        lock_file = open(os.path.join(self.directory, LOCK_FILE), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise RuntimeError(f"Another process is writing to the journal in {self.directory}; "
+                                   "the durable memory store needs a single worker process") from None
+        self._lock_file = lock_file
+        self._pid = os.getpid()
+
+
+def _aligned(data):
+    return data + b"\0" * (-len(data) % 8)
+
+
+def write_snapshot(directory, next_segment, students):
+    """Write `students` to snapshot.bin (via a temporary file and an atomic rename)."""
+    strings, index = [], {}
+
+    def ref(value):
+        if value is None:
+            return _NONE
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(strings)
+            strings.append(value)
+        return code
+
+    fields = {field: array("I") for field in _STUDENT_STRINGS}
+    first, count, percentage = array("I"), array("I"), array("d")
+    subject, obtained, total = array("I"), array("d"), array("d")
+    for student in students:
+        for field, column in fields.items():
+            column.append(ref(student[field]))
+        first.append(len(subject))
+        count.append(len(student["subjects"]))
+        percentage.append(student["percentage"])
+        for sub in student["subjects"]:
+            subject.append(ref(sub["name"]))
+            obtained.append(sub["obtained"])
+            total.append(sub["total"])
+
+    encoded = [s.encode() for s in strings]
+    offsets = array("Q", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    blob = b"".join(encoded)
+
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, next_segment, len(strings), len(blob),
+                             len(first), len(subject)))
+        for part in (offsets.tobytes(), blob, *(fields[field].tobytes() for field in _STUDENT_STRINGS),
+                     first.tobytes(), count.tobytes(), percentage.tobytes(),
+                     subject.tobytes(), obtained.tobytes(), total.tobytes()):
+            f.write(_aligned(part))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _sync_directory(directory)
+    return path
+
+
+def _number(value):
+    # Marks are whole numbers almost always; keep them ints as the forms produce them
+    return int(value) if value.is_integer() else value
+
+
+def read_snapshot(directory):
+    """(first journal segment to replay, [Student]) from snapshot.bin, or (0, []) without one."""
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    if not os.path.exists(path) or os.path.getsize(path) < _HEADER.size:
+        return 0, []
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return _decode_snapshot(path, memoryview(mapped))
+    finally:
+        try:
+            mapped.close()
+        except BufferError:  # views still held by an exception's traceback; freed along with it
+            pass
+
+
+def _decode_snapshot(path, view):
+    magic, version, next_segment, n_strings, blob_len, n_students, n_results = _HEADER.unpack_from(view)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} student snapshot")
+    position = _HEADER.size
+
+    def take(typecode, n):
+        # The next array, viewed in place
+        nonlocal position
+        size = n * struct.calcsize(typecode)
+        part = view[position:position + size]
+        position += size + (-size % 8)
+        return part.cast(typecode)
+
+    offsets = take("Q", n_strings + 1)
+    blob = take("B", blob_len)
+    strings = [sys.intern(str(blob[offsets[i]:offsets[i + 1]], "utf-8")) for i in range(n_strings)]
+    fields = [take("I", n_students) for _ in _STUDENT_STRINGS]
+    first, count, percentage = take("I", n_students), take("I", n_students), take("d", n_students)
+    subject, obtained, total = take("I", n_results), take("d", n_results), take("d", n_results)
+
+    students = []
+    for i in range(n_students):
+        name, roll, branch, section, year, grade = (None if column[i] == _NONE else strings[column[i]]
+                                                    for column in fields)
+        start = first[i]
+        subjects = tuple(Result(strings[subject[j]], _number(obtained[j]), _number(total[j]))
+                         for j in range(start, start + count[i]))
+        students.append(Student(name, roll, branch, section, year, subjects, percentage[i], grade))
+    return next_segment, students
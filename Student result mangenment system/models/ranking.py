@@ -0,0 +1,89 @@
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import product
+
+
+class RankIndex:
+    """Students ordered by percentage, per cohort, for rank and leaderboard queries.
+
+    Every student is filed under each combination of (branch, section, year)
+    with None as a wildcard, so any filter maps to exactly one sorted list of
+    (-percentage, roll) keys. Rank lookups are a bisect (O(log n)); top-N is
+    a slice. Grade counts are kept per cohort alongside.
+    """
+
+    def __init__(self):
+        self._sorted = {}
+        self._grades = {}
+
+    @staticmethod
+    def _scopes(student):
+        return product((student["branch"], None), (student["section"], None), (student["year"], None))
+
+    @staticmethod
+    def _key(student):
+        return (-student["percentage"], student["roll"])
+
+    def add(self, student):
+        key = self._key(student)
+        for scope in self._scopes(student):
+            keys = self._sorted.get(scope)
+            if keys is None:
+                keys = self._sorted[scope] = []
+                self._grades[scope] = Counter()
+            insort(keys, key)
+            self._grades[scope][student["grade"]] += 1
+
+    def add_many(self, students):
+        """Add several students, sorting each cohort's list once instead of inserting one by one."""
+        added = {}
+        for student in students:
+            key, grade = self._key(student), student["grade"]
+            for scope in self._scopes(student):
+                scoped = added.get(scope)
+                if scoped is None:
+                    scoped = added[scope] = ([], [])
+                scoped[0].append(key)
+                scoped[1].append(grade)
+        for scope, (keys, grades) in added.items():
+            self._sorted.setdefault(scope, []).extend(keys)
+            self._sorted[scope].sort()
+            self._grades.setdefault(scope, Counter()).update(grades)
+
+    def remove(self, student):
+        key = self._key(student)
+        for scope in self._scopes(student):
+            keys = self._sorted[scope]
+            del keys[bisect_left(keys, key)]
+            grades = self._grades[scope]
+            grades[student["grade"]] -= 1
+            if not keys:
+                del self._sorted[scope]
+                del self._grades[scope]
+            elif not grades[student["grade"]]:
+                del grades[student["grade"]]
+
+    def clear(self):
+        self._sorted.clear()
+        self._grades.clear()
+
+    def top(self, n, branch=None, section=None, year=None):
+        """Rolls of the n best students in the cohort, best first."""
+        return [roll for _, roll in self._sorted.get((branch, section, year), [])[:n]]
+
+    def rank(self, student, branch=None, section=None, year=None):
+        """(rank, cohort size, percentile) of a student within a cohort they belong to.
+
+        Ties share a rank (1 + number of students with a higher percentage).
+        Percentile is the share of the cohort scoring at or below the student.
+        """
+        keys = self._sorted.get((branch, section, year), [])
+        key = self._key(student)
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            return None  # not part of this cohort
+        higher = bisect_left(keys, (-student["percentage"],))
+        return higher + 1, len(keys), round(100 * (len(keys) - higher) / len(keys), 2)
+
+    def grade_distribution(self, branch=None, section=None, year=None):
+        return dict(self._grades.get((branch, section, year), {}))
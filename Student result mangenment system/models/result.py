@@ -1,5 +1,43 @@
+import sys
+from dataclasses import dataclass, field
+
+RESULT_FIELDS = ("name", "obtained", "total")
+
+
+@dataclass(slots=True)
 class Result:
-    def __init__(self, student_id, subject, mark):
-        self.student_id = student_id
-        self.subject = subject
-        self.mark = mark
+    """One subject's marks for a student.
+
+    Slotted, so there is no per-instance __dict__, and the subject name is
+    interned: every "Mathematics" in a worker is the same string object.
+    Also readable as result["obtained"], like the dicts it replaces.
+    `subject_id` is the subject's id in the catalog of the store holding
+    the result (None until a store has filed it).
+    """
+    name: str
+    obtained: float
+    total: int = 100
+    subject_id: int = field(default=None, compare=False)
+
+    def __post_init__(self):
+        self.name = sys.intern(str(self.name))
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls(data["name"], data["obtained"], data.get("total", 100))
+
+    def __getitem__(self, key):
+        if key not in RESULT_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in RESULT_FIELDS else default
+
+    def keys(self):
+        return RESULT_FIELDS
+
+    def to_dict(self):
+        return {"name": self.name, "obtained": self.obtained, "total": self.total}
@@ -0,0 +1,94 @@
+import re
+from bisect import bisect_left, insort
+
+SEARCH_FACETS = ("branch", "section", "year", "grade")
+
+# Letters and digits; anything else separates words (as SQLite FTS5's unicode61 tokenizer does)
+_WORD = re.compile(r"[^\W_]+")
+
+
+def search_terms(text):
+    """Case folded words of a name, roll or search query."""
+    return _WORD.findall(str(text or "").casefold())
+
+
+class SearchIndex:
+    """Inverted index from name/roll words to rolls, for partial-name search.
+
+    Every word maps to the set of rolls whose name or roll contains it, and
+    a sorted list of the words finds all words starting with a prefix by
+    bisection, so "ku" matches "Kumar" and "kunal" without a scan of the
+    students. A query matches students having every one of its words as a
+    prefix of some word of theirs.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._words = []
+        self._doc_words = {}
+
+    def __len__(self):
+        return len(self._doc_words)
+
+    def add(self, roll, name):
+        self.remove(roll)
+        words = set(search_terms(name)) | set(search_terms(roll))
+        self._doc_words[roll] = words
+        for word in words:
+            rolls = self._postings.get(word)
+            if rolls is None:
+                rolls = self._postings[word] = set()
+                insort(self._words, word)
+            rolls.add(roll)
+
+    def remove(self, roll):
+        for word in self._doc_words.pop(roll, ()):
+            rolls = self._postings[word]
+            rolls.discard(roll)
+            if not rolls:
+                del self._postings[word]
+                del self._words[bisect_left(self._words, word)]
+
+    def clear(self):
+        self._postings.clear()
+        self._words.clear()
+        self._doc_words.clear()
+
+    def match(self, query):
+        """Rolls matching every word of the query, or None for a query without words."""
+        matched = None
+        for term in sorted(set(search_terms(query)), key=len, reverse=True):
+            rolls = set()
+            i = bisect_left(self._words, term)
+            while i < len(self._words) and self._words[i].startswith(term):
+                rolls |= self._postings[self._words[i]]
+                i += 1
+            matched = rolls if matched is None else matched & rolls
+            if not matched:
+                return set()
+        return matched
+
+
+def facet_counts(rows, filters, weight=None):
+    """Filter rows on the facets and count each facet's values in one pass.
+
+    Rows are students or, with `weight`, groups of students sharing the
+    same facet values (weight(row) is the group's size). Each facet is
+    counted over the rows matching every *other* facet filter, so the
+    counts show what picking a different value would give. Returns
+    (matching rows, {facet: {value: count}}).
+    """
+    filters = {field: value for field, value in filters.items() if value}
+    matched = []
+    counts = {field: {} for field in SEARCH_FACETS}
+    for row in rows:
+        missed = [field for field, value in filters.items() if row[field] != value]
+        if len(missed) > 1:
+            continue
+        n = weight(row) if weight else 1
+        for field in missed or SEARCH_FACETS:
+            value = row[field]
+            counts[field][value] = counts[field].get(value, 0) + n
+        if not missed:
+            matched.append(row)
+    return matched, {field: dict(sorted(values.items())) for field, values in counts.items()}
@@ -1,9 +1,62 @@
-# models/student_model.py
-from models.database import db
-
-class Student(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    roll = db.Column(db.String(50), unique=True, nullable=False)
-    name = db.Column(db.String(100), nullable=False)
-    subject = db.Column(db.String(100), nullable=False)
-    marks = db.Column(db.Integer, nullable=False)
+from dataclasses import dataclass
+from models.result import Result
+
+STUDENT_FIELDS = ("name", "roll", "branch", "section", "year", "subjects", "percentage", "grade")
+
+
+@dataclass(slots=True)
+class Student:
+    """A student record with their subject results, as kept by the stores.
+
+    Slotted and holding a tuple of slotted Results, so a record costs a
+    fraction of the nested dicts it replaces. Views, templates and stores
+    keep using it like a dict: student["roll"], student.get(...),
+    student.update(...), dict(student).
+    """
+    name: str
+    roll: str
+    branch: str
+    section: str
+    year: str
+    subjects: tuple = ()
+    percentage: float = 0
+    grade: str = None
+
+    def __post_init__(self):
+        self.subjects = tuple(Result.from_dict(sub) for sub in self.subjects)
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls(**{field: data[field] for field in STUDENT_FIELDS if field in data})
+
+    def __getitem__(self, key):
+        if key not in STUDENT_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in STUDENT_FIELDS:
+            raise KeyError(key)
+        if key == "subjects":
+            value = tuple(Result.from_dict(sub) for sub in value)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in STUDENT_FIELDS
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in STUDENT_FIELDS else default
+
+    def keys(self):
+        return STUDENT_FIELDS
+
+    def update(self, fields=(), **more):
+        for key, value in dict(fields, **more).items():
+            self[key] = value
+
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in STUDENT_FIELDS}
+        data["subjects"] = [sub.to_dict() for sub in self.subjects]
+        return data
@@ -0,0 +1,306 @@
+import heapq
+import sys
+from itertools import islice
+from models.columnar import ColumnarResults
+from models.ranking import RankIndex
+from models.search import SEARCH_FACETS, SearchIndex, facet_counts
+from models.student import Student
+from models.subject import SubjectCatalog
+
+
+class StudentStore:
+    """In-memory student records keyed by roll number.
+
+    Records are kept in a dict keyed by roll (insertion ordered, so listings
+    keep the order students were added in) plus secondary indexes on branch,
+    section and year that map each value to the set of rolls having it.
+    Lookup, upsert and delete are all constant time. A RankIndex orders
+    students by percentage for rank/leaderboard queries, and a SearchIndex
+    maps name/roll words to rolls for search(). Records are kept as slotted
+    Student objects.
+    """
+
+    INDEXED_FIELDS = ("branch", "section", "year")
+
+    def __init__(self):
+        self._by_roll = {}
+        self._order = {}
+        self._next_order = 0
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        self.ranking = RankIndex()
+        self.search_index = SearchIndex()
+        # This store's own subjects; it never touches the subjects table
+        self.subjects = SubjectCatalog(persistent=False)
+        # Students per (branch, section, year, grade), for facet counts
+        self._facet_groups = {}
+        # Bumped by every write; columns() rebuilds its snapshot when it moves
+        self._writes = 0
+        self._columns = (None, None)
+
+    def __len__(self):
+        return len(self._by_roll)
+
+    def __iter__(self):
+        # Over a copy of the (roll -> record) view: a write from another thread
+        # mid-iteration would otherwise raise "dictionary changed size"
+        return iter(list(self._by_roll.values()))
+
+    def __contains__(self, roll):
+        return roll in self._by_roll
+
+    def shared_version(self):
+        """None: this store lives in one process, so callers only need their own invalidation."""
+        return None
+
+    def data_version(self):
+        """Moves on every write, so anything cached against it goes stale by itself."""
+        return self._writes
+
+    def get(self, roll):
+        return self._by_roll.get(roll)
+
+    def upsert(self, student):
+        """Insert or replace a student. Returns True if the roll was new.
+
+        Don't change a stored record and upsert it back: the indexes still
+        file it under its old values. Use update() or upsert a copy.
+        """
+        student = self._canonical(student)
+        roll = student["roll"]
+        old = self._by_roll.get(roll)
+        if old is not None:
+            self._unindex(old)
+        else:
+            self._order[roll] = self._next_order
+            self._next_order += 1
+        self._by_roll[roll] = student
+        self._index(student)
+        return old is None
+
+    def upsert_many(self, students):
+        """Upsert several students; returns the list of is-new flags."""
+        return [self.upsert(student) for student in students]
+
+    def load(self, students):
+        """Add many students not in the store yet (e.g. at startup) with one sort per ranking.
+
+        Rolls already stored are upserted one by one; a roll given twice keeps its last record.
+        """
+        fresh = {}
+        for student in students:
+            student = self._canonical(student)
+            if student["roll"] in self._by_roll:
+                self.upsert(student)
+            else:
+                fresh[student["roll"]] = student
+        for roll, student in fresh.items():
+            self._order[roll] = self._next_order
+            self._next_order += 1
+            self._by_roll[roll] = student
+            self._index(student, ranked=False)
+        self.ranking.add_many(fresh.values())
+
+    def _canonical(self, student):
+        student = Student.from_dict(student)
+        # File results under the catalog's subject ids, so "maths" and "Maths" are one subject
+        for sub in student.subjects:
+            sub.subject_id = self.subjects.add(sub.name)
+            name = self.subjects.name_of(sub.subject_id)
+            if name != sub.name:
+                sub.name = sys.intern(name)
+        return student
+
+    def get_many(self, rolls):
+        """Students for the given rolls, keyed by roll (unknown rolls are left out)."""
+        return {roll: self._by_roll[roll] for roll in rolls if roll in self._by_roll}
+
+    def update(self, roll, **fields):
+        """Change fields of an existing student in place, keeping the indexes in step."""
+        student = self._by_roll[roll]
+        self._unindex(student)
+        student.update(fields)
+        self._index(student)
+        return student
+
+    def delete(self, roll):
+        student = self._by_roll.pop(roll, None)
+        if student is not None:
+            del self._order[roll]
+            self._unindex(student)
+        return student
+
+    def clear(self):
+        self._by_roll.clear()
+        self._order.clear()
+        for index in self._indexes.values():
+            index.clear()
+        self.ranking.clear()
+        self.search_index.clear()
+        self._facet_groups.clear()
+        self._writes += 1
+
+    def page(self, offset, limit, **filters):
+        """Return the `limit` students starting at `offset`, without copying the rest of the store.
+
+        With filters (as for find) only the first offset + limit matches are
+        put in order, not every match.
+        """
+        rolls = self._matching(filters)
+        if rolls is None:
+            # Taken in one go (the slice runs in C, so no other thread writes midway)
+            return list(islice(self._by_roll.values(), offset, offset + limit))
+        first = heapq.nsmallest(offset + limit, rolls, key=self._order.__getitem__)
+        return [self._by_roll[r] for r in first[offset:]]
+
+    def find(self, **filters):
+        """Return students matching every given field, e.g. find(branch="CSE", year="2")."""
+        rolls = self._matching(filters)
+        if rolls is None:
+            return list(self._by_roll.values())
+        # Keep the listing order stable (order of insertion)
+        return [self._by_roll[r] for r in sorted(rolls, key=self._order.__getitem__)]
+
+    def _matching(self, filters):
+        """Rolls matching every non-None filter, or None when there are no filters."""
+        rolls = None
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in self._indexes:
+                raise ValueError(f"Cannot filter students by '{field}'")
+            matched = self._indexes[field].get(value, set())
+            rolls = set(matched) if rolls is None else rolls & matched
+            if not rolls:
+                return set()
+        return rolls
+
+    def iter_students(self, **filters):
+        """Iterate over (optionally filtered) students, e.g. for exports.
+
+        Iterates over a snapshot of the records, so it is safe to consume
+        from a background thread while requests keep writing.
+        """
+        return iter(self.find(**filters))
+
+    def count(self, **filters):
+        rolls = self._matching(filters)
+        return len(self._by_roll) if rolls is None else len(rolls)
+
+    def search(self, query="", offset=0, limit=50, **facets):
+        """Students with name/roll words starting with each word of `query`, narrowed by facets.
+
+        Facets are branch, section, year and grade. Returns (the page of
+        matches, number of matches, {facet: {value: count}}).
+        """
+        unknown = set(facets) - set(SEARCH_FACETS)
+        if unknown:
+            raise ValueError(f"Cannot filter students by '{unknown.pop()}'")
+        rolls = self.search_index.match(query)
+        if rolls is not None:
+            candidates = [self._by_roll[roll] for roll in sorted(rolls, key=self._order.__getitem__)]
+            matched, counts = facet_counts(candidates, facets)
+            return matched[offset:offset + limit], len(matched), counts
+
+        # No words: count from the per-combination totals instead of visiting every student
+        groups = [dict(zip(SEARCH_FACETS, key), n=n) for key, n in list(self._facet_groups.items())]
+        matched, counts = facet_counts(groups, facets, weight=lambda group: group["n"])
+        if not any(facets.values()):
+            page = list(self.page(offset, limit))
+        else:
+            members = self.find(**{field: facets.get(field) for field in self.INDEXED_FIELDS})
+            if facets.get("grade"):
+                members = [student for student in members if student["grade"] == facets["grade"]]
+            page = members[offset:offset + limit]
+        return page, sum(group["n"] for group in matched), counts
+
+    def columns(self):
+        """Every student's results as a ColumnarResults snapshot, rebuilt only after writes."""
+        writes, columns = self._columns
+        if columns is None or writes != self._writes:
+            writes = self._writes
+            columns = ColumnarResults.from_students(list(self._by_roll.values()))
+            self._columns = (writes, columns)
+        return columns
+
+    def values_of(self, field):
+        """Distinct values currently stored for an indexed field."""
+        return sorted(self._indexes[field])
+
+    def top(self, n, branch=None, section=None, year=None):
+        """The n best students of a cohort, best first."""
+        return [self._by_roll[roll] for roll in self.ranking.top(n, branch, section, year)]
+
+    def rank(self, roll, branch=None, section=None, year=None):
+        """(rank, cohort size, percentile) for a roll, or None if not in that cohort."""
+        student = self._by_roll.get(roll)
+        return self.ranking.rank(student, branch, section, year) if student else None
+
+    def grade_distribution(self, branch=None, section=None, year=None):
+        return self.ranking.grade_distribution(branch, section, year)
+
+    def regrade(self, scheme, branch=None, year=None, exclude=()):
+        """Grade a program/year under `scheme` in one pass. Returns (percentages, grades).
+
+        `exclude` lists (branch, year) cohorts to leave alone, "" matching any.
+        """
+        members = self._regrade_members(branch, year, exclude)
+        percentages = [student["percentage"] for student in members]
+        grades = scheme.grade_all(percentages)
+        for student, grade in zip(members, grades):
+            if student["grade"] != grade:
+                self.ranking.remove(student)
+                self._count_group(student, -1)
+                student["grade"] = grade
+                self._count_group(student, 1)
+                self.ranking.add(student)
+                self._writes += 1
+        return percentages, grades
+
+    def _regrade_members(self, branch, year, exclude):
+        return [student for student in self.find(branch=branch, year=year)
+                if not any(other_branch in ("", student["branch"]) and other_year in ("", student["year"])
+                           for other_branch, other_year in exclude)]
+
+    def _index(self, student, ranked=True):
+        for field, index in self._indexes.items():
+            index.setdefault(student[field], set()).add(student["roll"])
+        if ranked:
+            self.ranking.add(student)
+        self.search_index.add(student["roll"], student["name"])
+        self._count_group(student, 1)
+        self._writes += 1
+
+    def _count_group(self, student, delta):
+        key = tuple(student[field] for field in SEARCH_FACETS)
+        n = self._facet_groups.get(key, 0) + delta
+        if n:
+            self._facet_groups[key] = n
+        else:
+            del self._facet_groups[key]
+
+    def _unindex(self, student):
+        self.ranking.remove(student)
+        self.search_index.remove(student["roll"])
+        self._count_group(student, -1)
+        self._writes += 1
+        for field, index in self._indexes.items():
+            rolls = index.get(student[field])
+            if rolls is not None:
+                rolls.discard(student["roll"])
+                if not rolls:
+                    del index[student[field]]
+
+
+def open_store(backend="memory"):
+    """Create the student store for a backend name ("memory" or "sqlite")."""
+    if backend == "memory":
+        from config.config import MEMORY_JOURNAL_DIR
+        if MEMORY_JOURNAL_DIR:
+            from config.config import JOURNAL_COMMIT_DELAY_MS, SNAPSHOT_JOURNAL_BYTES
+            from models.durable_store import DurableStudentStore
+            return DurableStudentStore(MEMORY_JOURNAL_DIR, JOURNAL_COMMIT_DELAY_MS / 1000, SNAPSHOT_JOURNAL_BYTES)
+        return StudentStore()
+    if backend == "sqlite":
+        from database.sqlite_store import SqliteStudentStore
+        return SqliteStudentStore()
+    raise ValueError(f"Unknown storage backend '{backend}'")
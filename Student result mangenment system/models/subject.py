@@ -1,7 +1,135 @@
-subjects = []
+import threading
+from bisect import bisect_left, insort
 
-def add_subject(subject_name):
-    subjects.append({"name": subject_name})
 
-def get_all_subjects():
-    return subjects
+def subject_key(name):
+    """The catalog key of a subject name: case folded, runs of whitespace collapsed.
+
+    "Data  Structures" and "data structures" share a key, and so one subject id.
+    """
+    return " ".join(str(name).split()).casefold()
+
+
+def subject_label(name):
+    """A subject name as it is first stored: trimmed, single spaces, case kept."""
+    return " ".join(str(name).split())
+
+
+class SubjectCatalog:
+    """Every subject in the subjects table, with its integer id and a prefix index.
+
+    The table is the source of truth (results refer to subjects by id); this
+    process keeps a copy: key -> id, id -> display name, and a sorted list
+    of (word key, id) pairs, one per word of each name, so completing "str"
+    finds "Data Structures" with a bisect instead of a scan. Subjects are
+    never deleted, so sync() only has to fetch rows with a larger id than
+    the last one seen, which is one indexed query.
+
+    With persistent=False there is no table: subjects live only in this
+    catalog and get ids in the order they are added (the in-memory store's).
+    """
+
+    def __init__(self, persistent=True):
+        self.persistent = persistent
+        self._ids = {}
+        self._names = {}
+        self._prefixes = []
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        self.sync()
+        return len(self._names)
+
+    def sync(self, conn=None):
+        """Pick up subjects added since the last call, by this or any other process.
+
+        Skipped while the connection is inside a transaction, whose new rows
+        might still be rolled back; transaction() syncs once it commits.
+        """
+        if not self.persistent:
+            return
+        if conn is None:
+            from database.database import connect_db
+            conn = connect_db()
+        if conn.in_transaction:
+            return
+        rows = conn.execute("SELECT id, name FROM subjects WHERE id > ? ORDER BY id", (self._last_id,)).fetchall()
+        if rows:
+            with self._lock:
+                for sid, name in rows:
+                    self._insert(sid, name)
+
+    def _insert(self, sid, name):
+        # Callers hold self._lock
+        if sid in self._names:
+            return
+        key = subject_key(name)
+        self._ids[key] = sid
+        self._names[sid] = name
+        words = key.split(" ")
+        for i in range(len(words)):
+            insort(self._prefixes, (" ".join(words[i:]), sid))
+        self._last_id = max(self._last_id, sid)
+
+    def add(self, name):
+        """Id of a subject, adding it to the catalog if it is new."""
+        key = subject_key(name)
+        if not key:
+            raise ValueError("Subject name cannot be empty")
+        sid = self._ids.get(key)
+        if sid is None and not self.persistent:
+            with self._lock:
+                sid = self._ids.get(key)
+                if sid is None:
+                    sid = self._last_id + 1
+                    self._insert(sid, subject_label(name))
+        elif sid is None:
+            from database.database import subject_id, transaction
+            with transaction() as conn:
+                sid = subject_id(conn, name)
+        return sid
+
+    def id_of(self, name):
+        """Id of a known subject (any case or spacing), or None."""
+        key = subject_key(name)
+        if key not in self._ids:
+            self.sync()
+        return self._ids.get(key)
+
+    def name_of(self, sid):
+        if sid not in self._names:
+            self.sync()
+        return self._names.get(sid)
+
+    def canonical(self, name):
+        """The catalog spelling of a subject name, adding the name if it is new."""
+        sid = self._ids.get(subject_key(name))
+        return self._names[sid] if sid is not None else self.name_of(self.add(name))
+
+    def all(self):
+        """[(id, name)] of every subject, sorted by name."""
+        self.sync()
+        with self._lock:
+            return sorted(self._names.items(), key=lambda item: subject_key(item[1]))
+
+    def complete(self, prefix, limit=10):
+        """Up to `limit` (id, name) pairs with a word starting with `prefix`, whole-name matches first."""
+        key = subject_key(prefix)
+        if not key:
+            return []
+        self.sync()
+        matches = {}
+        with self._lock:
+            i = bisect_left(self._prefixes, (key,))
+            while i < len(self._prefixes) and self._prefixes[i][0].startswith(key):
+                sid = self._prefixes[i][1]
+                if sid not in matches:
+                    matches[sid] = not subject_key(self._names[sid]).startswith(key)
+                i += 1
+            ranked = sorted(matches, key=lambda sid: (matches[sid], subject_key(self._names[sid])))
+            return [(sid, self._names[sid]) for sid in ranked[:limit]]
+
+
+# The subjects table's catalog, shared by the whole process: the SQLite store and the forms
+catalog = SubjectCatalog()
@@ -0,0 +1,74 @@
+"""Shared test setup: run from the project folder with `python -m pytest -q`.
+
+Every test gets its own scratch database; nothing here touches database/students.db.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+# Settings are read at import time, so point them away from real data before anything imports them
+os.environ["STUDENT_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="student-tests-"), "unused.db")
+os.environ.pop("MEMORY_JOURNAL_DIR", None)
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def scratch_db(tmp_path, monkeypatch):
+    """A fresh database file for each test, migrated on first use like the real one."""
+    import database.database as db
+    from models.subject import catalog
+
+    db.close_db()
+    catalog.__init__()
+    path = str(tmp_path / "students.db")
+    monkeypatch.setattr(db, "DB_PATH", path)
+    monkeypatch.setattr(db, "_schema_ready", False)
+    yield path
+    db.close_db()
+    catalog.__init__()
+
+
+@pytest.fixture
+def client(request, scratch_db, tmp_path, monkeypatch):
+    """A test client for the portal on the SQLite store (parametrize indirectly for "memory")."""
+    sys.path.insert(0, os.path.join(BASE_DIR, "app"))
+    import app as portal
+    # Startup creates and prunes the job file folder; keep it out of database/
+    monkeypatch.setattr(portal, "JOB_FILES_DIR", str(tmp_path / "job_files"))
+    app = portal.create_app(getattr(request, "param", "sqlite"))
+    yield app.test_client()
+    app.extensions["jobs"].shutdown()
+
+
+def log_in(client):
+    """Give the test client a faculty session."""
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, scratch_db):
+    """An empty student store, once per backend."""
+    from models.student_store import open_store
+    return open_store(request.param)
+
+
+def make_student(roll, marks=(("Maths", 70, 100),), name=None, branch="CSE", section="A", year="1", grade=None):
+    """A student record as the forms and the API produce it, scored on the default scale."""
+    from controllers.calculate_result import summarize_marks
+    subjects = [{"name": subject, "obtained": obtained, "total": total} for subject, obtained, total in marks]
+    summary = summarize_marks(subjects)
+    return {"name": name or f"Student {roll}", "roll": roll, "branch": branch, "section": section, "year": year,
+            "subjects": subjects, "percentage": summary["percentage"], "grade": grade or summary["grade"]}
+
+
+def other_worker(path, sql, params=()):
+    """Write to the database the way another gunicorn worker would: its own connection."""
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
@@ -0,0 +1,69 @@
+import random
+import statistics
+import pytest
+from conftest import log_in, make_student
+from controllers import analytics
+from controllers.analytics import cohort_analytics
+
+
+@pytest.fixture
+def marked(store):
+    rng = random.Random(7)
+    store.upsert_many(make_student(f"R{i}", [("Maths", rng.randint(0, 50), 50), ("Physics", rng.randint(0, 100), 100)]
+                                   + ([("Chemistry", rng.randint(0, 100), 100)] if i % 3 else []),
+                                   branch=("CSE", "ECE")[i % 2], section="AB"[i % 4 // 2]) for i in range(60))
+    return store
+
+
+def expected_subject(store, name, **cohort):
+    values = sorted(100 * sub["obtained"] / sub["total"] for s in store.find(**cohort)
+                    for sub in s["subjects"] if sub["name"] == name)
+    histogram = [0] * 10
+    for v in values:
+        histogram[min(int(v / 10), 9)] += 1
+    return {"subject": name, "results": len(values), "mean": round(statistics.fmean(values), 2),
+            "median": round(statistics.median(values), 2), "std": round(statistics.pstdev(values), 2),
+            "min": round(values[0], 2), "max": round(values[-1], 2),
+            "pass_rate": round(100 * sum(v >= 50 for v in values) / len(values), 2), "histogram": histogram}
+
+
+@pytest.mark.parametrize("vectorised", [True, False])
+def test_statistics_match_a_plain_computation(marked, vectorised, monkeypatch):
+    if not vectorised:
+        monkeypatch.setattr(analytics, "np", None)
+    for cohort in ({}, {"branch": "ECE"}, {"branch": "CSE", "section": "B"}):
+        stats = cohort_analytics(marked, **cohort)
+        assert stats["subjects"] == [expected_subject(marked, name, **cohort)
+                                     for name in ("Chemistry", "Maths", "Physics")]
+        members = marked.find(**cohort)
+        percentages = [s["percentage"] for s in members]
+        assert stats["students"] == len(members)
+        assert stats["mean"] == pytest.approx(statistics.fmean(percentages), abs=0.01)
+        assert stats["median"] == pytest.approx(statistics.median(percentages), abs=0.01)
+        cells = {}
+        for s in members:
+            cell = cells.setdefault((s["branch"], s["section"]), {})
+            cell[s["grade"]] = cell.get(s["grade"], 0) + 1
+        assert stats["grades"] == [{"branch": b, "section": sec, "total": sum(g.values()), "grades": g}
+                                   for (b, sec), g in sorted(cells.items())]
+
+
+def test_results_are_cached_until_a_write(marked):
+    first = cohort_analytics(marked, branch="CSE")
+    assert cohort_analytics(marked, branch="CSE") is first
+    marked.upsert(make_student("R0", [("Maths", 50, 50)]))
+    again = cohort_analytics(marked, branch="CSE")
+    assert again is not first and again["students"] == first["students"]
+    assert cohort_analytics(marked, branch="MECH") == {"students": 0, "mean": 0.0, "median": 0.0, "pass_rate": 0.0,
+                                                       "subjects": [], "grades": []}
+
+
+@pytest.mark.parametrize("client", ["memory", "sqlite"], indirect=True)
+def test_analytics_dashboard(client):
+    log_in(client)
+    client.application.extensions["student_store"].upsert_many(
+        [make_student("R1", [("Maths", 45, 50)]), make_student("R2", [("Maths", 20, 50)], branch="ECE")])
+    stats = client.get("/analytics?format=json&branch=ECE").get_json()
+    assert stats["students"] == 1 and stats["subjects"][0]["mean"] == 40
+    page = client.get("/analytics").get_data(as_text=True)
+    assert "Maths" in page and "ECE" in page
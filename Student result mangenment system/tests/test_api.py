@@ -0,0 +1,97 @@
+import pytest
+from conftest import log_in, make_student
+from controllers import calculate_result
+from controllers.calculate_result import score_students
+from utils.grading import DEFAULT_SCHEME
+from utils.validation import validate_student
+
+
+def record(**subject):
+    return {"name": "Asha", "roll": "R1", "branch": "CSE", "section": "A", "year": "1",
+            "subjects": [dict({"name": "Maths", "obtained": 45, "total": 50}, **subject)]}
+
+
+@pytest.mark.parametrize("subject, marks", [
+    ({}, (45, 50)),
+    ({"obtained": "45", "total": "50"}, (45, 50)),
+    ({"obtained": 45.0, "total": 50.0}, (45, 50)),
+])
+def test_validate_student_accepts_whole_numbers(subject, marks):
+    sub, = validate_student(record(**subject))["subjects"]
+    assert (sub["obtained"], sub["total"]) == marks
+    assert type(sub["obtained"]) is int and type(sub["total"]) is int
+
+
+@pytest.mark.parametrize("subject", [
+    {"obtained": 49.9},      # would have been stored as 49
+    {"obtained": "45.5"},
+    {"obtained": True},
+    {"total": False},
+    {"obtained": None},
+])
+def test_validate_student_rejects_other_marks(subject):
+    with pytest.raises(ValueError, match="whole numbers"):
+        validate_student(record(**subject))
+
+
+def test_batches_look_up_each_scheme_once(monkeypatch):
+    looked_up = []
+    monkeypatch.setattr(calculate_result, "scheme_for", lambda *cohort: looked_up.append(cohort) or DEFAULT_SCHEME)
+    score_students(make_student(f"R{i}", year=str(i % 2 + 1)) for i in range(100))
+    assert sorted(looked_up) == [("CSE", "1"), ("CSE", "2")]
+
+
+both_stores = pytest.mark.parametrize("client", ["memory", "sqlite"], indirect=True)
+
+
+def post_students(client, *rows):
+    return client.post("/api/students", json={"students": [
+        dict(make_student(roll, branch=branch, name=f"Student {chr(64 + n)}"), section="A")
+        for n, (roll, branch) in enumerate(rows, 1)]})
+
+
+@both_stores
+def test_api_needs_a_session_or_token(client):
+    assert client.get("/api/students").status_code == 401
+    log_in(client)
+    assert client.get("/api/students").status_code == 200
+
+
+@both_stores
+def test_bulk_upsert_reports_bad_records_by_index(client):
+    log_in(client)
+    bad_name = dict(record(), roll="R9", name="R2D2")
+    response = client.post("/api/students", json={"students": [record(), "R2", bad_name, record(obtained=51)]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["created"], body["updated"]) == (1, 0)
+    assert [(e["index"], e["roll"]) for e in body["errors"]] == [(1, None), (2, "R9"), (3, "R1")]
+    assert client.post("/api/students", json={"students": [record(obtained=50)]}).get_json()["updated"] == 1
+    assert client.get("/api/students/R1").get_json()["grade"] == "O"
+    assert client.post("/api/students", json={"students": [bad_name]}).status_code == 400
+
+
+@both_stores
+def test_filtered_listing_pages_in_the_store(client):
+    log_in(client)
+    post_students(client, *[(f"C{i}", "CSE") for i in range(1, 6)], ("E1", "ECE"), ("E2", "ECE"))
+    body = client.get("/api/students?branch=CSE&page=2&limit=2").get_json()
+    assert [s["roll"] for s in body["students"]] == ["C3", "C4"]
+    assert (body["page"], body["limit"], body["total"]) == (2, 2, 5)
+    body = client.get("/api/students?page=4&limit=2").get_json()
+    assert [s["roll"] for s in body["students"]] == ["E2"] and body["total"] == 7
+    assert client.get("/api/students?branch=MECH").get_json() == {"students": [], "page": 1, "limit": 50,
+                                                                   "total": 0}
+    assert client.get("/api/students?limit=100000").get_json()["limit"] == 500
+    assert client.get("/api/students?page=two").status_code == 400
+
+
+@both_stores
+def test_fetch_and_search(client):
+    log_in(client)
+    post_students(client, ("C1", "CSE"), ("E1", "ECE"))
+    body = client.post("/api/students/fetch", json={"rolls": ["E1", "X9", "C1"]}).get_json()
+    assert [s["roll"] for s in body["students"]] == ["E1", "C1"] and body["missing"] == ["X9"]
+    body = client.get("/api/search?q=stud&branch=ECE").get_json()
+    assert [s["roll"] for s in body["students"]] == ["E1"] and body["total"] == 1
+    assert client.get("/api/students/X9").status_code == 404
@@ -0,0 +1,59 @@
+import pytest
+from conftest import log_in, make_student, other_worker
+from database.sqlite_store import SqliteStudentStore
+from utils.cache import ResponseCache
+
+
+def test_version_moves_on_writes_from_any_connection(scratch_db):
+    store = SqliteStudentStore()
+    store.upsert(make_student("R1"))
+    version = store.shared_version()
+    other_worker(scratch_db, "UPDATE results SET mark = 10")
+    assert store.shared_version() != version
+
+
+def test_entries_from_an_older_version_miss():
+    cache = ResponseCache()
+    cache.set("page", "rows", version=1, tags=("R1",))
+    assert cache.get("page", version=1).value == "rows"
+    assert cache.get("page", version=2) is None
+    # The stale entry is dropped, not kept around for the old version
+    assert cache.get("page", version=1) is None
+    cache.set("page", "rows", version=2, tags=("R1",))
+    cache.invalidate("R1")
+    assert len(cache) == 0
+
+
+def test_snapshots_rebuild_after_another_worker_writes(scratch_db):
+    store = SqliteStudentStore()
+    store.upsert_many([make_student("R1", [("Maths", 90, 100)]), make_student("R2", [("Maths", 60, 100)])])
+    assert store.rank("R2") == (2, 2, 50.0)
+    assert len(store.columns()) == 2
+    other_worker(scratch_db, "UPDATE results SET mark = 99 WHERE student_id = "
+                             "(SELECT id FROM students WHERE roll = 'R2')")
+    assert store.rank("R2") == (1, 2, 100.0)
+    other_worker(scratch_db, "INSERT INTO students (name, roll, branch, section, year) "
+                             "VALUES ('New', 'R3', 'CSE', 'A', '1')")
+    assert len(store.columns()) == 3
+    assert store.search()[1] == 3
+
+
+@pytest.mark.parametrize("client", ["memory", "sqlite"], indirect=True)
+def test_results_page_rendered_during_a_write_is_not_kept(client):
+    log_in(client)
+    app = client.application
+    store = app.extensions["student_store"]
+    store.upsert(make_student("R1", [("Maths", 61, 100)]))
+    page = store.page
+
+    def page_then_edit(offset, limit):
+        rows = list(page(offset, limit))
+        # Another request edits R1 while this one is still rendering the old record
+        store.upsert(make_student("R1", [("Maths", 97, 100)]))
+        for cache in app.extensions["page_caches"]:
+            cache.invalidate("R1")
+        store.page = page
+        return rows
+    store.page = page_then_edit
+    assert b"61" in client.get("/results").data
+    assert b"97" in client.get("/results").data
@@ -0,0 +1,58 @@
+import csv
+import io
+import zipfile
+import pytest
+from conftest import log_in, make_student
+from controllers import export_results
+from controllers.export_results import HEADER, stream_csv, write_report_cards, write_xlsx
+
+STUDENTS = [make_student("R1", [("Maths", 45, 50), ("Physics", 30, 50)]), make_student("R2", [], branch="ECE")]
+
+
+def test_csv_streams_in_chunks(monkeypatch):
+    monkeypatch.setattr(export_results, "CSV_FLUSH_ROWS", 2)
+    chunks = list(stream_csv(iter(STUDENTS)))
+    assert len(chunks) == 2
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+    assert rows[0] == HEADER
+    assert rows[1] == ["R1", "Student R1", "CSE", "A", "1", "Maths", "45", "50", "75.0", "B"]
+    assert rows[3][:6] == ["R2", "Student R2", "ECE", "A", "1", ""]  # no marks yet: one row
+    assert len(rows) == 4
+
+
+def test_xlsx_mark_sheet(tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+    monkeypatch.setattr(export_results, "CSV_FLUSH_ROWS", 1)
+    done = []
+    write_xlsx(iter(STUDENTS), tmp_path / "sheet.xlsx", progress=done.append)
+    rows = list(openpyxl.load_workbook(tmp_path / "sheet.xlsx").active.values)
+    assert list(rows[0]) == HEADER and rows[2][5:8] == ("Physics", 30, 50)
+    assert done == [1, 2]
+
+
+def test_report_cards_are_rendered_by_worker_processes(tmp_path):
+    pytest.importorskip("reportlab")
+    done = []
+    students = [make_student(f"R{i}") for i in range(5)]
+    write_report_cards(iter(students), tmp_path / "cards.zip", progress=done.append, workers=2, chunk_size=2)
+    with zipfile.ZipFile(tmp_path / "cards.zip") as archive:
+        assert sorted(archive.namelist()) == [f"report_card_R{i}.pdf" for i in range(5)]
+        assert archive.read("report_card_R0.pdf").startswith(b"%PDF")
+    assert done == [2, 4, 5]
+
+
+def test_export_routes(client):
+    log_in(client)
+    client.application.extensions["student_store"].upsert_many(STUDENTS)
+    response = client.get("/export/csv?branch=ECE")
+    assert response.is_streamed
+    assert 'filename="results_ECE.csv"' in response.headers["Content-Disposition"]
+    assert [row[0] for row in csv.reader(io.StringIO(response.get_data(as_text=True)))] == ["Roll", "R2"]
+    assert client.get("/export/doc").status_code == 302
+    if export_results.Workbook is not None:
+        job_url = client.get("/export/xlsx").headers["Location"]
+        client.application.extensions["jobs"].shutdown()
+        job = client.get(job_url + "?format=json").get_json()
+        assert job["status"] == "done" and job["result"]["filename"] == "results.xlsx"
+        download = client.get(job_url + "/download")
+        assert download.data.startswith(b"PK")
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import pytest
+from conftest import BASE_DIR, make_student
+
+sys.path.insert(0, os.path.join(BASE_DIR, "app"))
+import app as portal
+import database.database as db
+
+
+@pytest.fixture
+def jobs_dir(tmp_path, monkeypatch):
+    path = tmp_path / "job_files"
+    monkeypatch.setattr(portal, "JOB_FILES_DIR", str(path))
+    return path
+
+
+def test_importing_the_app_touches_no_database(tmp_path):
+    env = dict(os.environ, STUDENT_DB_PATH=str(tmp_path / "students.db"))
+    env.pop("MEMORY_JOURNAL_DIR", None)
+    subprocess.run([sys.executable, "-c", "import sys; sys.path.insert(0, 'app'); import app; app.create_app('sqlite')"],
+                   cwd=BASE_DIR, env=env, check=True)
+    assert os.listdir(tmp_path) == []
+
+
+def test_startup_work_waits_for_the_first_request(scratch_db, jobs_dir, monkeypatch):
+    runs = []
+    startup = portal.startup
+    monkeypatch.setattr(portal, "startup", lambda: runs.append(1) or startup())
+    app = portal.create_app("sqlite")
+    assert not os.path.exists(scratch_db) and not jobs_dir.exists()
+    client = app.test_client()
+    client.get("/home")
+    client.get("/home")
+    assert runs == [1] and jobs_dir.is_dir() and os.path.exists(scratch_db)
+    app.extensions["jobs"].shutdown()
+
+
+def test_prewarm_compiles_templates_and_leaves_no_connection(scratch_db, jobs_dir):
+    app = portal.create_app("sqlite")
+    portal.prewarm(app)
+    assert app.extensions["started"]
+    assert set(app.jinja_env.list_templates()) <= {name for _, name in app.jinja_env.cache.keys()}
+    assert getattr(db._local, "conn", None) is None
+    # The schema is in place for the forked workers
+    app.extensions["student_store"].upsert(make_student("R1"))
+    assert len(app.extensions["student_store"]) == 1
+
+
+def test_each_app_gets_its_own_state(jobs_dir):
+    first, second = portal.create_app("memory"), portal.create_app("memory")
+    first.extensions["student_store"].upsert(make_student("R1"))
+    assert len(second.extensions["student_store"]) == 0
+    assert first.extensions["page_caches"][0] is not second.extensions["page_caches"][0]
@@ -0,0 +1,96 @@
+import io
+import pytest
+from conftest import make_student
+from controllers.calculate_result import score_students
+from controllers.grading import list_assignments, regrade_cohort, save_scheme, scheme_for
+from controllers.import_results import import_results
+from controllers.summary import rebuild_summaries
+from database.sqlite_store import SqliteStudentStore
+from utils.grading import DEFAULT_SCHEME, GradingScheme
+
+
+def grades(store):
+    return {s["roll"]: s["grade"] for s in store}
+
+
+@pytest.fixture
+def cohort(store):
+    # CSE year 1 gets its own scheme; ECE stays on the default scale
+    store.upsert_many([make_student("C1", [("Maths", 92, 100)]), make_student("C2", [("Maths", 75, 100)]),
+                       make_student("C3", [("Maths", 55, 100)]), make_student("C4", [("Maths", 40, 100)]),
+                       make_student("E1", [("Maths", 92, 100)], branch="ECE")])
+    return store
+
+
+def test_absolute_regrade(cohort):
+    save_scheme(GradingScheme("Strict", [(90, "P+"), (60, "P")], fail_grade="NP"))
+    assert regrade_cohort(cohort, "Strict", branch="CSE", year="1") == 4
+    assert grades(cohort) == {"C1": "P+", "C2": "P", "C3": "NP", "C4": "NP", "E1": "O"}
+    assert scheme_for("CSE", "1").name == "Strict"
+    assert scheme_for("ECE", "1") is DEFAULT_SCHEME
+    new, = score_students([make_student("C5", [("Maths", 65, 100)])])
+    assert new["grade"] == "P"
+
+
+def test_relative_regrade_grades_new_marks_on_its_curve(cohort):
+    save_scheme(GradingScheme("Curve", [(75, "A"), (25, "B")], kind="relative"))
+    regrade_cohort(cohort, "Curve", branch="CSE")
+    # Share of the cohort below each student: 75%, 50%, 25%, 0%
+    assert grades(cohort) == {"C1": "A", "C2": "B", "C3": "B", "C4": "F", "E1": "O"}
+    # Later marks use the cutoffs the curve produced: A from 92%, B from 55%
+    scored = score_students([make_student(roll, [("Maths", mark, 100)]) for roll, mark in
+                             (("C5", 95), ("C6", 60), ("C7", 50))])
+    assert [s["grade"] for s in scored] == ["A", "B", "F"]
+
+
+def test_regrade_leaves_cohorts_with_their_own_scheme(cohort):
+    cohort.upsert(make_student("C9", [("Maths", 75, 100)], year="2"))
+    save_scheme(GradingScheme("Strict", [(90, "P+"), (60, "P")], fail_grade="NP"))
+    save_scheme(GradingScheme("Lenient", [(50, "Pass")], fail_grade="Retry"))
+    regrade_cohort(cohort, "Strict", branch="CSE", year="2")
+    # All of CSE, except year 2 which has its own assignment
+    assert regrade_cohort(cohort, "Lenient", branch="CSE") == 4
+    assert grades(cohort) == {"C1": "Pass", "C2": "Pass", "C3": "Pass", "C4": "Retry", "C9": "P", "E1": "O"}
+    # The catch-all only reaches ECE
+    assert regrade_cohort(cohort, "Strict") == 1
+    assert grades(cohort)["E1"] == "P+" and grades(cohort)["C1"] == "Pass"
+
+
+def test_failed_regrade_leaves_grades_and_assignment_unchanged(scratch_db, monkeypatch):
+    store = SqliteStudentStore()
+    store.upsert_many([make_student("C1", [("Maths", 92, 100)]), make_student("C2", [("Maths", 40, 100)])])
+    save_scheme(GradingScheme("Curve", [(50, "A")], kind="relative"))
+
+    def fail(*args):
+        raise RuntimeError("curve failed")
+    monkeypatch.setattr(GradingScheme, "curve", fail)
+    with pytest.raises(RuntimeError):
+        regrade_cohort(store, "Curve", branch="CSE")
+    assert grades(store) == {"C1": "O", "C2": "F"}
+    assert list_assignments() == []
+
+
+def test_unknown_scheme():
+    with pytest.raises(ValueError):
+        regrade_cohort(None, "Nope")
+
+
+def test_imports_keep_the_assigned_scheme(cohort):
+    save_scheme(GradingScheme("Strict", [(90, "P+"), (60, "P")], fail_grade="NP"))
+    regrade_cohort(cohort, "Strict", branch="CSE", year="1")
+    result = import_results(io.StringIO("roll,subject,mark\nC4,Physics,100\nE1,Physics,50\n"), store=cohort)
+    assert result["errors"] == []
+    # C4: 70% on Strict; E1: 71% on the default scale
+    assert grades(cohort)["C4"] == "P"
+    assert grades(cohort)["E1"] == "C"
+
+
+def test_rebuilt_summaries_keep_the_assigned_scheme(scratch_db):
+    from database.sqlite_store import SqliteStudentStore
+    store = SqliteStudentStore()
+    store.upsert_many([make_student("C1", [("Maths", 75, 100)]), make_student("E1", [("Maths", 75, 100)],
+                                                                              branch="ECE")])
+    save_scheme(GradingScheme("Strict", [(90, "P+"), (60, "P")], fail_grade="NP"))
+    regrade_cohort(store, "Strict", branch="CSE")
+    assert rebuild_summaries() == 2
+    assert grades(store) == {"C1": "P", "E1": "B"}
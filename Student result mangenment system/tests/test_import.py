@@ -0,0 +1,79 @@
+import io
+import pytest
+from conftest import make_student
+from controllers.import_results import import_results, validate_row
+from utils.validation import MAX_MARK
+
+
+def run(store, text, fmt="csv", **kwargs):
+    return import_results(io.StringIO(text), fmt, store=store, **kwargs)
+
+
+def marks(store, roll):
+    return {sub["name"]: (sub["obtained"], sub["total"]) for sub in store.get(roll)["subjects"]}
+
+
+def test_validate_row():
+    assert validate_row({"roll": " R1 ", "subject": "Maths", "mark": "45", "total": ""}) == ("R1", "Maths", 45, 100)
+    assert validate_row({"roll": "R1", "subject": "Maths", "mark": 9, "total": 10}) == ("R1", "Maths", 9, 10)
+    assert validate_row({"roll": "R1", "subject": "Maths", "mark": 9.0, "total": 10.0}) == ("R1", "Maths", 9, 10)
+
+
+@pytest.mark.parametrize("row, message", [
+    ({"roll": "R1", "mark": "4"}, "Missing subject"),
+    ({"roll": "R1", "subject": "Maths", "mark": "four"}, "whole numbers"),
+    ({"roll": "R1", "subject": "Maths", "mark": "0", "total": "0"}, "must be positive"),
+    ({"roll": "R1", "subject": "Maths", "mark": "11", "total": "10"}, "between 0 and 10"),
+    ({"roll": "R1", "subject": "Maths", "mark": "-1"}, "between 0 and 100"),
+    ({"roll": "R1", "subject": "Maths", "mark": "1", "total": str(MAX_MARK + 1)}, "too large"),
+    (["R1", "Maths", 4], "Row must be an object"),
+    # JSON numbers are not truncated: only whole numbers are marks
+    ({"roll": "R1", "subject": "Maths", "mark": 45.7}, "whole numbers"),
+    ({"roll": "R1", "subject": "Maths", "mark": "45.5"}, "whole numbers"),
+    ({"roll": "R1", "subject": "Maths", "mark": True}, "whole numbers"),
+    ({"roll": "R1", "subject": "Maths", "mark": 4, "total": False}, "whole numbers"),
+])
+def test_validate_row_errors(row, message):
+    with pytest.raises(ValueError, match=message):
+        validate_row(row)
+
+
+def test_import_sets_one_mark_per_subject(store):
+    store.upsert(make_student("R1", [("Maths", 80, 100)]))
+    sheet = "roll,subject,mark,total\nR1,physics ,40,50\nR1,Physics,45,50\nR1,maths,70,\n"
+    assert run(store, sheet) == {"imported": 3, "errors": []}
+    # Importing the same sheet again changes nothing
+    assert run(store, sheet) == {"imported": 3, "errors": []}
+    assert marks(store, "R1") == {"Maths": (70, 100), "physics": (45, 50)}
+    assert store.get("R1")["percentage"] == 76.67
+
+
+def test_import_reports_bad_rows_and_keeps_the_rest(store):
+    store.upsert_many([make_student("R1"), make_student("R2")])
+    sheet = "roll,subject,mark\nR1,Physics,40\nR9,Physics,40\nR2,Physics,x\nR2,Physics,60\n"
+    result = run(store, sheet, batch_size=2)
+    assert result == {"imported": 2, "errors": [(3, "No student with roll R9"),
+                                                (4, "mark and total must be whole numbers")]}
+    assert marks(store, "R2")["Physics"] == (60, 100)
+    assert "R9" not in store
+
+
+def test_import_json_lines(store):
+    store.upsert(make_student("R1"))
+    text = '{"roll": "R1", "subject": "Physics", "mark": 30, "total": 40}\n\nnot json\n'
+    result = run(store, text, fmt="json")
+    assert result["imported"] == 1
+    assert [line for line, _ in result["errors"]] == [3]
+    assert marks(store, "R1")["Physics"] == (30, 40)
+
+
+def test_import_rejects_fractional_and_boolean_json_marks(store):
+    store.upsert(make_student("R1"))
+    text = "\n".join(['{"roll": "R1", "subject": "Physics", "mark": 45.7}',
+                      '{"roll": "R1", "subject": "Physics", "mark": true}',
+                      '{"roll": "R1", "subject": "Chemistry", "mark": 45.0}'])
+    result = run(store, text, fmt="json")
+    assert result == {"imported": 1, "errors": [(1, "mark and total must be whole numbers"),
+                                                (2, "mark and total must be whole numbers")]}
+    assert "Physics" not in marks(store, "R1")
+    assert marks(store, "R1")["Chemistry"] == (45, 100)
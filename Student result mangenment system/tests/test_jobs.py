@@ -0,0 +1,80 @@
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from controllers.jobs import JobRunner, cancel_job, fail_interrupted_jobs, get_job, prune_job_files
+from database.database import transaction
+
+
+@pytest.fixture
+def runner(scratch_db):
+    runner = JobRunner(max_workers=1)
+    yield runner
+    runner.shutdown()
+
+
+def finish(runner, job_id):
+    runner.shutdown()
+    return get_job(job_id)
+
+
+def test_job_reports_progress_and_result(runner):
+    def count(context, n):
+        for i in range(n):
+            context.progress((i + 1) / n, f"{i + 1} done")
+        return {"counted": n}
+    job = finish(runner, runner.submit("count", count, 3))
+    assert job["status"] == "done" and job["finished"]
+    assert job["progress"] == 1 and job["message"] == "3 done"
+    assert job["result"] == {"counted": 3}
+
+
+def test_failed_job_is_logged(runner, caplog):
+    def boom(context):
+        raise ValueError("boom")
+    with caplog.at_level(logging.ERROR, logger="controllers.jobs"):
+        job = finish(runner, runner.submit("boom", boom))
+    assert (job["status"], job["message"]) == ("failed", "ValueError: boom")
+    record, = caplog.records
+    assert record.getMessage() == f"job {job['id']} failed"
+    assert record.exc_info[0] is ValueError
+
+
+def test_cancel_stops_a_running_job_at_its_next_progress_call(runner):
+    started, go_on = threading.Event(), threading.Event()
+
+    def wait(context):
+        started.set()
+        go_on.wait(5)
+        context.progress(0.5)
+        return "not reached"
+    job_id = runner.submit("wait", wait)
+    assert started.wait(5)
+    assert cancel_job(job_id)["status"] == "running"
+    go_on.set()
+    assert finish(runner, job_id)["status"] == "cancelled"
+    assert cancel_job(job_id)["status"] == "cancelled"  # finished jobs stay as they are
+
+
+def test_jobs_of_dead_processes_are_failed(scratch_db):
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True, check=True)
+    with transaction() as conn:
+        for pid in (int(dead.stdout), os.getpid()):
+            conn.execute("INSERT INTO jobs (kind, status, progress, pid, created_at, updated_at) "
+                         "VALUES ('import', 'running', 0.5, ?, 0, 0)", (pid,))
+    assert fail_interrupted_jobs() == [1]
+    assert get_job(1)["status"] == "failed"
+    assert get_job(2)["status"] == "running"
+
+
+def test_prune_job_files(tmp_path):
+    old, new = tmp_path / "old.xlsx", tmp_path / "new.xlsx"
+    old.write_text("x")
+    new.write_text("x")
+    os.utime(old, (time.time() - 7200,) * 2)
+    assert prune_job_files(tmp_path, 3600) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["new.xlsx"]
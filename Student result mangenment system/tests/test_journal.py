@@ -0,0 +1,168 @@
+import os
+import threading
+import pytest
+from conftest import make_student
+from models import journal as journal_module
+from models.durable_store import DurableStudentStore
+from models.journal import Journal, read_snapshot, write_snapshot
+from models.student import Student
+
+
+def records(directory, start=0):
+    return list(Journal(directory).replay(start))
+
+
+def write(directory, *items):
+    journal = Journal(directory)
+    for item in items:
+        journal.wait(journal.append(item))
+    journal.close()
+
+
+def segment_file(directory):
+    (seq,) = Journal(directory).segments()[-1:]
+    return os.path.join(directory, f"journal-{seq:08d}.log")
+
+
+def dump(store):
+    return sorted((s.to_dict() for s in store), key=lambda d: d["roll"])
+
+
+def test_replay_returns_every_record_in_order(tmp_path):
+    write(tmp_path, {"op": "a"}, {"op": "b"})
+    # A second process (here: a second Journal) continues in a new segment
+    write(tmp_path, {"op": "c"})
+    assert len(Journal(tmp_path).segments()) == 2
+    assert records(tmp_path) == [{"op": "a"}, {"op": "b"}, {"op": "c"}]
+
+
+def test_truncated_tail_is_ignored(tmp_path, caplog):
+    write(tmp_path, {"op": "a"}, {"op": "b", "students": ["x" * 50]})
+    path = segment_file(tmp_path)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 7)
+    assert records(tmp_path) == [{"op": "a"}]
+    assert "torn or corrupt record" in caplog.text
+
+
+def test_bad_checksum_ends_its_segment_only(tmp_path):
+    write(tmp_path, {"op": "a"}, {"op": "b"}, {"op": "c"})
+    path = segment_file(tmp_path)
+    with open(path, "r+b") as f:
+        data = bytearray(f.read())
+        # Corrupt the payload of the second frame
+        second = journal_module._FRAME.size + len(b'{"op":"a"}')
+        data[second + journal_module._FRAME.size + 2] ^= 0xFF
+        f.seek(0)
+        f.write(data)
+    write(tmp_path, {"op": "d"})
+    assert records(tmp_path) == [{"op": "a"}, {"op": "d"}]
+
+
+def test_concurrent_writers_share_fsyncs(tmp_path, monkeypatch):
+    journal = Journal(tmp_path, commit_delay=0.005)
+    journal.wait(journal.append({"op": "open"}))
+    fsyncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(journal_module.os, "fsync", lambda fd: fsyncs.append(fd) or real_fsync(fd))
+
+    def writer(k):
+        for i in range(10):
+            journal.wait(journal.append({"op": "w", "k": k, "i": i}))
+    threads = [threading.Thread(target=writer, args=(k,)) for k in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+    assert len(records(tmp_path)) == 81
+    assert len(fsyncs) < 80
+
+
+def test_failed_fsync_stops_the_journal(tmp_path, monkeypatch):
+    journal = Journal(tmp_path)
+    journal.wait(journal.append({"op": "a"}))
+
+    def failing_fsync(fd):
+        raise OSError(5, "Input/output error")
+    monkeypatch.setattr(journal_module.os, "fsync", failing_fsync)
+    ticket = journal.append({"op": "clear"})
+    with pytest.raises(RuntimeError):
+        journal.wait(ticket)
+    assert journal._durable == 1
+
+    # The disk is fine again, but what was written before is unknown: keep refusing
+    monkeypatch.undo()
+    with pytest.raises(RuntimeError):
+        journal.wait(journal.append({"op": "b"}))
+    assert journal._durable == 1
+    journal.close()
+    assert records(tmp_path)[0] == {"op": "a"}
+
+
+def test_store_write_fails_when_the_journal_cannot_fsync(tmp_path, monkeypatch):
+    store = DurableStudentStore(str(tmp_path / "journal"))
+    store.upsert(make_student("R1"))
+
+    def failing_fsync(fd):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(journal_module.os, "fsync", failing_fsync)
+    with pytest.raises(RuntimeError):
+        store.clear()
+    monkeypatch.undo()
+    with pytest.raises(RuntimeError):
+        store.upsert(make_student("R2"))
+
+
+def test_snapshot_round_trip(tmp_path):
+    students = [Student.from_dict(make_student("R1", [("Maths", 45, 50), ("Physics", 33.5, 50)], name="Ädä Øl")),
+                Student("No Marks", "R2", "ECE", "B", "2")]
+    write_snapshot(tmp_path, 7, students)
+    next_segment, loaded = read_snapshot(tmp_path)
+    assert next_segment == 7
+    assert [s.to_dict() for s in loaded] == [s.to_dict() for s in students]
+    assert loaded[1].grade is None
+
+
+def test_store_recovers_from_journal(tmp_path):
+    directory = str(tmp_path / "journal")
+    store = DurableStudentStore(directory)
+    store.upsert_many([make_student(f"R{i}", [("Maths", 40 + i, 100)]) for i in range(10)])
+    store.update("R3", name="Changed")
+    store.delete("R4")
+    expected = dump(store)
+    store.close()
+    assert dump(DurableStudentStore(directory)) == expected
+
+
+def test_store_recovers_from_snapshot_plus_tail(tmp_path):
+    from utils.grading import GradingScheme
+    directory = str(tmp_path / "journal")
+    store = DurableStudentStore(directory)
+    store.upsert_many([make_student(f"R{i}", [("Maths", 40 + 5 * i, 100)]) for i in range(10)])
+    store.snapshot()
+    # Segments the snapshot covers are gone
+    assert Journal(directory).segments() == [max(Journal(directory).segments())]
+    store.upsert(make_student("R20", [("Physics", 10, 20)]))
+    store.delete("R1")
+    store.regrade(GradingScheme("Strict", [(95, "O"), (60, "P")]))
+    expected = dump(store)
+    store.close()
+
+    recovered = DurableStudentStore(directory)
+    assert dump(recovered) == expected
+    assert recovered.top(1)[0]["roll"] == "R9"
+    recovered.clear()
+    recovered.close()
+    assert len(DurableStudentStore(directory)) == 0
+
+
+def test_only_one_writer_per_directory(tmp_path):
+    if journal_module.fcntl is None:
+        pytest.skip("no advisory locks on this platform")
+    first = Journal(tmp_path)
+    first.wait(first.append({"op": "a"}))
+    second = Journal(tmp_path)
+    with pytest.raises(RuntimeError):
+        second.wait(second.append({"op": "b"}))
+    first.close()
@@ -0,0 +1,65 @@
+import os
+import sys
+import pytest
+from conftest import BASE_DIR, log_in, make_student
+from utils.metrics import Histogram, SlowRequestProfiler
+
+
+@pytest.fixture
+def metrics_client(scratch_db, tmp_path, monkeypatch):
+    """The portal with METRICS_ENABLED, as the client fixture builds it otherwise."""
+    sys.path.insert(0, os.path.join(BASE_DIR, "app"))
+    import app as portal
+    import database.database as db
+    monkeypatch.setattr(portal, "JOB_FILES_DIR", str(tmp_path / "job_files"))
+    monkeypatch.setattr(portal, "METRICS_ENABLED", True)
+    monkeypatch.setattr(db, "METRICS_ENABLED", True)
+    app = portal.create_app("sqlite")
+    yield app.test_client()
+    app.extensions["jobs"].shutdown()
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", (0.1, 1), ("route",))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, '/a"b')
+    assert histogram.render() == [
+        "# HELP demo_seconds Demo.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'demo_seconds_bucket{route="/a\\"b",le="1"} 3',
+        'demo_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+        'demo_seconds_sum{route="/a\\"b"} 4.050000',
+        'demo_seconds_count{route="/a\\"b"} 4',
+    ]
+
+
+def test_profiler_keeps_only_slow_sampled_requests(tmp_path):
+    assert SlowRequestProfiler(tmp_path, 0, 0).start() is None
+    profiler = SlowRequestProfiler(tmp_path, 1, slow_seconds=0.5)
+    running = profiler.start()
+    assert profiler.stop(running, 0.1, "GET /results") is None
+    path = profiler.stop(profiler.start(), 0.75, "GET /result/<roll>")
+    assert os.path.basename(path).endswith("_GET_result_roll_750ms.prof")
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_metrics_endpoint_reports_routes_sql_templates_and_caches(metrics_client):
+    log_in(metrics_client)
+    metrics_client.application.extensions["student_store"].upsert(make_student("R1"))
+    for _ in range(2):
+        assert metrics_client.get("/results").status_code == 200
+    text = metrics_client.get("/metrics").get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",route="/results",status="200"}' in text
+    assert 'http_request_sql_queries_count{method="GET",route="/results"}' in text
+    assert 'sql_query_duration_seconds_count{statement="SELECT"}' in text
+    assert 'template_render_duration_seconds_count{template="view_result.html"}' in text
+    assert 'response_cache_hits_total{cache="pages"}' in text
+    assert "# TYPE response_cache_hit_ratio gauge" in text
+
+
+def test_metrics_token(metrics_client, monkeypatch):
+    import controllers.metrics
+    monkeypatch.setattr(controllers.metrics, "METRICS_TOKEN", "s3cret")
+    assert metrics_client.get("/metrics").status_code == 401
+    assert metrics_client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
@@ -0,0 +1,44 @@
+import sqlite3
+import pytest
+import database.database as db
+from database.migrations import LATEST_VERSION, MIGRATIONS, migrate, schema_version
+from utils.grading import calculate_grade
+
+
+def test_fresh_database_gets_every_migration_once(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "fresh.db"))
+    assert migrate(conn) == [version for version, _ in MIGRATIONS]
+    assert schema_version(conn) == LATEST_VERSION
+    assert migrate(conn) == []
+
+
+def test_upgrade_from_the_original_schema(scratch_db):
+    # The two tables the first release created, with what it let in
+    conn = sqlite3.connect(scratch_db)
+    conn.execute("CREATE TABLE students (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL)")
+    conn.execute("""CREATE TABLE results (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id INTEGER, subject TEXT,
+                                          mark INTEGER, FOREIGN KEY(student_id) REFERENCES students(id))""")
+    conn.executemany("INSERT INTO students (name) VALUES (?)", [("Asha",), ("Ravi",)])
+    conn.executemany("INSERT INTO results (student_id, subject, mark) VALUES (?, ?, ?)", [
+        (1, "Maths", 80), (1, "Physics", 50), (1, "maths ", 60),  # Maths entered twice, the last one counts
+        (2, "Physics", 90), (2, "Chemistry", None), (None, "Maths", 40)])
+    conn.commit()
+    conn.close()
+
+    conn = db.connect_db()
+    assert schema_version(conn) == LATEST_VERSION
+    # Chemistry only had a blank mark: the subject is kept, the mark is not
+    assert conn.execute("SELECT id, name FROM subjects ORDER BY id").fetchall() == [(1, "Maths"), (2, "Physics"),
+                                                                                     (4, "Chemistry")]
+    marks = conn.execute("""SELECT r.student_id, s.name, r.mark, r.total FROM results r
+                            JOIN subjects s ON s.id = r.subject_id ORDER BY r.student_id, s.name""").fetchall()
+    assert marks == [(1, "Maths", 60, 100), (1, "Physics", 50, 100), (2, "Physics", 90, 100)]
+    summary = conn.execute("SELECT student_id, obtained, possible, subjects, percentage, grade FROM student_summary"
+                           " ORDER BY student_id").fetchall()
+    assert summary == [(1, 110, 200, 2, 55.0, calculate_grade(55.0)), (2, 90, 100, 1, 90.0, calculate_grade(90.0))]
+
+    # The upgraded tables take new writes like a fresh database
+    conn.execute("UPDATE students SET roll = 'R1', branch = 'CSE', section = 'A', year = '1' WHERE id = 1")
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO results (student_id, subject_id, mark) VALUES (1, 1, 70)")
+    conn.rollback()
@@ -0,0 +1,42 @@
+import pytest
+from conftest import make_student, other_worker
+
+
+def public_cache(client):
+    return client.application.extensions["page_caches"][1]
+
+
+def test_public_results_follow_other_workers(client, scratch_db):
+    client.application.extensions["student_store"].upsert(make_student("R1", [("Maths", 70, 100)]))
+    assert client.get("/api/result/R1").json["percentage"] == 70
+    assert client.get("/api/result/R2").status_code == 404
+    other_worker(scratch_db, "UPDATE results SET mark = 35")
+    other_worker(scratch_db, "INSERT INTO students (name, roll, branch, section, year) "
+                             "VALUES ('New', 'R2', 'CSE', 'A', '1')")
+    assert client.get("/api/result/R1").json["percentage"] == 35
+    assert client.get("/api/result/R2").json["roll"] == "R2"
+
+
+@pytest.mark.parametrize("client", ["memory", "sqlite"], indirect=True)
+def test_unknown_rolls_are_not_cached(client):
+    client.application.extensions["student_store"].upsert(make_student("R1"))
+    assert client.get("/api/result/R1").status_code == 200
+    for n in range(50):
+        assert client.get(f"/api/result/X{n}").status_code == 404
+        assert client.get(f"/result/X{n}").status_code == 404
+    assert len(public_cache(client)) == 1
+    client.application.extensions["student_store"].upsert(make_student("X7"))
+    assert client.get("/result?roll=X7").status_code == 200
+
+
+@pytest.mark.parametrize("client", ["memory", "sqlite"], indirect=True)
+def test_public_lookup_answers_304_until_the_result_changes(client):
+    store = client.application.extensions["student_store"]
+    store.upsert(make_student("R1", [("Maths", 70, 100)]))
+    first = client.get("/api/result/R1")
+    assert first.headers["Cache-Control"].startswith("public")
+    assert client.get("/api/result/R1", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    store.upsert(make_student("R1", [("Maths", 90, 100)]))
+    public_cache(client).invalidate("R1")  # as the edit routes do
+    again = client.get("/api/result/R1", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 200 and again.json["percentage"] == 90
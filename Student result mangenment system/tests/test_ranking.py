@@ -0,0 +1,54 @@
+from conftest import make_student
+
+
+def fill(store):
+    store.upsert_many([
+        make_student("R1", [("Maths", 90, 100)]),
+        make_student("R2", [("Maths", 80, 100)]),
+        make_student("R3", [("Maths", 40, 50)]),
+        make_student("R4", [("Maths", 50, 100)], branch="ECE"),
+        make_student("R5", []),  # no marks yet: ranked at 0%
+    ])
+
+
+def test_top_breaks_ties_by_roll(store):
+    fill(store)
+    assert [s["roll"] for s in store.top(3)] == ["R1", "R2", "R3"]
+    assert [s["roll"] for s in store.top(10, branch="ECE")] == ["R4"]
+    assert store.top(5, year="4") == []
+
+
+def test_rank_and_percentile(store):
+    fill(store)
+    assert store.rank("R1") == (1, 5, 100.0)
+    # Ties share a rank; the percentile counts everyone at or below
+    assert store.rank("R2") == store.rank("R3") == (2, 5, 80.0)
+    assert store.rank("R4") == (4, 5, 40.0)
+    assert store.rank("R5") == (5, 5, 20.0)
+    assert store.rank("R5", branch="CSE") == (4, 4, 25.0)
+    assert store.rank("R4", branch="CSE") is None
+    assert store.rank("nobody") is None
+
+
+def test_ranks_follow_writes(store):
+    fill(store)
+    assert store.rank("R4") == (4, 5, 40.0)
+    store.upsert(make_student("R4", [("Maths", 95, 100)], branch="ECE"))
+    store.delete("R1")
+    assert store.rank("R4") == (1, 4, 100.0)
+    assert [s["roll"] for s in store.top(2)] == ["R4", "R2"]
+
+
+def test_grade_distribution(store):
+    fill(store)
+    assert store.grade_distribution() == {"O": 1, "A": 2, "D": 1, "F": 1}
+    assert store.grade_distribution(branch="ECE") == {"D": 1}
+
+
+def test_zero_percent_students_rank_together(store):
+    fill(store)
+    store.upsert(make_student("R0", [("Maths", 0, 100)]))  # marked, but at 0%
+    assert [s["roll"] for s in store.top(10)] == ["R1", "R2", "R3", "R4", "R0", "R5"]
+    assert [s["roll"] for s in store.top(5)] == ["R1", "R2", "R3", "R4", "R0"]
+    assert store.rank("R0") == store.rank("R5") == (5, 6, 33.33)
+    assert store.grade_distribution()["F"] == 2
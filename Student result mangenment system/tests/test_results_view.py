@@ -0,0 +1,42 @@
+import re
+import pytest
+from conftest import log_in, make_student
+
+both_stores = pytest.mark.parametrize("client", ["memory", "sqlite"], indirect=True)
+
+
+def fill(client, n=5):
+    log_in(client)
+    client.application.extensions["student_store"].upsert_many(make_student(f"R{i}") for i in range(1, n + 1))
+
+
+def listed(response):
+    return re.findall(r"<tr><td>(\d+)</td><td>(R\d+)</td>", response.get_data(as_text=True))
+
+
+def test_store_pages_keep_insertion_order(store):
+    store.upsert_many(make_student(f"R{i}") for i in range(1, 6))
+    assert [s["roll"] for s in store.page(1, 2)] == ["R2", "R3"]
+    assert [s["roll"] for s in store.page(4, 10)] == ["R5"]
+    assert list(store.page(5, 10)) == []
+
+
+@both_stores
+def test_results_are_paged(client):
+    fill(client)
+    response = client.get("/results?page=2&limit=2")
+    assert listed(response) == [("3", "R3"), ("4", "R4")]
+    assert "Page 2 of 3 (5 students)" in response.get_data(as_text=True)
+    # Past the end shows the last page; junk falls back to the first
+    assert listed(client.get("/results?page=9&limit=2")) == [("5", "R5")]
+    assert listed(client.get("/results?page=x"))[0] == ("1", "R1")
+
+
+@both_stores
+def test_stream_mode_yields_every_row(client):
+    fill(client, 120)
+    response = client.get("/results?stream=1")
+    assert response.is_streamed
+    rows = listed(response)
+    assert len(rows) == 120 and rows[-1] == ("120", "R120")
+    assert "Page 1 of" not in response.get_data(as_text=True)
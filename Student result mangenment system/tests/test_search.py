@@ -0,0 +1,57 @@
+import pytest
+from conftest import log_in, make_student
+
+
+@pytest.fixture
+def people(store):
+    store.upsert_many([
+        make_student("CS101", [("Maths", 92, 100)], name="Asha Kumar"),
+        make_student("CS102", [("Maths", 75, 100)], name="Kunal Das", section="B"),
+        make_student("EC201", [("Maths", 75, 100)], name="Ravi Kumar", branch="ECE", year="2"),
+        make_student("EC202", [], name="Meera Nair", branch="ECE"),
+    ])
+    return store
+
+
+def rolls(found):
+    return [s["roll"] for s in found]
+
+
+def test_prefix_words_match_names_and_rolls(people):
+    assert rolls(people.search("kum")[0]) == ["CS101", "EC201"]
+    assert rolls(people.search("KU")[0]) == ["CS101", "CS102", "EC201"]
+    assert rolls(people.search("ravi kum")[0]) == ["EC201"]
+    assert rolls(people.search("ec20")[0]) == ["EC201", "EC202"]
+    assert people.search("kumar zed") == ([], 0, {"branch": {}, "section": {}, "year": {}, "grade": {}})
+
+
+def test_facets_narrow_and_count(people):
+    found, total, counts = people.search("kumar", branch="CSE")
+    assert rolls(found) == ["CS101"] and total == 1
+    # Each facet is counted without its own filter, so the other branch still shows
+    assert counts["branch"] == {"CSE": 1, "ECE": 1}
+    assert counts["year"] == {"1": 1}
+    found, total, counts = people.search(grade="B")
+    assert rolls(found) == ["CS102", "EC201"]
+    assert counts["grade"] == {"O": 1, "B": 2, "F": 1} and counts["branch"] == {"CSE": 1, "ECE": 1}
+    assert people.search(branch="ECE", section="A", year="1")[1] == 1
+
+
+def test_search_pages_and_follows_writes(people):
+    found, total, _ = people.search("", offset=1, limit=2)
+    assert rolls(found) == ["CS102", "EC201"] and total == 4
+    people.upsert(make_student("CS102", name="Kavya Rao", section="B"))
+    people.delete("EC201")
+    assert rolls(people.search("ku")[0]) == ["CS101"]
+    assert rolls(people.search("kavya")[0]) == ["CS102"]
+    with pytest.raises(ValueError):
+        people.search("x", roll="CS101")
+
+
+@pytest.mark.parametrize("client", ["memory", "sqlite"], indirect=True)
+def test_search_page(client):
+    log_in(client)
+    client.application.extensions["student_store"].upsert_many(
+        [make_student("CS101", name="Asha Kumar"), make_student("EC201", name="Ravi Kumar", branch="ECE")])
+    page = client.get("/search?q=kumar&branch=ECE").get_data(as_text=True)
+    assert "EC201" in page and "CS101" not in page
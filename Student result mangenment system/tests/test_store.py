@@ -0,0 +1,58 @@
+import pytest
+from conftest import log_in, make_student
+
+
+def rolls(students):
+    return [s["roll"] for s in students]
+
+
+def test_upsert_get_and_delete(store):
+    assert store.upsert(make_student("R1")) is True
+    assert store.upsert(make_student("R1", [("Maths", 90, 100)])) is False
+    assert store.upsert_many([make_student("R2"), make_student("R1")]) == [True, False]
+    assert len(store) == 2 and "R1" in store and "R9" not in store
+    assert store.get("R1")["subjects"][0]["obtained"] == 70
+    assert sorted(store.get_many(["R1", "R9", "R2"])) == ["R1", "R2"]
+    assert store.delete("R1")["roll"] == "R1"
+    assert store.delete("R1") is None and store.get("R1") is None
+    assert rolls(store) == ["R2"]
+
+
+def test_cohort_indexes_follow_writes(store):
+    store.upsert_many([make_student("C1"), make_student("C2", section="B"), make_student("E1", branch="ECE")])
+    assert rolls(store.find(branch="CSE")) == ["C1", "C2"]
+    assert rolls(store.find(branch="CSE", section="B")) == ["C2"]
+    assert store.count(branch="CSE") == 2 and store.count() == 3
+    # Moving a student to another branch refiles them
+    store.upsert(make_student("C1", branch="ECE"))
+    assert rolls(store.find(branch="CSE")) == ["C2"]
+    assert rolls(store.find(branch="ECE")) == ["C1", "E1"]
+    store.update("C2", year="2")
+    assert rolls(store.find(year="2")) == ["C2"] and store.values_of("year") == ["1", "2"]
+    store.delete("E1")
+    assert rolls(store.find(branch="ECE")) == ["C1"]
+    assert store.find(branch="MECH") == [] and store.count(branch="MECH") == 0
+    with pytest.raises(ValueError):
+        store.find(grade="O")
+
+
+def test_clear_empties_every_index(store):
+    store.upsert_many([make_student("C1"), make_student("E1", branch="ECE")])
+    store.clear()
+    assert len(store) == 0 and store.find(branch="CSE") == [] and store.values_of("branch") == []
+    store.upsert(make_student("C1"))
+    assert rolls(store.find(branch="CSE")) == ["C1"]
+
+
+@pytest.mark.parametrize("client", ["memory", "sqlite"], indirect=True)
+def test_forms_add_edit_and_restart(client):
+    log_in(client)
+    form = {"name": "Asha Rao", "roll": "R1", "branch": "CSE", "section": "A", "year": "1", "num_subjects": "1",
+            "subject_1": "Maths", "marks_1": "45", "total_1": "50"}
+    assert client.post("/submit_student", data=form).status_code == 302
+    store = client.application.extensions["student_store"]
+    assert store.get("R1")["percentage"] == 90
+    client.post("/edit/R1", data=dict(form, marks_1="20"))
+    assert store.get("R1")["percentage"] == 40 and len(store) == 1
+    client.post("/restart")
+    assert len(store) == 0 and store.find(branch="CSE") == []
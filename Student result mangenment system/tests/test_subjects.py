@@ -0,0 +1,40 @@
+import pytest
+from conftest import make_student
+from database.database import connect_db, subject_id, transaction
+from models.subject import catalog
+
+
+def test_new_subjects_reach_the_catalog_on_commit(scratch_db):
+    with transaction() as conn:
+        sid = subject_id(conn, "Data  Structures")
+        assert subject_id(conn, "data structures") == sid
+        # Not committed yet, so the shared catalog does not know it
+        assert catalog.id_of("Data Structures") is None
+    assert catalog.id_of("DATA STRUCTURES") == sid
+    assert catalog.name_of(sid) == "Data Structures"
+
+
+def test_rolled_back_subjects_leave_no_id_behind(scratch_db):
+    with pytest.raises(RuntimeError):
+        with transaction() as conn:
+            subject_id(conn, "Robotics")
+            raise RuntimeError("import failed")
+    assert catalog.id_of("Robotics") is None
+    with transaction() as conn:
+        conn.execute("INSERT INTO subjects (name, key) VALUES ('Welding', 'welding')")
+        sid = subject_id(conn, "Robotics")
+    assert connect_db().execute("SELECT name FROM subjects WHERE id = ?", (sid,)).fetchone() == ("Robotics",)
+    assert catalog.id_of("robotics") == sid
+
+
+def test_results_are_filed_under_subject_ids(store):
+    store.upsert_many([make_student("R1", [("Maths", 70, 100), ("Physics", 60, 100)]),
+                       make_student("R2", [(" maths", 80, 100)])])
+    assert store.get("R2")["subjects"][0]["name"] == "Maths"
+    columns = store.columns()
+    assert sorted(columns.subject_names) == ["Maths", "Physics"]
+    assert columns.result_count == 3
+    if store.shared_version() is None:
+        maths, physics = store.get("R1").subjects
+        assert maths.subject_id == store.get("R2").subjects[0].subject_id != physics.subject_id
+        assert store.subjects.name_of(maths.subject_id) == "Maths"
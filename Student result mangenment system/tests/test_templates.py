@@ -0,0 +1,35 @@
+import pytest
+from conftest import log_in, make_student
+
+
+def test_pages_render_from_the_template_folder(client):
+    assert b"@cutm.ac.in" in client.get("/login").data
+    assert client.get("/home").status_code == 200
+    response = client.post("/login", data={"email": "dean@cutm.ac.in"}, follow_redirects=True)
+    assert b"Welcome, Faculty dean@cutm.ac.in" in response.data
+    page = client.post("/add", data={"num_subjects": "3"}).data
+    assert b'name="subject_3"' in page and b'name="subject_4"' not in page
+    client.application.extensions["student_store"].upsert(make_student("R1", [("Maths", 45, 50)]))
+    page = client.get("/edit/R1").data
+    assert b'value="Maths"' in page and b'value="45"' in page
+
+
+def test_student_data_is_escaped(client):
+    log_in(client)
+    client.application.extensions["student_store"].upsert(make_student("R1", name="<script>x</script>"))
+    page = client.get("/results").data
+    assert b"&lt;script&gt;" in page and b"<script>x" not in page
+
+
+def test_templates_compile_once_per_process(client, monkeypatch):
+    log_in(client)
+    client.application.extensions["student_store"].upsert(make_student("R1"))
+    env = client.application.jinja_env
+    client.get("/results?limit=1")
+    compiled = []
+    compile_ = env.compile
+    monkeypatch.setattr(env, "compile", lambda *args, **kwargs: compiled.append(args) or compile_(*args, **kwargs))
+    client.application.extensions["page_caches"][0].clear()
+    for limit in (1, 2, 3):
+        assert b"Student R1" in client.get(f"/results?limit={limit}").data
+    assert compiled == []
@@ -0,0 +1,62 @@
+import pytest
+from controllers.import_results import validate_chunk
+from utils.validation import (VECTORIZE_MIN_ROWS, mark_errors, name_errors, parse_int_column, validate_name,
+                              validate_students)
+
+SIZES = [10, VECTORIZE_MIN_ROWS + 10]
+RAW = ["45", " +7 ", "-3", 45.0, 12, "007", "1e3", "45.5", 45.7, True, None, "", "x", str(10 ** 30), "٤٥"]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_parse_int_column_matches_whole_number(size):
+    values = (RAW * (size // len(RAW) + 1))[:size]
+    ints, bad = parse_int_column(values)
+    expected = {"45": 45, " +7 ": 7, "-3": -3, 45.0: 45, 12: 12, "007": 7, "٤٥": 45}
+    for value, parsed, flagged in zip(values, list(ints), list(bad)):
+        if value in expected and value is not True:
+            assert (parsed, flagged) == (expected[value], False), value
+        else:
+            assert (parsed, flagged) == (0, True), value
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_mark_errors(size):
+    obtained = [5, -1, 11, 5] * (size // 4 + 1)
+    total = [10, 10, 10, 0] * (size // 4 + 1)
+    assert list(mark_errors(obtained[:size], total[:size])) == ([False, True, True, True] * size)[:size]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_name_errors_follow_validate_name(size):
+    names = (["Asha Rao", "O'Neil", "Anne-Marie", "K. Iyer", "R2D2", "", "Asha_Rao"] * size)[:size]
+    for name, bad in zip(names, list(name_errors(names))):
+        try:
+            validate_name(name)
+            assert not bad, name
+        except ValueError:
+            assert bad, name
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_validate_students_reports_bad_names_by_index(size):
+    items = [{"name": f"Student {chr(65 + n % 26)}", "roll": f"R{n}", "branch": "CSE", "section": "A", "year": "1",
+              "subjects": []} for n in range(size)]
+    items[1]["name"] = "R2D2"
+    items[2] = "not a record"
+    items[3]["subjects"] = [{"name": "Maths", "obtained": 5.5, "total": 10}]
+    valid, errors = validate_students(items)
+    assert [index for index, _ in errors] == [1, 2, 3]
+    assert errors[0][1].startswith("Name must contain only letters")
+    assert len(valid) == size - 3
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_validate_chunk_flags_only_bad_rows(size):
+    chunk = [(n, {"roll": f"R{n}", "subject": "Maths", "mark": "5", "total": "10"}) for n in range(2, size + 2)]
+    chunk[1][1]["mark"] = str(10 ** 30)  # past int64: must not abort the chunk
+    chunk[2][1]["total"] = "0"
+    valid, errors = validate_chunk(chunk)
+    assert errors == [(3, "Mark must be between 0 and 10"), (4, "Total marks must be positive")]
+    assert len(valid) == size - 2
+    assert valid[0] == (2, "R2", "Maths", 5, 10)
+    assert all(type(mark) is int and type(total) is int for _, _, _, mark, total in valid)
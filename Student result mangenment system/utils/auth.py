@@ -0,0 +1,13 @@
+from functools import wraps
+from flask import redirect, session, url_for
+
+
+def login_required(f):
+    """Decorator to restrict a view to faculty (logged-in users); others go to the login page."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Check if the 'logged_in' session flag is True
+        if session.get("logged_in") != True:
+            return redirect(url_for("faculty_login"))
+        return f(*args, **kwargs)
+    return decorated_function
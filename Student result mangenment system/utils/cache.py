@@ -0,0 +1,88 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    __slots__ = ("value", "etag", "last_modified", "version", "tags")
+
+    def __init__(self, value, version, tags):
+        self.value = value
+        self.etag = hashlib.md5(value.encode("utf-8")).hexdigest()
+        self.last_modified = time.time()
+        self.version = version
+        self.tags = tags
+
+
+class ResponseCache:
+    """Size-bounded LRU cache for rendered pages and fragments.
+
+    Entries carry tags (e.g. a roll number) so writes can drop exactly the
+    entries they affect. For a store shared with other processes, every
+    entry also records the store's version when it was filled and is
+    treated as stale once another worker has written (`version` differs).
+    """
+
+    def __init__(self, max_entries=1024, name="cache"):
+        self.max_entries = max_entries
+        self.name = name
+        self._entries = OrderedDict()
+        self._tagged = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, value, version=None, tags=()):
+        entry = CacheEntry(value, version, frozenset(tags))
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+        return entry
+
+    def get_or_render(self, key, render, version=None, tags=()):
+        """Return the cached entry for key, rendering and storing it on a miss."""
+        entry = self.get(key, version)
+        if entry is None:
+            entry = self.set(key, render(), version, tags)
+        return entry
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of the given tags."""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tagged.get(tag, ())):
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._tagged[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tagged[tag]
@@ -0,0 +1,92 @@
+from bisect import bisect_left, bisect_right
+
+# Custom CUTM scale: (minimum percentage, grade), highest first
+GRADE_SCALE = [
+    (90, "O"),
+    (85, "E"),
+    (80, "A"),
+    (75, "B"),
+    (65, "C"),
+    (50, "D"),
+]
+FAIL_GRADE = "F"
+
+SCHEME_KINDS = ("absolute", "relative")
+
+
+class GradingScheme:
+    """A grading scale stored as data and compiled into a bisect lookup table.
+
+    `bands` are (minimum, grade) pairs. For an "absolute" scheme the minimum
+    is a percentage; for a "relative" (curve) scheme it is the share of the
+    cohort scoring below the student, so (90, "O") gives O to the top 10%.
+    A relative scheme can also fail everyone under `pass_mark` percent.
+    """
+
+    def __init__(self, name, bands, fail_grade=FAIL_GRADE, kind="absolute", pass_mark=None):
+        if kind not in SCHEME_KINDS:
+            raise ValueError(f"Grading scheme kind must be one of: {', '.join(SCHEME_KINDS)}")
+        bands = sorted(((float(minimum), str(grade)) for minimum, grade in bands), reverse=True)
+        minimums = [minimum for minimum, _ in bands]
+        if len(set(minimums)) != len(minimums):
+            raise ValueError("Each grade band needs a different minimum")
+        if any(not 0 <= minimum <= 100 for minimum in minimums):
+            raise ValueError("Grade band minimums must be between 0 and 100")
+        if any(not grade.strip() for _, grade in bands) or not str(fail_grade).strip():
+            raise ValueError("Grades cannot be empty")
+        self.name = name
+        self.kind = kind
+        self.bands = bands
+        self.fail_grade = fail_grade
+        self.pass_mark = pass_mark
+        # Ascending cutoffs; grades[i] applies from cutoffs[i - 1] up to cutoffs[i]
+        self._cutoffs = minimums[::-1]
+        self._grades = [fail_grade] + [grade for _, grade in reversed(bands)]
+
+    def lookup(self, value):
+        """Grade for a percentage (absolute) or a below-share (relative): one bisect."""
+        return self._grades[bisect_right(self._cutoffs, value)]
+
+    def grade(self, percentage):
+        """Grade for one student's percentage on an absolute scheme."""
+        if self.kind != "absolute":
+            raise ValueError(f"'{self.name}' grades on a curve; use grade_all for a whole cohort")
+        return self.lookup(percentage)
+
+    def grade_all(self, percentages):
+        """Grades for a cohort's percentages, in the same order, in one pass."""
+        if self.kind == "absolute":
+            return [self.lookup(p) for p in percentages]
+        ordered = sorted(percentages)
+        n = len(ordered)
+        return [self.fail_grade if self.pass_mark is not None and p < self.pass_mark
+                else self.lookup(100 * bisect_left(ordered, p) / n) for p in percentages]
+
+    def curve(self, percentages, grades):
+        """Absolute scheme reproducing a graded cohort: each grade starts at the lowest percentage given it.
+
+        Lets students added after a curved regrade be graded on the same cutoffs.
+        """
+        lowest = {}
+        for p, grade in zip(percentages, grades):
+            if grade != self.fail_grade and (grade not in lowest or p < lowest[grade]):
+                lowest[grade] = p
+        return GradingScheme(self.name, [(p, grade) for grade, p in lowest.items()], self.fail_grade)
+
+    def to_dict(self):
+        return {"name": self.name, "kind": self.kind, "bands": [[m, g] for m, g in self.bands],
+                "fail_grade": self.fail_grade, "pass_mark": self.pass_mark}
+
+
+DEFAULT_SCHEME = GradingScheme("CUTM", GRADE_SCALE, FAIL_GRADE)
+
+
+def calculate_grade(percentage):
+    """Grade calculation based on the custom CUTM scale."""
+    return DEFAULT_SCHEME.lookup(percentage)
+
+
+def grade_sql(expr):
+    """SQL CASE expression grading `expr` on the same scale, for set-based queries."""
+    cases = " ".join(f"WHEN {expr} >= {minimum:g} THEN '{grade}'" for minimum, grade in GRADE_SCALE)
+    return f"CASE {cases} ELSE '{FAIL_GRADE}' END"
@@ -0,0 +1,165 @@
+"""In-process metrics: histograms rendered in the Prometheus text format, SQL
+query timing and sampled cProfile dumps of slow requests.
+
+Everything here is per process; with several gunicorn workers each one
+answers /metrics for itself.
+"""
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+
+# Histogram bucket upper bounds (seconds, or a plain count for queries per request)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """A labelled histogram; observe() is a bisect plus two additions under a lock."""
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in
+                      sorted(self._series.items())]
+        for label_values, counts, total, count in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                cumulative += n
+                labels = _format_labels(self.labels + ("le",), label_values + (f"{bound:g}" if bound != "+Inf"
+                                                                                 else bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Histograms plus collectors: callables returning (name, type, help, [(labels dict, value)])
+    for values that live elsewhere (e.g. cache hit counters), read at scrape time."""
+
+    def __init__(self):
+        self._histograms = []
+        self._collectors = []
+
+    def histogram(self, name, help_text, buckets, labels=()):
+        histogram = Histogram(name, help_text, buckets, labels)
+        self._histograms.append(histogram)
+        return histogram
+
+    def register_collector(self, collect):
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for histogram in self._histograms:
+            lines += histogram.render()
+        for collect in self._collectors:
+            for name, kind, help_text, samples in collect():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "Time to build each response, by route.",
+                                     LATENCY_BUCKETS, ("method", "route", "status"))
+REQUEST_QUERIES = REGISTRY.histogram("http_request_sql_queries", "SQL statements run per request, by route.",
+                                     COUNT_BUCKETS, ("method", "route"))
+SQL_DURATION = REGISTRY.histogram("sql_query_duration_seconds", "SQL statement execution time, by statement kind.",
+                                  SQL_BUCKETS, ("statement",))
+TEMPLATE_RENDER = REGISTRY.histogram("template_render_duration_seconds", "Jinja template render time.",
+                                     LATENCY_BUCKETS, ("template",))
+
+_STATEMENT = re.compile(r"\s*(\w+)")
+_local = threading.local()
+
+
+def observe_query(sql, seconds):
+    """Record one SQL statement (called by the database layer's timed connection)."""
+    match = _STATEMENT.match(sql)
+    SQL_DURATION.observe(seconds, match.group(1).upper() if match else "OTHER")
+    _local.queries = getattr(_local, "queries", 0) + 1
+
+
+def reset_query_count():
+    _local.queries = 0
+
+
+def query_count():
+    """SQL statements run on this thread since the last reset_query_count()."""
+    return getattr(_local, "queries", 0)
+
+
+class SlowRequestProfiler:
+    """Profiles a random sample of requests and keeps the cProfile dumps of slow ones.
+
+    Only one request is profiled at a time: the profiler hooks are process-wide.
+    Dumps are named <timestamp>_<route>_<ms>ms.prof; open them with pstats or snakeviz.
+    """
+
+    def __init__(self, directory, sample_rate, slow_seconds):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self._busy = threading.Lock()
+
+    def start(self):
+        """A running profiler if this request was sampled, else None."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate or not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already active in this process
+            self._busy.release()
+            return None
+        return profiler
+
+    def stop(self, profiler, seconds, name):
+        """Stop profiling; returns the dump path if the request was slow enough to keep."""
+        profiler.disable()
+        self._busy.release()
+        if seconds < self.slow_seconds:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_") or "root"
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}_{slug}_{seconds * 1000:.0f}ms.prof")
+        profiler.dump_stats(path)
+        return path
@@ -0,0 +1,13 @@
+from config.config import RESULTS_MAX_PAGE_SIZE, RESULTS_PAGE_SIZE
+
+
+def page_args(args):
+    """(page, limit) from ?page=&limit= query args, as every paged listing reads them.
+
+    Pages count from 1; the limit defaults to RESULTS_PAGE_SIZE and is kept
+    within 1..RESULTS_MAX_PAGE_SIZE. Raises ValueError if either is not a
+    whole number.
+    """
+    page = max(int(args.get("page", 1)), 1)
+    limit = min(max(int(args.get("limit", RESULTS_PAGE_SIZE)), 1), RESULTS_MAX_PAGE_SIZE)
+    return page, limit
@@ -1,9 +1,198 @@
+from models.subject import subject_key
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the batch checks fall back to plain Python
+    np = None
+
+# Allowed between the letters of a name: "Asha Rao", "O'Neil", "Anne-Marie", "K. Iyer"
+NAME_PUNCTUATION = " '-."
+
+
 def validate_name(name):
-    if not name.isalpha():
-        raise ValueError("Name must contain only letters")
+    if not _is_name(name):
+        raise ValueError("Name must contain only letters, spaces, hyphens, apostrophes and dots")
     return True
 
-def validate_mark(mark):
-    if not (0 <= mark <= 100):
-        raise ValueError("Mark must be between 0 and 100")
+
+def _is_name(name):
+    for mark in NAME_PUNCTUATION:
+        name = name.replace(mark, "")
+    return name.isalpha()
+
+def whole_number(value):
+    """`value` as an int if it is a whole number: 45, "45" and 45.0 are; 45.7, "45.5" and True are not.
+
+    Plain int() would truncate JSON floats and read booleans as 0 and 1.
+    """
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{value!r} is not a whole number")
+    try:
+        return int(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"{value!r} is not a whole number") from e
+
+def validate_mark(mark, total=100):
+    if not (0 <= mark <= total):
+        raise ValueError(f"Mark must be between 0 and {total}")
     return True
+
+
+STUDENT_FIELDS = ("name", "roll", "branch", "section", "year")
+# Largest mark SQLite (and a NumPy int64 column) can hold
+MAX_MARK = 2 ** 63 - 1
+
+
+def validate_marks(obtained, total):
+    if obtained < 0 or total <= 0 or obtained > total:
+        raise ValueError("Marks must be positive and obtained marks must not exceed total marks.")
+    if total > MAX_MARK:
+        raise ValueError("Total marks are too large.")
+    return True
+
+
+def validate_student(data, check_name=True):
+    """Check one student record from a form or the JSON API.
+
+    `data` has name, roll, branch, section, year and a list of subjects
+    ({"name", "obtained", "total"}). Returns a clean copy with marks as
+    ints; raises ValueError with a message fit to show the user.
+    check_name=False skips validate_name, for callers that ran name_errors
+    over the whole batch already.
+    """
+    student = {}
+    for field in STUDENT_FIELDS:
+        value = data.get(field)
+        if value is None or not str(value).strip():
+            raise ValueError(f"Please fill in the student's {field}.")
+        student[field] = str(value)
+    if check_name:
+        validate_name(student["name"].strip())
+
+    subjects = data.get("subjects")
+    if not isinstance(subjects, list):
+        raise ValueError("Subjects must be a list of name/obtained/total marks.")
+    student["subjects"] = []
+    seen = set()
+    for sub in subjects:
+        try:
+            name = str(sub["name"])
+            obtained = whole_number(sub["obtained"])
+            total = whole_number(sub["total"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Please ensure all marks are whole numbers.") from None
+        if not name.strip():
+            raise ValueError("Please give every subject a name.")
+        if subject_key(name) in seen:
+            raise ValueError(f"{name.strip()} is entered more than once.")
+        seen.add(subject_key(name))
+        validate_marks(obtained, total)
+        student["subjects"].append({"name": name, "obtained": obtained, "total": total})
+    return student
+
+
+# Below this many rows NumPy's array setup costs more than it saves
+VECTORIZE_MIN_ROWS = 256
+# Digit strings this short always fit in an int64
+_SAFE_DIGITS = 18
+
+
+def validate_students(items):
+    """Validate a batch of student records, as validate_student does one.
+
+    Names are checked for the whole batch at once (name_errors). Returns
+    (valid, errors): clean records and (index, message) pairs.
+    """
+    records = [(i, item) for i, item in enumerate(items) if isinstance(item, dict)]
+    bad_names = name_errors([str(item.get("name") or "").strip() for _, item in records])
+    valid, errors = [], [(i, "Each student must be a JSON object.")
+                         for i, item in enumerate(items) if not isinstance(item, dict)]
+    for (index, item), bad_name in zip(records, bad_names):
+        try:
+            student = validate_student(item, check_name=False)
+            if bad_name:
+                validate_name(student["name"].strip())
+            valid.append(student)
+        except ValueError as e:
+            errors.append((index, str(e)))
+    errors.sort()
+    return valid, errors
+
+
+def name_errors(names):
+    """Per-row error mask for a column of names (True = invalid), with validate_name's rule."""
+    if np is not None and len(names) >= VECTORIZE_MIN_ROWS:
+        names = np.asarray(names, dtype=str)
+        for mark in NAME_PUNCTUATION:
+            names = np.char.replace(names, mark, "")
+        return ~np.char.isalpha(names)
+    return [not _is_name(name) for name in names]
+
+
+def parse_int_column(values):
+    """Convert a column of raw values to ints with whole_number's rules.
+
+    Returns (ints, bad_mask); bad entries become 0. Large columns are read
+    as text by NumPy in one conversion and come back as an int64 array and
+    a boolean mask. Entries that are not plain digit strings (45.0, "1e3",
+    True, None) are then checked one by one with whole_number.
+    """
+    if np is None or len(values) < VECTORIZE_MIN_ROWS:
+        return _parse_ints(values)
+    text = np.char.strip(np.asarray(values, dtype=object).astype(str))
+    digits = np.char.lstrip(text, "+-")
+    length = np.char.str_len(digits)
+    plain = (np.char.isdecimal(digits) & (length <= _SAFE_DIGITS)
+             & (np.char.str_len(text) - length <= 1))
+    ints = np.zeros(len(text), dtype=np.int64)
+    try:
+        ints[plain] = text[plain].astype(np.int64)
+    except ValueError:
+        # Non-ASCII digits NumPy will not read; let int() handle the column
+        return _parse_ints(values)
+    bad = ~plain
+    for i in np.flatnonzero(bad):
+        try:
+            value = whole_number(values[i])
+        except ValueError:
+            continue
+        if -MAX_MARK - 1 <= value <= MAX_MARK:
+            ints[i] = value
+            bad[i] = False
+    return ints, bad
+
+
+def _parse_ints(values):
+    ints, bad = [], []
+    for value in values:
+        try:
+            ints.append(whole_number(value))
+            bad.append(False)
+        except ValueError:
+            ints.append(0)
+            bad.append(True)
+    return ints, bad
+
+
+def mark_errors(obtained, total):
+    """Per-row error mask for columns of obtained/total marks (True = invalid).
+
+    Same rule as validate_marks, checked for the whole column at once.
+    """
+    if np is not None and len(obtained) >= VECTORIZE_MIN_ROWS:
+        try:
+            obtained = np.asarray(obtained, dtype=np.int64)
+            total = np.asarray(total, dtype=np.int64)
+        except OverflowError:
+            # A value past MAX_MARK; the loop below flags just that row
+            pass
+        else:
+            return (obtained < 0) | (total <= 0) | (obtained > total)
+    return [o < 0 or t <= 0 or o > t or t > MAX_MARK for o, t in zip(obtained, total)]
+
+
+def flagged_rows(*masks):
+    """Indices of the rows set in any of the masks (lists or NumPy arrays of one length)."""
+    if np is not None and any(isinstance(mask, np.ndarray) for mask in masks):
+        return np.flatnonzero(np.logical_or.reduce([np.asarray(m, dtype=bool) for m in masks])).tolist()
+    return [i for i, flags in enumerate(zip(*masks)) if any(flags)]
@@ -0,0 +1,18 @@
+"""WSGI entry point for production servers.
+
+    gunicorn --preload -w 4 wsgi:app
+
+With --preload the master builds the app and prewarms it once (schema
+migration, compiled templates, optional export libraries), then forks
+workers that share that memory copy-on-write. Each worker opens its own
+database connection and job threads on first use.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+
+from app import create_app, prewarm
+
+app = create_app()
+prewarm(app)